@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from events.models import Event
+from itembookings.models import ItemBooking
+from items.models import Item, Category
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # The cache outlives each test's rolled-back transaction, so start every test empty
+    for cache in caches.all():
+        cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def snapshot_files(settings, tmp_path):
+    # Catalog snapshots go to a per-test directory and are never rebuilt from a background thread
+    settings.CATALOG_SNAPSHOT_ROOT = str(tmp_path / 'snapshots')
+    settings.CATALOG_SNAPSHOT_REBUILD_DELAY = 0
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def manager_group():
+    group, _ = Group.objects.get_or_create(name='Manager')
+    return group
+
+
+@pytest.fixture
+def staff_group():
+    group, _ = Group.objects.get_or_create(name='Staff')
+    return group
+
+
+@pytest.fixture
+def manager_user(manager_group):
+    user = User.objects.create_user(username='manager', password='testpass123')
+    user.groups.add(manager_group)
+    return user
+
+
+@pytest.fixture
+def staff_user(staff_group):
+    user = User.objects.create_user(username='staff', password='testpass123')
+    user.groups.add(staff_group)
+    return user
+
+
+@pytest.fixture
+def regular_user():
+    return User.objects.create_user(username='regular', password='testpass123')
+
+
+@pytest.fixture
+def many_rows():
+    # More rows than a page so per-row queries would blow any constant budget
+    now = timezone.now()
+    categories = [Category.objects.get_or_create(name=name)[0] for name in ['Capes', 'Hats', 'Masks']]
+    items = [
+        Item.objects.create(name=f'Item {i}', quantity=5, category=categories[i % 3], location='Storage Room A')
+        for i in range(25)
+    ]
+    events = [
+        Event.objects.create(
+            name=f'Event {i}',
+            start_datetime=now + timedelta(days=i),
+            end_datetime=now + timedelta(days=i, hours=4),
+        )
+        for i in range(25)
+    ]
+    bookings = [ItemBooking.objects.create(item=items[i], event=events[i], quantity=1) for i in range(25)]
+    return {'items': items, 'events': events, 'bookings': bookings, 'categories': categories}
+
+
+@pytest.fixture
+def staff_client(staff_user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(staff_user).access_token}')
+    return client
+
+
+@pytest.fixture
+def manager_client(manager_user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(manager_user).access_token}')
+    return client
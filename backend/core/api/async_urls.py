@@ -0,0 +1,16 @@
+from django.urls import path
+from items.api.async_views import AsyncItemView, AsyncItemAvailabilityView, AsyncCategoryChoicesView
+from events.api.async_views import AsyncEventView, AsyncCurrentFutureEventsView
+from .async_views import ChangeStreamView
+
+# Async, read-only counterparts of the item and event endpoints (core.asyncviews) and the live change stream
+urlpatterns = [
+  path('items/', AsyncItemView.as_view(), name='async-item-list'),
+  path('items/categories/', AsyncCategoryChoicesView.as_view(), name='async-category-choices'),
+  path('items/<int:pk>/', AsyncItemView.as_view(), name='async-item-detail'),
+  path('items/<int:pk>/availability/', AsyncItemAvailabilityView.as_view(), name='async-item-availability'),
+  path('events/', AsyncEventView.as_view(), name='async-event-list'),
+  path('events/current-future/', AsyncCurrentFutureEventsView.as_view(), name='async-current-future-events'),
+  path('events/<int:pk>/', AsyncEventView.as_view(), name='async-event-detail'),
+  path('changes/', ChangeStreamView.as_view(), name='change-stream'),
+]
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from .. import notify
+from ..asyncviews import AsyncReadView, json_response
+from ..changes import stream
+
+class ChangeStreamView(AsyncReadView):
+    # Server-sent events with item, event and booking changes (core.changes)
+    query_budgets = {'get': 2}
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # A WSGI server would have to buffer the endless stream
+            return json_response(
+                {'detail': 'The change stream needs an ASGI server.'}, status.HTTP_501_NOT_IMPLEMENTED
+            )
+        notify.listening('CHANGE_STREAM_LISTEN')
+        response = StreamingHttpResponse(
+            stream(settings.CHANGE_STREAM_HEARTBEAT_SECONDS), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx would otherwise hold events back
+        return response
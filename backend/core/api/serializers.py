@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.core.validators import EmailValidator
 from django.core.exceptions import ValidationError as DjangoValidationError
 import bleach
+from django.conf import settings
 
 User = get_user_model()
 
@@ -76,3 +77,10 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         user.groups.clear()
         return user
 
+class BatchSubRequestSerializer(serializers.Serializer):
+    id = serializers.CharField(required=False)
+    method = serializers.ChoiceField(choices=['GET'], default='GET')
+    path = serializers.CharField(max_length=2000)
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False, max_length=settings.BATCH_MAX_REQUESTS)
@@ -1,7 +1,7 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import CustomTokenObtainPairView, current_user, logout, register
+from .views import CustomTokenObtainPairView, current_user, logout, register, BatchView, SyncView, CatalogManifestView
 
 router = DefaultRouter()
 
@@ -14,4 +14,8 @@ urlpatterns = [
   path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
   path('auth/me/', current_user, name='current_user'),
   path('auth/logout/', logout, name='logout'),
+  path('batch/', BatchView.as_view(), name='batch'),
+  path('async/', include('core.api.async_urls')),
+  path('sync/', SyncView.as_view(), name='sync'),
+  path('catalog/manifest/', CatalogManifestView.as_view(), name='catalog-manifest'),
 ]
\ No newline at end of file
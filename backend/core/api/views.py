@@ -2,9 +2,15 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
-from .serializers import UserSerializer, UserRegistrationSerializer
+from .serializers import UserSerializer, UserRegistrationSerializer, BatchSerializer
+from ..batch import run_batch
+from ..permissions import IsManagerOrStaffReadOnly
+from ..snapshot import manifest
+from ..sync import changed_since, deleted_since, encode_token, sync_window
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -64,3 +70,44 @@ def register(request):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class BatchView(APIView):
+    # Runs several GET sub-requests in one round trip; each sub-request still checks its own view's permissions
+    permission_classes = [IsAuthenticated]
+    # POST only carries the list of sub-requests: reads can go to a replica and don't pin the user to the primary
+    replica_reads = True
+    read_only = True
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = run_batch(request, serializer.validated_data['requests'])
+        return Response({'responses': responses}, status=status.HTTP_200_OK)
+
+class SyncView(APIView):
+    # Rows changed and deleted since ?since=<token> (core.sync); reads the primary, since a
+    # lagging replica would hand out a token past rows it has not received yet
+    permission_classes = [IsManagerOrStaffReadOnly]
+    query_budgets = {'get': 8}
+
+    def get(self, request):
+        now = timezone.now()
+        since = sync_window(request.query_params.get('since'), now)
+        return Response({
+            'token': encode_token(now),
+            'full': since is None,
+            'changed': changed_since(since),
+            'deleted': deleted_since(since),
+        }, status=status.HTTP_200_OK)
+
+class CatalogManifestView(APIView):
+    # Hash and URL of the current catalog snapshot file (core.snapshot)
+    permission_classes = [IsManagerOrStaffReadOnly]
+    replica_reads = True
+    # A rebuild reads categories, item pks, uncached items and events
+    query_budgets = {'get': 6}
+
+    def get(self, request):
+        current = manifest()
+        return Response(
+            {**current, 'url': request.build_absolute_uri(current['url'])}, status=status.HTTP_200_OK
+        )
@@ -0,0 +1,58 @@
+from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import Group
+
+        from .cache import INVALIDATION_GROUPS, create_unlogged_cache_tables, invalidate_model, invalidate_roles
+        from .changes import MESSAGE_TYPES, record_change
+        from .objectcache import invalidate_category_items, invalidate_object
+        from .snapshot import schedule_rebuild
+        from .sync import SYNC_MODELS, record_tombstone, touch_dependents
+
+        # Depends on CACHES at the time migrate runs, so it is not a migration itself
+        post_migrate.connect(create_unlogged_cache_tables, sender=self, dispatch_uid='cache-unlogged-tables')
+
+        for label in INVALIDATION_GROUPS:
+            model = self.apps.get_model(label)
+            post_save.connect(invalidate_model, sender=model, dispatch_uid=f'cache-{label}-save')
+            post_delete.connect(invalidate_model, sender=model, dispatch_uid=f'cache-{label}-delete')
+
+        User = get_user_model()
+        m2m_changed.connect(invalidate_roles, sender=User.groups.through, dispatch_uid='cache-roles-membership')
+        post_save.connect(invalidate_roles, sender=Group, dispatch_uid='cache-roles-group-save')
+        post_delete.connect(invalidate_roles, sender=Group, dispatch_uid='cache-roles-group-delete')
+
+        for label in ('items.Item', 'events.Event'):
+            model = self.apps.get_model(label)
+            post_save.connect(invalidate_object, sender=model, dispatch_uid=f'object-cache-{label}-save')
+            post_delete.connect(invalidate_object, sender=model, dispatch_uid=f'object-cache-{label}-delete')
+
+        # Items embed their category's name; pre_delete runs before SET_NULL clears the reference
+        Category = self.apps.get_model('items.Category')
+        post_save.connect(invalidate_category_items, sender=Category, dispatch_uid='object-cache-category-save')
+        pre_delete.connect(invalidate_category_items, sender=Category, dispatch_uid='object-cache-category-delete')
+
+        for label in MESSAGE_TYPES:
+            model = self.apps.get_model(label)
+            post_save.connect(record_change, sender=model, dispatch_uid=f'changes-{label}-save')
+            post_delete.connect(record_change, sender=model, dispatch_uid=f'changes-{label}-delete')
+
+        for label in SYNC_MODELS.values():
+            model = self.apps.get_model(label)
+            post_delete.connect(record_tombstone, sender=model, dispatch_uid=f'sync-{label}-tombstone')
+        # Rows embedding a renamed category, item or event must show up as changed too
+        for label in ('items.Category', 'items.Item', 'events.Event'):
+            post_save.connect(touch_dependents, sender=self.apps.get_model(label), dispatch_uid=f'sync-{label}-touch')
+        pre_delete.connect(touch_dependents, sender=Category, dispatch_uid='sync-category-delete-touch')
+
+        for label in ('items.Category', 'items.Item', 'events.Event'):
+            model = self.apps.get_model(label)
+            post_save.connect(schedule_rebuild, sender=model, dispatch_uid=f'snapshot-{label}-save')
+            post_delete.connect(schedule_rebuild, sender=model, dispatch_uid=f'snapshot-{label}-delete')
@@ -0,0 +1,155 @@
+"""
+Async read endpoints (``/api/async/``) built on Django's async views and ORM.
+
+DRF views are synchronous, so under an ASGI server each one holds a thread for
+the whole request. The views here authenticate the JWT, check permissions and
+query with the async ORM (``aget``, ``acount``, ``async for``), so a slow query
+only suspends a coroutine. They return the same JSON as the DRF endpoints they
+mirror, share their filters and per-object cache, and are read-only.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .objectcache import OBJECT_CACHE_TIMEOUT, encode_rows, object_key
+from .pagination import StandardPagination
+from .permissions import IsManagerOrStaffReadOnly
+from .renderers import PreEncoded, PreEncodedJSONRenderer
+
+_renderer = PreEncodedJSONRenderer()
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(_renderer.render(data), status=status_code, content_type='application/json')
+
+
+async def authenticate(request):
+    # The JWT is checked without the database; only the user row is fetched
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        raise exceptions.AuthenticationFailed('Given token not valid for any token type')
+    user = await get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None or not user.is_active:
+        raise exceptions.AuthenticationFailed('User not found')
+    return user
+
+
+async def aget_many(model, pks, fetch, serialize):
+    """
+    Async ``core.objectcache.get_many``: ``fetch(missing_pks)`` is a coroutine
+    returning the missing objects.
+    """
+    keys = {pk: object_key(model, pk) for pk in pks}
+    cached = await cache.aget_many(keys.values())
+    found = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in pks if pk not in found]
+    if missing:
+        fresh = encode_rows(await fetch(missing), serialize)
+        await cache.aset_many({keys[pk]: encoded for pk, encoded in fresh.items()}, OBJECT_CACHE_TIMEOUT)
+        found.update(fresh)
+    return [PreEncoded(found[pk]) for pk in pks if pk in found]
+
+
+class AsyncReadView(View):
+    # Same permission rules as the DRF endpoints; subclasses implement async get()
+    http_method_names = ['get', 'head', 'options']
+    permission_classes = [IsManagerOrStaffReadOnly]
+    replica_reads = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await authenticate(request)
+            if request.user is None:
+                raise exceptions.NotAuthenticated()
+            for permission in self.permission_classes:
+                # Group names may come from a database-backed cache, which is sync-only
+                if not await sync_to_async(permission().has_permission)(request, self):
+                    raise exceptions.PermissionDenied()
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return json_response({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+        except exceptions.APIException as exc:
+            response = json_response(
+                exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}, exc.status_code
+            )
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response.status_code = status.HTTP_401_UNAUTHORIZED
+                response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+
+
+class AsyncModelReadView(AsyncReadView):
+    """
+    List (``pk`` absent) and detail (``pk`` given) for the model of a DRF
+    viewset, honouring its filterset, search and ordering parameters.
+    """
+    viewset_class = None
+    # A list page: user, groups, count, page of pks and the uncached rows
+    query_budgets = {'get': 5}
+
+    async def get(self, request, pk=None):
+        if pk is None:
+            return json_response(await self.paginated_rows(request))
+        rows = await self.rows([pk])
+        if not rows:
+            raise Http404
+        return json_response(rows[0])
+
+    async def fetch(self, pks):
+        return [obj async for obj in self.viewset_class.queryset.filter(pk__in=pks)]
+
+    async def rows(self, pks):
+        serializer_class = self.viewset_class.serializer_class
+        return await aget_many(
+            self.viewset_class.queryset.model, pks, self.fetch,
+            lambda objects: serializer_class(objects, many=True).data,
+        )
+
+    def filter_queryset(self, request):
+        # The backends only build the queryset, nothing is evaluated here
+        view = self.viewset_class(request=request, action='list', format_kwarg=None, args=(), kwargs={})
+        return view.filter_queryset(self.viewset_class.queryset.all())
+
+    async def paginated_rows(self, request):
+        drf_request = Request(request)
+        queryset = self.filter_queryset(drf_request)
+        page_size = StandardPagination().get_page_size(drf_request)
+        try:
+            page = int(request.GET.get('page', 1))
+        except ValueError:
+            raise exceptions.NotFound('Invalid page.')
+        count = await queryset.acount()
+        if page < 1 or (page > 1 and (page - 1) * page_size >= count):
+            raise exceptions.NotFound('Invalid page.')
+
+        offset = (page - 1) * page_size
+        pks = [pk async for pk in queryset.values_list('pk', flat=True)[offset:offset + page_size]]
+        url = request.build_absolute_uri()
+        return {
+            'count': count,
+            'count_exact': True,
+            'next': replace_query_param(url, 'page', page + 1) if offset + page_size < count else None,
+            'previous': (
+                None if page == 1
+                else remove_query_param(url, 'page') if page == 2
+                else replace_query_param(url, 'page', page - 1)
+            ),
+            'results': await self.rows(pks),
+        }
@@ -0,0 +1,125 @@
+"""
+Batched GET sub-requests (``POST /api/batch/``).
+
+Each sub-request is resolved with the URL resolver and passed straight to its
+view, skipping the middleware stack. Each one reads the database its view would
+read on a direct call: the primary, unless the view sets ``replica_reads``
+(see ``core.replicas``). They share the batch request's user
+(``BatchAuthentication``), so the JWT is verified once and the user's groups
+are loaded once for the permission checks (``core.permissions.user_group_names``). JSON bodies are
+spliced into the batch response as they are (``core.renderers.PreEncoded``).
+Only synchronous views with complete responses can be batched: ``/api/async/``
+paths and streaming responses get a 400 for that sub-request.
+
+Under ASGI, with ``BATCH_MAX_WORKERS`` above 1, sub-requests run concurrently
+on a thread pool; each thread closes its database connections when done.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve, reverse
+from rest_framework import status
+from rest_framework.authentication import BaseAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .renderers import PreEncoded
+from .replicas import use_primary
+
+
+def sub_request(request, path, query):
+    # A GET that reuses the batch request's headers and authenticated user
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.GET = QueryDict(query)
+    sub.META = {
+        **request.META, 'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'CONTENT_LENGTH': '0',
+    }
+    sub.batch_auth = (request.user, request.auth)
+    return sub
+
+
+class BatchAuthentication(BaseAuthentication):
+    """
+    Authenticates a batch sub-request as the already authenticated batch
+    request; other requests fall through to the next authentication class.
+    """
+
+    def authenticate(self, request):
+        return getattr(request, 'batch_auth', None)
+
+    def authenticate_header(self, request):
+        # Listed first, so it decides the 401 challenge for every request
+        return JWTAuthentication().authenticate_header(request)
+
+
+def error(status_code, detail):
+    return status_code, {'detail': detail}
+
+
+def perform(request, url):
+    """Returns ``(status, body)`` for one sub-request."""
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path.startswith('/api/'):
+        return error(status.HTTP_400_BAD_REQUEST, 'Sub-request paths must be relative URLs under /api/.')
+    if parts.path == reverse('batch'):
+        return error(status.HTTP_400_BAD_REQUEST, 'Batches cannot be nested.')
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return error(status.HTTP_404_NOT_FOUND, 'Not found.')
+    if iscoroutinefunction(match.func):
+        # Calling it would only return a coroutine, and the change stream never ends
+        return error(status.HTTP_400_BAD_REQUEST, 'Async endpoints cannot be batched.')
+
+    view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    # The batch request may be on a replica; views that did not opt in read the primary, as they would directly
+    routing = nullcontext() if getattr(view_class, 'replica_reads', False) else use_primary()
+    with routing:
+        response = match.func(sub_request(request, parts.path, parts.query), *match.args, **match.kwargs)
+        if response.streaming:
+            response.close()
+            return error(status.HTTP_400_BAD_REQUEST, 'Streaming responses cannot be batched.')
+        if hasattr(response, 'render'):
+            response.render()
+    content_type = response.get('Content-Type', '').split(';')[0]
+    if content_type == 'application/json' or content_type.endswith('+json'):
+        return response.status_code, PreEncoded(response.content)
+    return response.status_code, response.content.decode(errors='replace')
+
+
+def _in_thread(request, url):
+    try:
+        return perform(request, url)
+    finally:
+        # Pool threads open their own connections; don't leave them open
+        connections.close_all()
+
+
+def run_batch(request, sub_requests):
+    """Returns a list of ``{'id', 'status', 'body'}`` in the order given."""
+    workers = min(settings.BATCH_MAX_WORKERS, len(sub_requests))
+    urls = [entry['path'] for entry in sub_requests]
+    if workers > 1 and isinstance(request._request, ASGIRequest):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each task runs in a copy of the context, so e.g. replica routing carries over
+            futures = [
+                executor.submit(contextvars.copy_context().run, _in_thread, request, url) for url in urls
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [perform(request, url) for url in urls]
+
+    return [
+        {'id': entry.get('id', index), 'status': status_code, 'body': body}
+        for index, (entry, (status_code, body)) in enumerate(zip(sub_requests, results))
+    ]
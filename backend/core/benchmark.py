@@ -0,0 +1,254 @@
+"""
+In-process API benchmarks.
+
+Seeds a synthetic dataset, drives each hot endpoint through the DRF test client
+and records latency percentiles and query counts per scenario, so results can be
+compared against a committed baseline file. Caches are cleared before every
+measured request, so ORM and serialization regressions show up; the
+``*_cached`` scenarios measure cache hits instead.
+"""
+
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from events.models import Event
+from itembookings.models import ItemBooking
+from items.models import Category, Item
+
+User = get_user_model()
+
+BENCHMARK_PASSWORD = 'benchmark-pass-123'
+
+CATEGORY_NAMES = ['Capes', 'Hats', 'Masks', 'Props', 'Jackets', 'Gloves', 'Decor', 'LED']
+COLORS = ['Red', 'Blue', 'Black', 'Gold', 'Silver', 'Green', 'White']
+LOCATIONS = ['Storage Room A', 'Storage Room B', 'Warehouse', 'Shelf C3', 'Wardrobe']
+VENUES = ['Central Park', 'Main Stage', 'Grand Hall', 'Riverside', 'Studio 4']
+WORDS = ['velvet', 'sequin', 'feather', 'leather', 'vintage', 'glitter', 'satin', 'neon']
+
+# Scenarios that keep the caches between requests; all others start every request cold
+CACHED_SCENARIOS = {'items_list_cached', 'items_detail_cached'}
+
+
+def percentile(values, pct):
+    # Linear interpolation between closest ranks, matching numpy's default
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def seed_dataset(size=500, seed=0):
+    """
+    Creates a deterministic dataset scaled by ``size`` (the number of items).
+
+    Events are a quarter of the item count and roughly one booking is created
+    per item, spread over past, current and future events.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    categories = [Category.objects.get_or_create(name=name)[0] for name in CATEGORY_NAMES]
+
+    items = Item.objects.bulk_create([
+        Item(
+            name=f'{rng.choice(WORDS).title()} {rng.choice(CATEGORY_NAMES)[:-1]} {i}',
+            description=' '.join(rng.choice(WORDS) for _ in range(30)),
+            quantity=rng.randint(5, 20),
+            category=rng.choice(categories),
+            color=rng.choice(COLORS),
+            location=rng.choice(LOCATIONS),
+        )
+        for i in range(size)
+    ])
+
+    events = []
+    for i in range(max(size // 4, 4)):
+        start = now + timedelta(days=rng.randint(-60, 120), hours=rng.randint(0, 23))
+        events.append(Event(
+            name=f'Event {i}',
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=rng.randint(2, 48)),
+            location=rng.choice(VENUES),
+            notes=' '.join(rng.choice(WORDS) for _ in range(40)),
+        ))
+    # bulk_create skips Event.save(), the generated windows are always valid
+    events = Event.objects.bulk_create(events)
+
+    pairs = set()
+    while len(pairs) < size:
+        pairs.add((rng.randrange(len(items)), rng.randrange(len(events))))
+    ItemBooking.objects.bulk_create([
+        ItemBooking(item=items[i], event=events[e], quantity=1) for i, e in sorted(pairs)
+    ])
+
+    manager_group, _ = Group.objects.get_or_create(name='Manager')
+    staff_group, _ = Group.objects.get_or_create(name='Staff')
+    manager = User.objects.create_user(username='bench-manager', password=BENCHMARK_PASSWORD)
+    manager.groups.add(manager_group)
+    staff = User.objects.create_user(username='bench-staff', password=BENCHMARK_PASSWORD)
+    staff.groups.add(staff_group)
+
+    return {
+        'items': [item.pk for item in items],
+        'events': [event.pk for event in events],
+        'categories': [category.pk for category in categories],
+        'manager': manager,
+        'staff': staff,
+    }
+
+
+def _authenticated_client(user):
+    client = APIClient()
+    token = RefreshToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+    return client
+
+
+def build_scenarios(dataset, seed=0):
+    """
+    Returns ``{name: callable}``; each callable performs one request and returns
+    the response. Read scenarios run as staff, writes as a manager.
+    """
+    rng = random.Random(seed)
+    staff = _authenticated_client(dataset['staff'])
+    manager = _authenticated_client(dataset['manager'])
+    anonymous = APIClient()
+
+    # Fresh item/event pairs so every create is accepted rather than rejected as a duplicate
+    free_items = Item.objects.filter(itembooking__isnull=True).values_list('pk', flat=True)
+    booking_pairs = iter([(item, event) for item in free_items for event in dataset['events']])
+
+    large_pages = max(len(dataset['items']) // 100, 1)
+
+    def create_booking():
+        item, event = next(booking_pairs)
+        return manager.post('/api/itembookings/', {'item': item, 'event': event, 'quantity': 1}, format='json')
+
+    return {
+        'items_list': lambda: staff.get('/api/items/'),
+        'items_list_large': lambda: staff.get('/api/items/', {'page_size': 100, 'page': rng.randint(1, large_pages)}),
+        'items_list_large_gzip': lambda: staff.get(
+            '/api/items/', {'page_size': 100, 'page': rng.randint(1, large_pages)}, HTTP_ACCEPT_ENCODING='gzip'
+        ),
+        'items_detail': lambda: staff.get(f"/api/items/{rng.choice(dataset['items'])}/"),
+        'items_list_cached': lambda: staff.get('/api/items/'),
+        'items_detail_cached': lambda: staff.get(f"/api/items/{dataset['items'][0]}/"),
+        'items_search': lambda: staff.get('/api/items/', {'search': rng.choice(WORDS)}),
+        'items_filter': lambda: staff.get('/api/items/', {
+            'category': rng.choice(dataset['categories']),
+            'location': 'storage',
+            'ordering': 'name',
+        }),
+        'events_list': lambda: staff.get('/api/events/'),
+        'events_detail': lambda: staff.get(f"/api/events/{rng.choice(dataset['events'])}/"),
+        'events_current_future': lambda: staff.get('/api/events/current-future/'),
+        'events_current_future_gzip': lambda: staff.get('/api/events/current-future/', HTTP_ACCEPT_ENCODING='gzip'),
+        'itembookings_list': lambda: staff.get('/api/itembookings/'),
+        'itembookings_create': create_booking,
+        'login': lambda: anonymous.post('/api/auth/login/', {
+            'username': 'bench-staff',
+            'password': BENCHMARK_PASSWORD,
+        }, format='json'),
+    }
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+def measure(request, iterations, warmup=1, cold=True):
+    # Times each call and counts the SQL it issues; warmup calls are discarded. With
+    # ``cold`` the caches are cleared (untimed) before each call, so it runs the full path
+    for _ in range(warmup):
+        request()
+
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        if cold:
+            clear_caches()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request()
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f'Benchmark request failed with {response.status_code}: {response.content[:200]!r}')
+        timings.append(elapsed * 1000)
+        queries.append(len(captured.captured_queries))
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': max(queries),
+    }
+
+
+def run_benchmarks(size=500, iterations=50, only=None, seed=0):
+    """
+    Seeds the current database and measures every scenario (or just ``only``).
+
+    Must run against a disposable database, the ``benchmark`` management command
+    takes care of creating and destroying a test database around it.
+    """
+    dataset = seed_dataset(size=size, seed=seed)
+    scenarios = build_scenarios(dataset, seed=seed)
+    results = {}
+    for name, request in scenarios.items():
+        if only and name not in only:
+            continue
+        # Password hashing dominates login, a handful of samples is representative
+        runs = min(iterations, 10) if name == 'login' else iterations
+        results[name] = measure(request, runs, cold=name not in CACHED_SCENARIOS)
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold=0.25):
+    """
+    Returns a list of regression messages for scenarios present in both runs.
+
+    Latency regresses when p50 or p95 grows by more than ``threshold`` (a
+    fraction); query counts are deterministic so any increase is reported.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if previous[metric] and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f'{name}: {metric} {current[metric]:.2f} vs baseline {previous[metric]:.2f} '
+                    f'(+{(current[metric] / previous[metric] - 1) * 100:.0f}%)'
+                )
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: queries {current['queries']} vs baseline {previous['queries']}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def write_baseline(path, results, metadata):
+    with open(path, 'w') as baseline_file:
+        json.dump({'metadata': metadata, 'scenarios': results}, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
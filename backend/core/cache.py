@@ -0,0 +1,135 @@
+"""
+Shared, versioned caching.
+
+Cached values are grouped (``items``, ``categories``, ``events``, ``bookings``,
+``availability``, ``roles``) and every key embeds the current version of the
+groups it depends on. Versions live in the shared cache backend (``CACHE_URL``,
+an unlogged Postgres table in production), so when a save or delete on one
+gunicorn worker bumps a version, every worker stops using the old entries at
+once; stale entries simply expire. With ``CACHE_INVALIDATION_LISTEN`` on
+Postgres, each worker also keeps the versions in process memory and drops them
+when ``core.notify`` relays a bump over ``LISTEN/NOTIFY``.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+
+from . import notify
+
+# Model changes -> groups whose cached data they make stale
+INVALIDATION_GROUPS = {
+    'items.Category': ('categories', 'items'),
+    'items.Item': ('items', 'bookings', 'availability'),
+    'events.Event': ('events', 'bookings', 'availability'),
+    'itembookings.ItemBooking': ('bookings', 'availability'),
+}
+
+ROLES = 'roles'
+
+DATABASE_CACHE_BACKEND = 'django.core.cache.backends.db.DatabaseCache'
+
+# Versions cached in this process, only trusted while the NOTIFY listener runs
+_local_versions = {}
+
+
+def version_key(group):
+    return f'cache-version:{group}'
+
+
+def group_versions(*groups):
+    if not notify.listening():
+        _local_versions.clear()
+        return tuple(_shared_versions(groups))
+
+    missing = [group for group in groups if group not in _local_versions]
+    if missing:
+        _local_versions.update(zip(missing, _shared_versions(missing)))
+    return tuple(_local_versions[group] for group in groups)
+
+
+def _shared_versions(groups):
+    found = cache.get_many([version_key(group) for group in groups])
+    versions = []
+    for group in groups:
+        version = found.get(version_key(group))
+        if version is None:
+            # Versions never expire; start at 1 the first time a group is seen
+            cache.add(version_key(group), 1, timeout=None)
+            version = cache.get(version_key(group), 1)
+        versions.append(version)
+    return versions
+
+
+def forget_local_versions(groups):
+    for group in groups:
+        _local_versions.pop(group, None)
+
+
+def bump(*groups):
+    """
+    Invalidates everything cached under ``groups``. Inside a transaction the
+    bump happens now and again after commit, so a reader that cached pre-commit
+    data in between is invalidated too; other workers are notified after commit.
+    """
+    _bump(groups)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(groups, publish=True))
+    else:
+        notify.publish(groups)
+
+
+def _bump(groups, publish=False):
+    for group in groups:
+        try:
+            cache.incr(version_key(group))
+        except ValueError:
+            cache.add(version_key(group), 2, timeout=None)
+    forget_local_versions(groups)
+    if publish:
+        notify.publish(groups)
+
+
+def versioned_key(name, groups, *parts):
+    versions = '.'.join(str(version) for version in group_versions(*groups))
+    return ':'.join([name, versions, *(str(part) for part in parts)])
+
+
+def get_or_compute(name, groups, compute, *parts, timeout=None):
+    """Returns the cached value for ``name``/``parts``, computing and storing it on a miss."""
+    key = versioned_key(name, groups, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def invalidate_model(sender, **kwargs):
+    groups = INVALIDATION_GROUPS.get(sender._meta.label)
+    if groups:
+        bump(*groups)
+
+
+def invalidate_roles(sender, **kwargs):
+    bump(ROLES)
+
+
+def create_unlogged_cache_tables(using='default', **kwargs):
+    """
+    post_migrate receiver: creates the database cache tables in ``CACHES`` on
+    Postgres as unlogged tables. Cache rows are disposable, so skipping the WAL
+    makes cache writes much cheaper.
+    """
+    connection = connections[using]
+    tables = [
+        config['LOCATION'] for config in settings.CACHES.values() if config['BACKEND'] == DATABASE_CACHE_BACKEND
+    ]
+    if connection.vendor != 'postgresql' or not tables:
+        return
+    call_command('createcachetable', database=using, verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relname FROM pg_class WHERE relname = ANY(%s) AND relpersistence = 'p'", [tables])
+        for (table,) in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {connection.ops.quote_name(table)} SET UNLOGGED')
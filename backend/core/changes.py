@@ -0,0 +1,148 @@
+"""
+Live change notifications for the server-sent events stream (``/api/async/changes/``).
+
+Saving or deleting an item, event or booking publishes a compact JSON
+message once the transaction commits, e.g.
+``{"type": "booking", "action": "updated", "id": 7, "item": 3, "event": 5, "available": 2}``
+where ``available`` is the item's free quantity over the booking's event.
+The in-process ``broadcaster`` hands each message to every stream connected
+to this worker. With ``CHANGE_STREAM_LISTEN`` on (Postgres only), messages
+go out over ``LISTEN/NOTIFY`` instead and every worker's listener relays them
+to its own streams (see ``core.notify``).
+
+A stream that falls too far behind, or a worker whose listener reconnects,
+gets a ``resync`` event instead: the client should refetch what it shows.
+"""
+
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from . import notify
+
+CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+
+MESSAGE_TYPES = {'items.Item': 'item', 'events.Event': 'event', 'itembookings.ItemBooking': 'booking'}
+
+RESYNC_FRAME = 'event: resync\ndata: {}\n\n'
+
+
+class Subscription:
+    # One connected stream; frames are queued on the stream's event loop
+    max_pending = 100
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(self.max_pending)
+
+    def put(self, frame):
+        if self.queue.full():
+            # Too far behind to catch up message by message
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            frame = RESYNC_FRAME
+        self.queue.put_nowait(frame)
+
+
+class Broadcaster:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def deliver(self, payload):
+        # Called from any thread with an encoded message
+        self.send_frame(f'event: change\ndata: {payload}\n\n')
+
+    def resync(self):
+        self.send_frame(RESYNC_FRAME)
+
+    def send_frame(self, frame):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, frame)
+            except RuntimeError:
+                self.unsubscribe(subscription)  # its event loop has closed
+
+
+broadcaster = Broadcaster()
+
+
+def relayed():
+    return getattr(settings, 'CHANGE_STREAM_LISTEN', False)
+
+
+def publish(message):
+    payload = json.dumps(message, separators=(',', ':'))
+    if not (relayed() and notify.send(notify.CHANGES_CHANNEL, payload)):
+        broadcaster.deliver(payload)
+
+
+def describe(instance, message):
+    """Completes the message for a committed item or event change."""
+    if message['action'] == DELETED:
+        return message
+    if message['type'] == 'item':
+        message['quantity'] = instance.quantity
+    elif message['type'] == 'event':
+        message['start'] = instance.start_datetime.isoformat()
+        message['end'] = instance.end_datetime.isoformat()
+    return message
+
+
+def describe_booking(instance, message):
+    """Adds the item's new available quantity over the booking's event."""
+    from itembookings.models import ItemBooking
+
+    # The booking's item or event may have been deleted along with it
+    item, event = getattr(instance, 'item', None), getattr(instance, 'event', None)
+    if item is not None and event is not None:
+        booked = ItemBooking.booked_quantity(item, event.start_datetime, event.end_datetime)
+        message['available'] = item.quantity - booked
+    return message
+
+
+def record_change(sender, instance, created=None, **kwargs):
+    # Nobody can receive the message: skip the work
+    if not (relayed() or broadcaster.has_subscribers()):
+        return
+    action = DELETED if created is None else CREATED if created else UPDATED
+    message_type = MESSAGE_TYPES[sender._meta.label]
+    # The pk is cleared once a delete completes, so the message starts out here
+    message = {'type': message_type, 'action': action, 'id': instance.pk}
+    if message_type == 'booking':
+        message.update(item=instance.item_id, event=instance.event_id)
+    build = describe_booking if message_type == 'booking' else describe
+    transaction.on_commit(lambda: publish(build(instance, message)), robust=True)
+
+
+async def stream(heartbeat_seconds):
+    """Yields server-sent event frames until the client disconnects."""
+    subscription = broadcaster.subscribe()
+    try:
+        # Subscribed before the first frame, so nothing after it is missed
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'  # keeps proxies from closing an idle connection
+    finally:
+        broadcaster.unsubscribe(subscription)
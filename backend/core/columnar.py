@@ -0,0 +1,88 @@
+"""
+Columnar list responses: ``?format=columnar``, or ``Accept: application/vnd.columnar+json``.
+
+Instead of one object per row, a page carries each column once:
+``{"count": ..., "next": ..., "previous": ..., "columns": ["id", "name"],
+"data": {"id": [1, 2], "name": ["Tent", "Chair"]}}``. Values come straight
+from ``values_list()`` on the serializer fields' sources, so no model
+instances or serializers are built. Related objects are flattened into
+id columns plus the view's ``columnar_extra_columns`` (e.g. ``category`` and
+``category_name``). Pages may hold up to ``COLUMNAR_MAX_PAGE_SIZE`` rows, and
+``?fields=`` / ``?omit=`` choose the columns; ``?expand=`` is not supported.
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .expand import EXPAND_PARAM
+from .pagination import StandardPagination
+from .renderers import PreEncodedJSONRenderer
+
+COLUMNAR_FORMAT = 'columnar'
+
+
+class ColumnarJSONRenderer(PreEncodedJSONRenderer):
+    media_type = 'application/vnd.columnar+json'
+    format = COLUMNAR_FORMAT
+
+
+class ColumnarPagination(StandardPagination):
+    @property
+    def max_page_size(self):
+        return settings.COLUMNAR_MAX_PAGE_SIZE
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_exact': self.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            **data,
+        })
+
+
+def column_paths(serializer, extra=None):
+    """
+    Returns ``{column: values_list path}`` for the serializer's readable fields,
+    plus the ``extra`` columns whose related field is among them.
+    """
+    columns = {}
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        # A foreign key's source is its name, which values_list() reads as the id
+        columns[name] = field.source.replace('.', '__')
+    for name, path in (extra or {}).items():
+        if path.split('__')[0] in columns:
+            columns[name] = path
+    return columns
+
+
+def to_columns(columns, rows):
+    names = list(columns)
+    values = list(zip(*rows)) if rows else [()] * len(names)
+    return {'columns': names, 'data': {name: list(column) for name, column in zip(names, values)}}
+
+
+class ColumnarListMixin:
+    # {column: values_list path} added next to the related field it describes
+    columnar_extra_columns = {}
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list':
+            renderers.append(ColumnarJSONRenderer())
+        return renderers
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != COLUMNAR_FORMAT:
+            return super().list(request, *args, **kwargs)
+        if request.query_params.get(EXPAND_PARAM):
+            raise ValidationError({EXPAND_PARAM: ['Expansions are not available in the columnar format.']})
+
+        columns = column_paths(self.get_serializer(), self.columnar_extra_columns)
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = ColumnarPagination()
+        rows = paginator.paginate_queryset(queryset.values_list(*columns.values()), request, view=self)
+        return paginator.get_paginated_response(to_columns(columns, rows))
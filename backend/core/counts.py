@@ -0,0 +1,45 @@
+"""
+Row counts for paginated lists without a ``COUNT(*)`` on every page.
+
+An unfiltered list of a table the Postgres planner estimates at
+``PAGINATION_ESTIMATE_THRESHOLD`` rows or more is counted from
+``pg_class.reltuples`` (kept up to date by autovacuum), and the response says
+``"count_exact": false``. Other counts are exact and cached per view and
+filter signature (the count query's SQL and parameters) under the view's cache
+groups (``core.cache``), so paging through a filtered list counts it once and
+any write to those tables counts it again.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.db import connections
+
+from .cache import get_or_compute
+
+
+def estimated_count(queryset):
+    """Returns the planner's row estimate for an unfiltered queryset of a large table, or None."""
+    threshold = settings.PAGINATION_ESTIMATE_THRESHOLD
+    query = queryset.query
+    if not threshold or query.where or query.distinct or query.combinator or query.is_sliced:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 until the table is first analyzed
+    if row is None or row[0] < threshold:
+        return None
+    return int(row[0])
+
+
+def filter_signature(queryset):
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    return hashlib.sha256(repr((sql, params)).encode()).hexdigest()
+
+
+def cached_count(name, groups, queryset):
+    return get_or_compute(f'count:{name}', groups, queryset.count, filter_signature(queryset))
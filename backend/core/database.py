@@ -0,0 +1,53 @@
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+POSTGRES_ENGINE = 'django.db.backends.postgresql'
+
+
+def database_settings(url, debug, conn_max_age=None, pool=False, pool_min_size=2, pool_max_size=4,
+                      pool_timeout=10, pgbouncer=False):
+    """
+    Builds a DATABASES entry from a database URL.
+
+    Without ``pool`` connections persist for ``conn_max_age`` seconds (600 in
+    production, 60 in development by default) with health checks, so a dropped
+    connection is replaced instead of failing the next request. With ``pool`` on
+    Postgres, Django 5.1's psycopg connection pool is used instead: each gunicorn
+    worker keeps ``pool_min_size``..``pool_max_size`` open connections (size it to
+    the worker's thread count) that are checked before being handed out.
+    ``pgbouncer`` makes the settings safe behind PgBouncer in transaction mode by
+    turning off server-side cursors; server-side prepared statements need no
+    setting, since Django leaves psycopg's ``prepare_threshold`` at None.
+    """
+    if conn_max_age is None:
+        conn_max_age = 60 if debug else 600
+
+    if not url:
+        return {}
+
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=conn_max_age,
+        conn_health_checks=conn_max_age > 0,
+        disable_server_side_cursors=pgbouncer,
+        ssl_require=not debug,  # required for Supabase
+    )
+    if config.get('ENGINE') != POSTGRES_ENGINE:
+        return config
+
+    options = config.setdefault('OPTIONS', {})
+    if pool:
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured('DB_POOL requires psycopg 3 with the pool extra (psycopg[pool]).')
+        # Django manages reuse through the pool, persistent connections must be off;
+        # with health checks on, the pool checks each connection before handing it out
+        config['CONN_MAX_AGE'] = 0
+        config['CONN_HEALTH_CHECKS'] = True
+        options['pool'] = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': pool_timeout,
+        }
+    return config
@@ -0,0 +1,109 @@
+"""
+List rows assembled as JSON by Postgres (``DATABASE_JSON_LISTS``).
+
+With the setting on and the list query running on Postgres, each row's JSON
+is built in the query with ``json_build_object`` from the serializer's fields
+(nested objects included) and passed through as bytes, so no model instances
+or serializers are created. ``DatabaseJSONMixin`` uses it for the rows a
+per-object cache (``core.objectcache``) is missing, or else for the whole page;
+on other databases, and for ``?fields=`` responses, the serializer path is used.
+
+Datetimes are written the way DRF writes them in UTC (``...T10:00:00Z``,
+microseconds only when non-zero), which is the project's ``TIME_ZONE``.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import Case, F, Func, JSONField, TextField, Value, When
+from django.db.models.functions import Cast
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .objectcache import CachedObjectMixin
+from .renderers import PreEncoded
+
+JSON_ANNOTATION = '_row_json'
+
+
+class JSONBuildObject(Func):
+    function = 'JSON_BUILD_OBJECT'
+    output_field = JSONField()
+
+
+class ISODateTime(Func):
+    # DRF's isoformat() output: fractional seconds only when there are some
+    template = (
+        "CASE WHEN to_char(%(expressions)s, 'US') = '000000' "
+        "THEN to_char(%(expressions)s AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS\"Z\"') "
+        "ELSE to_char(%(expressions)s AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US\"Z\"') END"
+    )
+    output_field = TextField()
+
+
+def json_object(serializer, prefix='', overrides=None):
+    """
+    Returns a ``json_build_object`` expression for the serializer's fields, read
+    through ``prefix`` (a relation path) and with ``overrides`` ({field: expression}).
+    """
+    overrides = overrides or {}
+    arguments = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in overrides:
+            expression = overrides[name]
+        elif field.source == '*':
+            raise ImproperlyConfigured(f'{type(serializer).__name__}.{name} has no column to read.')
+        else:
+            path = field.source.replace('.', '__')
+            expression = F(f'{prefix}__{path}' if prefix else path)
+            if isinstance(field, serializers.DateTimeField):
+                expression = ISODateTime(expression)
+        arguments += [Value(name), expression]
+    return JSONBuildObject(*arguments)
+
+
+def related_object(relation, serializer):
+    # The related row as nested JSON, or null without one
+    return Case(
+        When(**{f'{relation}__isnull': False}, then=json_object(serializer, prefix=relation)),
+        output_field=JSONField(),
+    )
+
+
+def json_rows(queryset, expression):
+    # The row JSON as text; json columns would be decoded by the driver
+    return queryset.annotate(**{JSON_ANNOTATION: Cast(expression, TextField())})
+
+
+def available(queryset):
+    return settings.DATABASE_JSON_LISTS and connections[queryset.db].vendor == 'postgresql'
+
+
+class DatabaseJSONMixin:
+    # {field: callable returning an expression} for fields not read from a column as they are
+    database_json_fields = {}
+
+    def row_json(self):
+        overrides = {name: build() for name, build in self.database_json_fields.items()}
+        return json_object(self.get_serializer_class()(), overrides=overrides)
+
+    def load_rows(self, pks):
+        queryset = self.get_queryset().filter(pk__in=pks)
+        if not available(queryset):
+            return super().load_rows(pks)
+        rows = json_rows(queryset, self.row_json()).values_list('pk', JSON_ANNOTATION)
+        return {pk: row.encode() for pk, row in rows}
+
+    def list(self, request, *args, **kwargs):
+        # Views with the per-object cache only load missing rows here (load_rows)
+        if isinstance(self, CachedObjectMixin) or not available(self.get_queryset()):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = json_rows(queryset, self.row_json()).values_list(JSON_ANNOTATION, flat=True)
+        page = self.paginate_queryset(rows)
+        rows = [PreEncoded(row.encode()) for row in (page if page is not None else rows)]
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
@@ -0,0 +1,92 @@
+"""
+Related data on demand: ``?expand=bookings``, ``?expand=bookings.item``.
+
+A view lists the paths it accepts in ``expandable`` and adds the matching
+``prefetch_related``/``select_related`` calls in ``expand_queryset``, so an
+expansion costs a constant number of queries however many rows are
+returned. Serializers declare how to render each expansion in ``expansions``.
+"""
+
+from rest_framework import mixins
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+EXPAND_PARAM = 'expand'
+
+
+def requested_expansions(query_params, available):
+    """
+    Returns the set of requested expansion paths (a nested path implies its
+    parents), or an empty set. Raises ``ValidationError`` for unknown paths.
+    """
+    paths = {
+        path.strip() for value in query_params.getlist(EXPAND_PARAM) for path in value.split(',') if path.strip()
+    }
+    unknown = sorted(paths - set(available))
+    if unknown:
+        raise ValidationError({
+            EXPAND_PARAM: [f"Unknown expansion(s): {', '.join(unknown)}. Available: {', '.join(available)}."]
+        })
+    expanded = set()
+    for path in paths:
+        parts = path.split('.')
+        expanded.update('.'.join(parts[:depth]) for depth in range(1, len(parts) + 1))
+    return expanded
+
+
+class ExpandableSerializerMixin:
+    # {name: (instance attribute, callable returning the serializer class)}; callables avoid import cycles
+    expansions = {}
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        expand = self.context.get('expand') or set()
+        for name, (attribute, get_serializer_class) in self.expansions.items():
+            if name not in expand:
+                continue
+            related = getattr(instance, attribute)
+            many = hasattr(related, 'all')
+            nested = {path[len(name) + 1:] for path in expand if path.startswith(f'{name}.')}
+            # ?fields= applies to the top-level objects only
+            context = {**self.context, 'expand': nested, 'fields': None}
+            representation[name] = get_serializer_class()(
+                related.all() if many else related, many=many, context=context
+            ).data
+        return representation
+
+
+class ExpandableMixin:
+    expandable = ()
+    # Cache groups (core.cache) of the related data expansions embed
+    expansion_cache_groups = ()
+
+    def get_expansions(self):
+        if self.request.method not in SAFE_METHODS:
+            return set()
+        if not hasattr(self, '_expansions'):
+            self._expansions = requested_expansions(self.request.query_params, self.expandable)
+        return self._expansions
+
+    def expand_queryset(self, queryset, expand):
+        return queryset
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        expand = self.get_expansions()
+        return self.expand_queryset(queryset, expand) if expand else queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = self.get_expansions()
+        return context
+
+    # Expanded responses bypass the per-object cache, which holds plain representations
+    def list(self, request, *args, **kwargs):
+        if not self.get_expansions():
+            return super().list(request, *args, **kwargs)
+        return mixins.ListModelMixin.list(self, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.get_expansions():
+            return super().retrieve(request, *args, **kwargs)
+        return mixins.RetrieveModelMixin.retrieve(self, request, *args, **kwargs)
@@ -0,0 +1,118 @@
+"""
+Sparse fieldsets: ``?fields=name,start_datetime`` or ``?omit=notes``.
+
+Requested names are validated against the serializer's fields. The
+serializer then drops the other fields, and the queryset loads only the
+columns those fields read (``.only()``), dropping ``select_related`` joins
+no selected field needs.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import mixins
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _names(query_params, param):
+    return {name.strip() for value in query_params.getlist(param) for name in value.split(',') if name.strip()}
+
+
+def selected_fields(query_params, available):
+    """
+    Returns the set of selected field names, or None when the request selects
+    nothing (neither parameter given). Raises ``ValidationError`` for unknown names.
+    """
+    fields, omit = _names(query_params, FIELDS_PARAM), _names(query_params, OMIT_PARAM)
+    if not fields and not omit:
+        return None
+
+    errors = {}
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = sorted(names - set(available))
+        if unknown:
+            errors[param] = [f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}."]
+    if errors:
+        raise ValidationError(errors)
+    return (fields or set(available)) - omit
+
+
+def only_paths(serializer, names):
+    """
+    Returns the model field paths the selected serializer fields read, or
+    None when one of them is computed (``source='*'`` or a non-field attribute).
+    """
+    model = serializer.Meta.model
+    paths = {model._meta.pk.name}
+    for name in names:
+        source = serializer.fields[name].source
+        if source == '*':
+            return None
+        path = source.replace('.', '__')
+        try:
+            field = model._meta.get_field(path.split('__')[0])
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        paths.add(path)
+    return sorted(paths)
+
+
+def restrict_queryset(queryset, serializer, names, extra=()):
+    paths = only_paths(serializer, names)
+    if paths is None:
+        return queryset
+
+    paths = sorted(set(paths) | set(extra))
+    related = queryset.query.select_related
+    if isinstance(related, dict):
+        # A deferred relation can't be joined; keep only the joins a selected field reads
+        roots = {path.split('__')[0] for path in paths}
+        queryset = queryset.select_related(None).select_related(*[name for name in related if name in roots])
+    return queryset.only(*paths)
+
+
+class SparseFieldsetSerializerMixin:
+    # Drops the fields a view did not select (context['fields'])
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+
+class SparseFieldsetMixin:
+    def get_selected_fields(self):
+        # Reads only: write responses always carry the full representation
+        if self.request.method not in SAFE_METHODS:
+            return None
+        if not hasattr(self, '_selected_fields'):
+            self._selected_fields = selected_fields(self.request.query_params, self.get_serializer_class()().fields)
+        return self._selected_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_selected_fields()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        names = self.get_selected_fields()
+        if names is None:
+            return queryset
+        return restrict_queryset(queryset, self.get_serializer_class()(), names)
+
+    # Sparse responses bypass the per-object cache, which holds full representations
+    def list(self, request, *args, **kwargs):
+        if self.get_selected_fields() is None:
+            return super().list(request, *args, **kwargs)
+        return mixins.ListModelMixin.list(self, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.get_selected_fields() is None:
+            return super().retrieve(request, *args, **kwargs)
+        return mixins.RetrieveModelMixin.retrieve(self, request, *args, **kwargs)
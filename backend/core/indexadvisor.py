@@ -0,0 +1,333 @@
+"""
+Index advisor.
+
+Reads an observed workload (queries recorded locally with ``QueryRecorder``, e.g.
+by ``manage.py benchmark --record-queries``, or Postgres' ``pg_stat_statements``),
+maps the filtered, ranged, ``LIKE``-searched and ordered columns back to the
+models in ``items``, ``events`` and ``itembookings`` and proposes btree,
+partial or trigram indexes that no existing index already covers. Proposals are
+ranked by the recorded time spent in the queries they would serve; with
+``what_if`` on Postgres each one is also built inside a rolled-back transaction
+to compare planner costs before and after.
+"""
+
+import hashlib
+import json
+import re
+import time
+from contextlib import ExitStack
+
+from django.apps import apps
+from django.db import connections, transaction
+
+COLUMN = r'"(?P<table>\w+)"\."(?P<column>\w+)"'
+EQUALITY = re.compile(COLUMN + r'\s*(?:=|IN)\s*(?!\s*")')
+RANGE = re.compile(COLUMN + r'\s*(?:<=|>=|<(?!>)|>)\s*(?!\s*")')
+LIKE = re.compile(r'(?:UPPER\()?' + COLUMN + r'(?:::text)?\)?\s+(?:I?LIKE)\b', re.IGNORECASE)
+IS_NULL = re.compile(COLUMN + r'\s+IS\s+NULL\b', re.IGNORECASE)
+ORDER_TERM = re.compile(COLUMN + r'(?:\s+(?P<direction>ASC|DESC))?', re.IGNORECASE)
+TABLE = re.compile(r'\b(?:FROM|JOIN)\s+"(?P<table>\w+)"', re.IGNORECASE)
+IN_LIST = re.compile(r'IN \((?:\s*(?:%s|\$\d+)\s*,?)+\)')
+CLAUSE_END = re.compile(r'\s(?:GROUP BY|HAVING|ORDER BY|LIMIT|OFFSET)\s', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    # Collapse whitespace and variable-length IN lists so identical shapes aggregate together
+    return IN_LIST.sub('IN (...)', ' '.join(sql.split()))
+
+
+class QueryRecorder:
+    """
+    Context manager that records every query issued on all connections,
+    aggregated by normalized SQL with one sample of parameters for EXPLAIN.
+    """
+
+    def __init__(self):
+        self.queries = {}
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            entry = self.queries.setdefault(normalize_sql(sql), {
+                'sql': sql,
+                'params': None if many else params,
+                'calls': 0,
+                'total_ms': 0.0,
+            })
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def entries(self):
+        return list(self.queries.values())
+
+    def save(self, path):
+        with open(path, 'w') as recording:
+            json.dump(self.entries(), recording, indent=2, default=str)
+
+
+def load_recording(path):
+    with open(path) as recording:
+        return json.load(recording)
+
+
+def load_pg_stat_statements(connection, limit=200):
+    # Normalized statements ($1 placeholders) for the current database, heaviest first
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT query, calls, total_exec_time
+            FROM pg_stat_statements
+            WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+              AND query ILIKE 'SELECT%%'
+            ORDER BY total_exec_time DESC
+            LIMIT %s
+            """,
+            [limit],
+        )
+        return [
+            {'sql': sql, 'params': None, 'calls': calls, 'total_ms': total_ms}
+            for sql, calls, total_ms in cursor.fetchall()
+        ]
+
+
+def parse_query(sql):
+    """
+    Extracts the columns a SELECT filters, ranges, searches and orders on.
+
+    Tailored to the SQL Django generates (fully qualified, double-quoted
+    columns); returns ``None`` for anything that isn't a SELECT.
+    """
+    sql = ' '.join(sql.split())
+    if not sql.upper().startswith('SELECT'):
+        return None
+
+    where = ''
+    where_start = re.search(r'\sWHERE\s', sql, re.IGNORECASE)
+    if where_start:
+        rest = sql[where_start.end():]
+        end = CLAUSE_END.search(rest)
+        where = rest[:end.start()] if end else rest
+
+    order_by = []
+    order_start = re.search(r'\sORDER BY\s', sql, re.IGNORECASE)
+    if order_start:
+        rest = sql[order_start.end():]
+        end = re.search(r'\s(?:LIMIT|OFFSET)\s', rest, re.IGNORECASE)
+        for term in (rest[:end.start()] if end else rest).split(','):
+            match = ORDER_TERM.search(term)
+            if match:
+                order_by.append((match['table'], match['column'], (match['direction'] or 'ASC').upper() == 'DESC'))
+
+    predicates = []
+    for kind, pattern in (('like', LIKE), ('eq', EQUALITY), ('range', RANGE), ('null', IS_NULL)):
+        for match in pattern.finditer(where):
+            predicate = (match['table'], match['column'], kind)
+            if predicate not in predicates:
+                predicates.append(predicate)
+
+    return {
+        'tables': set(TABLE.findall(sql)),
+        'predicates': predicates,
+        'order_by': order_by,
+        'limit': bool(re.search(r'\sLIMIT\s', sql, re.IGNORECASE)),
+    }
+
+
+def table_models():
+    return {model._meta.db_table: model for model in apps.get_models()}
+
+
+def field_name(model, column):
+    for field in model._meta.concrete_fields:
+        if field.column == column:
+            return field.name
+    return column
+
+
+def existing_indexes(connection, table):
+    """
+    Returns ``[{'name', 'columns', 'trigram'}]`` for the table's indexes,
+    including primary keys and unique constraints.
+    """
+    indexes = []
+    with connection.cursor() as cursor:
+        for name, info in connection.introspection.get_constraints(cursor, table).items():
+            if info['index'] or info['primary_key'] or info['unique']:
+                indexes.append({'name': name, 'columns': [c for c in info['columns'] if c], 'trigram': False})
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s', [table])
+            for name, definition in cursor.fetchall():
+                if 'gin_trgm_ops' in definition:
+                    column = re.search(r'upper\(\(?"?(\w+)"?\)?(?:::text)?', definition, re.IGNORECASE)
+                    indexes.append({'name': name, 'columns': [column.group(1)] if column else [], 'trigram': True})
+    return indexes
+
+
+def is_covered(columns, kind, indexes, equality_prefix=0):
+    # Equality columns may appear in any order in an existing index's leading columns
+    if kind == 'trigram':
+        return any(index['trigram'] and index['columns'] == columns for index in indexes)
+    for index in indexes:
+        existing = index['columns']
+        if index['trigram'] or len(existing) < len(columns):
+            continue
+        if (set(existing[:equality_prefix]) == set(columns[:equality_prefix])
+                and existing[equality_prefix:len(columns)] == columns[equality_prefix:]):
+            return True
+    return False
+
+
+def candidates_for(parsed):
+    # Yields (table, kind, columns, where, equality prefix length) for every index that would serve this query
+    by_table = {}
+    for table, column, kind in parsed['predicates']:
+        by_table.setdefault(table, {'eq': [], 'range': [], 'like': [], 'null': []})[kind].append(column)
+
+    order_tables = {table for table, _, _ in parsed['order_by']}
+    single_table_order = len(order_tables) == 1 and parsed['limit']
+    order_columns = [column for _, column, _ in parsed['order_by']]
+
+    for table in sorted(set(by_table) | (order_tables if single_table_order else set())):
+        columns = by_table.get(table, {'eq': [], 'range': [], 'like': [], 'null': []})
+        equality = [column for column in columns['eq'] if column != 'id']
+        btree = list(equality)
+        if columns['range']:
+            btree.append(columns['range'][0])
+        elif single_table_order and table in order_tables:
+            # Equality prefix + ORDER BY lets a LIMITed page stream from the index without sorting
+            btree += [column for column in order_columns if column not in btree]
+        where = ' AND '.join(f'{column} IS NULL' for column in columns['null']) or None
+        if btree:
+            yield table, 'partial' if where else 'btree', btree, where, len(equality)
+        for column in columns['like']:
+            yield table, 'trigram', [column], None, 0
+
+
+def index_name(table, columns, kind):
+    digest = hashlib.md5(f'{table}:{columns}:{kind}'.encode()).hexdigest()[:6]
+    return f"{table.split('_', 1)[-1][:10]}_{'_'.join(columns)[:12]}_{digest}"
+
+
+def describe(model, table, kind, columns, where, name):
+    # Returns (CREATE INDEX statement, Django Meta.indexes snippet)
+    if kind == 'trigram':
+        column = columns[0]
+        return (
+            f'CREATE INDEX CONCURRENTLY {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)',
+            f"GinIndex(OpClass(Upper('{field_name(model, column)}'), name='gin_trgm_ops'), name='{name}')  # Postgres only",
+        )
+    fields = [field_name(model, column) for column in columns]
+    sql = f"CREATE INDEX CONCURRENTLY {name} ON {table} ({', '.join(columns)})"
+    snippet = f'models.Index(fields={fields!r}, name={name!r})'
+    if where:
+        sql += f' WHERE {where}'
+        conditions = ', '.join(f"{field_name(model, c.split()[0])}__isnull=True" for c in where.split(' AND '))
+        snippet = f'models.Index(fields={fields!r}, condition=Q({conditions}), name={name!r})'
+    return sql, snippet
+
+
+def propose(queries, connection, tables=None):
+    """
+    Builds ranked index proposals from recorded ``queries``.
+
+    Only tables that belong to a model are considered (restricted to
+    ``tables`` when given); proposals an existing index already covers are dropped.
+    """
+    models_by_table = table_models()
+    index_cache = {}
+    proposals = {}
+    total_ms = sum(query['total_ms'] for query in queries) or 1.0
+
+    for query in queries:
+        parsed = parse_query(query['sql'])
+        if not parsed:
+            continue
+        for table, kind, columns, where, equality_prefix in candidates_for(parsed):
+            model = models_by_table.get(table)
+            if model is None or (tables and table not in tables):
+                continue
+            if table not in index_cache:
+                index_cache[table] = existing_indexes(connection, table)
+            if is_covered(columns, kind, index_cache[table], equality_prefix):
+                continue
+            key = (table, kind, tuple(columns), where)
+            if key not in proposals:
+                name = index_name(table, columns, kind)
+                sql, snippet = describe(model, table, kind, columns, where, name)
+                proposals[key] = {
+                    'model': model._meta.label,
+                    'table': table,
+                    'kind': kind,
+                    'fields': [field_name(model, column) for column in columns],
+                    'columns': columns,
+                    'where': where,
+                    'sql': sql,
+                    'django': snippet,
+                    'calls': 0,
+                    'served_ms': 0.0,
+                    'queries': [],
+                }
+            proposal = proposals[key]
+            proposal['calls'] += query['calls']
+            proposal['served_ms'] += query['total_ms']
+            proposal['queries'].append(query)
+
+    ranked = sorted(proposals.values(), key=lambda proposal: proposal['served_ms'], reverse=True)
+    for proposal in ranked:
+        proposal['workload_share'] = round(proposal['served_ms'] / total_ms, 4)
+        proposal['served_ms'] = round(proposal['served_ms'], 2)
+    return ranked
+
+
+def plan_cost(cursor, sql, params):
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Total Cost']
+
+
+def what_if(proposals, connection):
+    """
+    Postgres only: builds each proposed index inside a transaction that is
+    rolled back and compares planner cost for the served queries that have
+    recorded parameters. Adds ``cost_before``, ``cost_after`` and
+    ``est_saving_ms`` (recorded time scaled by the relative cost drop).
+    Index builds lock the table against writes, use on a local or staging copy.
+    """
+    if connection.vendor != 'postgresql':
+        return proposals
+    for proposal in proposals:
+        samples = [query for query in proposal['queries'] if query['params'] is not None]
+        if not samples:
+            continue
+        create = proposal['sql'].replace(' CONCURRENTLY', '')
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                before = [plan_cost(cursor, query['sql'], query['params']) for query in samples]
+                if proposal['kind'] == 'trigram':
+                    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                cursor.execute(create)
+                after = [plan_cost(cursor, query['sql'], query['params']) for query in samples]
+            transaction.set_rollback(True, using=connection.alias)
+        proposal['cost_before'] = round(sum(before), 2)
+        proposal['cost_after'] = round(sum(after), 2)
+        proposal['est_saving_ms'] = round(sum(
+            query['total_ms'] * max(0.0, 1 - cost_after / cost_before)
+            for query, cost_before, cost_after in zip(samples, before, after) if cost_before
+        ), 2)
+    proposals.sort(key=lambda proposal: proposal.get('est_saving_ms', proposal['served_ms']), reverse=True)
+    return proposals
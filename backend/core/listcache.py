@@ -0,0 +1,93 @@
+"""
+Cached list responses.
+
+``CachedListMixin`` stores the rendered JSON of a viewset's ``list`` response
+under a key built from the canonicalized query string (sorted parameters,
+empty values dropped, case-insensitive filters and search lowercased) and the
+versions of the view's ``list_cache_groups``. A write to any of those tables
+bumps the version (see ``core.cache``), so a hit can return the stored bytes
+without running the filters, the count or the serializer.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .cache import versioned_key
+
+CASE_INSENSITIVE_LOOKUPS = {'icontains', 'iexact', 'istartswith', 'iendswith'}
+
+
+def canonical_query(query_params, case_insensitive=()):
+    parts = []
+    for name in sorted(query_params):
+        values = [value.strip() for value in query_params.getlist(name)]
+        if name in case_insensitive:
+            values = [' '.join(value.lower().split()) for value in values]
+        for value in sorted(value for value in values if value):
+            parts.append(f'{name}={value}')
+    return '&'.join(parts)
+
+
+class CachedListMixin:
+    list_cache_groups = ()
+
+    def case_insensitive_params(self):
+        params = {api_settings.SEARCH_PARAM}
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            params.update(
+                name for name, filter_ in filterset_class.base_filters.items()
+                if filter_.lookup_expr in CASE_INSENSITIVE_LOOKUPS
+            )
+        return params
+
+    def get_list_cache_groups(self):
+        groups = tuple(self.list_cache_groups)
+        # Pages with ?expand= (core.expand) also embed related rows
+        if groups and hasattr(self, 'get_expansions') and self.get_expansions():
+            groups += tuple(self.expansion_cache_groups)
+        return groups
+
+    def list_cache_key(self, request):
+        # Only JSON responses are cached; the browsable API is rendered per request
+        groups = self.get_list_cache_groups()
+        if not groups or not isinstance(request.accepted_renderer, JSONRenderer):
+            return None
+        query = canonical_query(request.query_params, self.case_insensitive_params())
+        # Pagination links are absolute, so the host is part of the key; so is the format, which
+        # may come from the Accept header (core.columnar)
+        renderer_format = request.accepted_renderer.format
+        digest = hashlib.sha256(f'{request.get_host()}?{query}#{renderer_format}'.encode()).hexdigest()
+        return versioned_key(f'list:{type(self).__name__}', groups, digest)
+
+    def list(self, request, *args, **kwargs):
+        key = self.list_cache_key(request)
+        if key is None:
+            return super().list(request, *args, **kwargs)
+
+        body = cache.get(key)
+        if body is not None:
+            return CachedJSONResponse(body, content_type=request.accepted_renderer.media_type)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # Store the bytes DRF renders anyway instead of rendering twice
+            def store(rendered):
+                cache.set(key, rendered.content, settings.LIST_CACHE_TIMEOUT)
+
+            response.add_post_render_callback(store)
+        return response
+
+
+class CachedJSONResponse(HttpResponse):
+    # Served as-is; ``data`` is decoded only if something (e.g. a test) asks for it
+    @property
+    def data(self):
+        return json.loads(self.content)
@@ -0,0 +1,306 @@
+"""
+Asyncio HTTP load generator.
+
+Fires a weighted mix of authenticated API requests at a running server (gunicorn,
+runserver or an ASGI server) from many concurrent virtual users and summarizes
+throughput, latency percentiles, error and overbooking-rejection rates per endpoint.
+Only the standard library is used so it runs anywhere the backend runs.
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from .benchmark import WORDS, percentile
+
+DEFAULT_MIX = {'browse': 5, 'search': 2, 'view_event': 2, 'create_booking': 1, 'login': 1}
+
+
+def parse_mix(value):
+    """
+    Parses ``"browse=5,search=2"`` into ``{'browse': 5, 'search': 2}``.
+    """
+    mix = {}
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action '{name}'. Choose from: {', '.join(DEFAULT_MIX)}.")
+        try:
+            mix[name] = int(weight) if weight else 1
+        except ValueError:
+            raise ValueError(f"Weight for '{name}' must be an integer.")
+        if mix[name] < 0:
+            raise ValueError(f"Weight for '{name}' must not be negative.")
+    if not any(mix.values()):
+        raise ValueError('The mix needs at least one action with a positive weight.')
+    return mix
+
+
+class HTTPConnection:
+    # Minimal keep-alive HTTP/1.1 client on asyncio streams, one per virtual user
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = parts.scheme == 'https'
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        reused = self.writer is not None
+        try:
+            return await asyncio.wait_for(self._request(method, path, body, headers), self.timeout)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+            # The server dropped an idle keep-alive socket; retry once on a fresh connection
+            return await asyncio.wait_for(self._request(method, path, body, headers), self.timeout)
+
+    async def _request(self, method, path, body, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+        payload = json.dumps(body).encode() if body is not None else b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host_header}',
+            'Accept: application/json',
+            'Connection: keep-alive',
+            f'Content-Length: {len(payload)}',
+        ]
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b'\r\n')
+        if not status_line:
+            raise ConnectionError('Server closed the connection')
+        status = int(status_line.split()[1])
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = b''
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readuntil(b'\r\n')
+                    break
+                content += await self.reader.readexactly(size)
+                await self.reader.readexactly(2)
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()
+            response_headers['connection'] = 'close'
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+
+class LoadGenerator:
+    """
+    Runs ``concurrency`` virtual users for ``duration`` seconds.
+
+    Reads run with the staff credentials and bookings with the manager
+    credentials (falling back to staff when no manager is given, in which
+    case booking attempts are counted as errors by the server's 403s).
+    """
+
+    def __init__(self, base_url, username, password, manager_username=None, manager_password=None,
+                 concurrency=10, duration=30, mix=None, seed=None, api_prefix='/api/'):
+        self.base_url = base_url.rstrip('/')
+        self.credentials = {'username': username, 'password': password}
+        self.manager_credentials = {
+            'username': manager_username or username,
+            'password': manager_password or password,
+        }
+        self.concurrency = concurrency
+        self.duration = duration
+        self.mix = mix or dict(DEFAULT_MIX)
+        self.rng = random.Random(seed)
+        self.api_prefix = '/' + api_prefix.strip('/') + '/'
+        self.samples = defaultdict(list)
+        self.created_bookings = []
+        self.item_ids = []
+        self.event_ids = []
+        self.item_pages = 1
+
+    def api(self, path, **params):
+        url = self.api_prefix + path
+        return f'{url}?{urlencode(params)}' if params else url
+
+    async def login(self, connection, credentials):
+        status, content = await connection.request('POST', '/api/auth/login/', credentials)
+        if status != 200:
+            raise RuntimeError(f"Login failed for '{credentials['username']}' with status {status}: {content[:200]!r}")
+        return json.loads(content)['access']
+
+    async def prepare(self):
+        # Logs in once and discovers ids to exercise, so workers never guess at missing rows
+        connection = HTTPConnection(self.base_url)
+        try:
+            self.token = await self.login(connection, self.credentials)
+            self.manager_token = await self.login(connection, self.manager_credentials)
+            headers = {'Authorization': f'Bearer {self.token}'}
+
+            status, content = await connection.request('GET', '/api/items/', headers=headers)
+            if status != 200:
+                raise RuntimeError(f'Could not list items (status {status}).')
+            page = json.loads(content)
+            self.item_pages = max(1, -(-page['count'] // max(len(page['results']), 1)))
+            self.item_ids = [item['id'] for item in page['results']]
+
+            status, content = await connection.request('GET', '/api/events/current-future/', headers=headers)
+            if status != 200:
+                raise RuntimeError(f'Could not list current and future events (status {status}).')
+            self.event_ids = [event['id'] for event in json.loads(content)]
+        finally:
+            await connection.close()
+
+    def choose_action(self):
+        actions = [name for name, weight in self.mix.items() if weight]
+        weights = [self.mix[name] for name in actions]
+        return self.rng.choices(actions, weights)[0]
+
+    async def perform(self, connection, action):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        if action == 'browse':
+            return await connection.request('GET', self.api('items/', page=self.rng.randint(1, self.item_pages)), headers=headers)
+        if action == 'search':
+            return await connection.request('GET', self.api('items/', search=self.rng.choice(WORDS)), headers=headers)
+        if action == 'view_event':
+            if not self.event_ids:
+                return await connection.request('GET', self.api('events/current-future/'), headers=headers)
+            return await connection.request('GET', self.api(f'events/{self.rng.choice(self.event_ids)}/'), headers=headers)
+        if action == 'create_booking':
+            if not self.item_ids or not self.event_ids:
+                raise RuntimeError('create_booking needs at least one item and one current or future event.')
+            body = {'item': self.rng.choice(self.item_ids), 'event': self.rng.choice(self.event_ids), 'quantity': 1}
+            status, content = await connection.request(
+                'POST', '/api/itembookings/', body, {'Authorization': f'Bearer {self.manager_token}'}
+            )
+            if status == 201:
+                self.created_bookings.append(json.loads(content)['id'])
+            return status, content
+        if action == 'login':
+            return await connection.request('POST', '/api/auth/login/', self.credentials)
+        raise ValueError(f'Unknown action {action}')
+
+    async def virtual_user(self, deadline):
+        connection = HTTPConnection(self.base_url)
+        try:
+            while time.perf_counter() < deadline:
+                action = self.choose_action()
+                start = time.perf_counter()
+                try:
+                    status, content = await self.perform(connection, action)
+                except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    status, content = 0, b''
+                    await connection.close()
+                self.samples[action].append((time.perf_counter() - start, status, classify(action, status, content)))
+        finally:
+            await connection.close()
+
+    async def cleanup(self):
+        # Removes bookings created during the run so repeated runs start from the same state
+        connection = HTTPConnection(self.base_url)
+        headers = {'Authorization': f'Bearer {self.manager_token}'}
+        try:
+            for booking_id in self.created_bookings:
+                await connection.request('DELETE', f'/api/itembookings/{booking_id}/', headers=headers)
+        finally:
+            await connection.close()
+
+    async def run(self, cleanup=False):
+        await self.prepare()
+        start = time.perf_counter()
+        deadline = start + self.duration
+        await asyncio.gather(*(self.virtual_user(deadline) for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - start
+        report = summarize(self.samples, elapsed)
+        report['concurrency'] = self.concurrency
+        if cleanup:
+            await self.cleanup()
+        return report
+
+
+def classify(action, status, content):
+    # Distinguishes expected business rejections from real failures
+    if status == 0 or status >= 500:
+        return 'error'
+    if action == 'create_booking' and status == 400:
+        try:
+            errors = json.loads(content)
+        except ValueError:
+            return 'error'
+        if 'quantity' in errors:
+            return 'overbooked'
+        if 'event' in errors:
+            return 'duplicate'
+    if status >= 400:
+        return 'error'
+    return 'ok'
+
+
+def summarize(samples, elapsed):
+    """
+    Builds the report from ``{action: [(seconds, status, outcome), ...]}``.
+    """
+    endpoints = {}
+    total = errors = 0
+    for action, rows in samples.items():
+        latencies = [seconds * 1000 for seconds, _, _ in rows]
+        outcomes = [outcome for _, _, outcome in rows]
+        count = len(rows)
+        total += count
+        errors += outcomes.count('error')
+        endpoints[action] = {
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'error_rate': round(outcomes.count('error') / count, 4) if count else 0.0,
+        }
+        if action == 'create_booking':
+            endpoints[action]['overbooking_rejection_rate'] = round(outcomes.count('overbooked') / count, 4) if count else 0.0
+            endpoints[action]['duplicate_rejection_rate'] = round(outcomes.count('duplicate') / count, 4) if count else 0.0
+
+    return {
+        'duration_s': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'endpoints': endpoints,
+    }
@@ -0,0 +1,111 @@
+import platform
+from contextlib import nullcontext
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from core.benchmark import compare_to_baseline, load_baseline, run_benchmarks, write_baseline
+from core.indexadvisor import QueryRecorder
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class DisableMigrations:
+    # Build the throwaway schema straight from the models, like pytest's --nomigrations
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the in-process API benchmark suite against a throwaway test database '
+        'and compares latency percentiles and query counts with the committed baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=500, help='Number of items to seed (events and bookings scale with it).')
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per scenario.')
+        parser.add_argument('--scenario', action='append', dest='scenarios', help='Only run the named scenario (repeatable).')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON file to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed latency growth as a fraction (0.25 = 25%%).')
+        parser.add_argument('--update-baseline', action='store_true', help='Write this run to the baseline file instead of comparing.')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error when a regression is found.')
+        parser.add_argument('--record-queries', help='Write the recorded query workload to this JSON file for index_advisor.')
+
+    def handle(self, *args, **options):
+        settings.MIGRATION_MODULES = DisableMigrations()
+        # A background snapshot rebuild would fill (and cull) the cache and compete for the CPU mid-run
+        settings.CATALOG_SNAPSHOT_REBUILD_DELAY = 0
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        # Recording times every query, which would skew the latencies of runs that don't ask for it
+        recorder = QueryRecorder() if options['record_queries'] else None
+        try:
+            with recorder or nullcontext():
+                results = run_benchmarks(
+                    size=options['size'],
+                    iterations=options['iterations'],
+                    only=options['scenarios'],
+                )
+            if recorder is not None:
+                # Advise against the seeded schema before the test database is destroyed
+                recorder.save(options['record_queries'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.print_results(results)
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            write_baseline(baseline_path, results, {
+                'size': options['size'],
+                'iterations': options['iterations'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'recorded_at': timezone.now().isoformat(),
+            })
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}; run with --update-baseline to create one.'))
+            return
+
+        baseline = load_baseline(baseline_path)
+        metadata = baseline.get('metadata', {})
+        if metadata.get('size') != options['size'] or metadata.get('database') != connection.vendor:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded with size={metadata.get('size')} on {metadata.get('database')}; "
+                'latency comparisons may not be meaningful.'
+            ))
+
+        regressions = compare_to_baseline(results, baseline.get('scenarios', {}), options['threshold'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
+            return
+
+        self.stdout.write(self.style.ERROR('Regressions against baseline:'))
+        for regression in regressions:
+            self.stdout.write(f'  {regression}')
+        if options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} benchmark regression(s) found.')
+
+    def print_results(self, results):
+        header = f"{'scenario':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'queries':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<24}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['mean_ms']:>10.2f}{stats['queries']:>9}"
+            )
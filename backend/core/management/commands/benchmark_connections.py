@@ -0,0 +1,73 @@
+import copy
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+from core.benchmark import percentile
+from core.database import POSTGRES_ENGINE
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the per-request connection cost against the configured Postgres database: '
+        'a new connection per request (CONN_MAX_AGE=0) versus checking one out of the psycopg pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--pool-size', type=int, default=4)
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options['database']].settings_dict
+        if settings_dict['ENGINE'] != POSTGRES_ENGINE:
+            raise CommandError('Connection benchmarks need a Postgres database.')
+
+        unpooled = copy.deepcopy(settings_dict)
+        unpooled['CONN_MAX_AGE'] = 0
+        unpooled['OPTIONS'].pop('pool', None)
+
+        pooled = copy.deepcopy(settings_dict)
+        pooled['CONN_MAX_AGE'] = 0
+        pooled['CONN_HEALTH_CHECKS'] = True
+        pooled['OPTIONS']['pool'] = {
+            **settings_dict['OPTIONS'].get('pool', {}),
+            'min_size': options['pool_size'],
+            'max_size': options['pool_size'],
+        }
+
+        results = {
+            'new connection': self.measure(unpooled, 'bench_unpooled', options['iterations']),
+            'pooled': self.measure(pooled, 'bench_pooled', options['iterations']),
+        }
+
+        self.stdout.write(f"{'mode':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for mode, timings in results.items():
+            self.stdout.write(
+                f'{mode:<16}{percentile(timings, 50):>10.2f}{percentile(timings, 95):>10.2f}{percentile(timings, 99):>10.2f}'
+            )
+        saved = percentile(results['new connection'], 50) - percentile(results['pooled'], 50)
+        self.stdout.write(self.style.SUCCESS(f'Pooling saves {saved:.2f} ms per request at the median.'))
+
+    def measure(self, settings_dict, alias, iterations):
+        # Each sample is what a request pays before and for its first query: connect, SELECT 1, release
+        backend = load_backend(settings_dict['ENGINE'])
+        connection = backend.DatabaseWrapper(settings_dict, alias)
+        timings = []
+        try:
+            if connection.pool:
+                # Exclude the one-off pool warm-up from the samples
+                connection.pool.open()
+                connection.pool.wait()
+            for _ in range(iterations):
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                connection.close()
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+            connection.close_pool()
+        return timings
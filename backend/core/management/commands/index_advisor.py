@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from core.indexadvisor import load_pg_stat_statements, load_recording, propose, what_if
+
+APP_TABLES = ('items_', 'events_', 'itembookings_')
+
+
+class Command(BaseCommand):
+    help = (
+        'Proposes composite, partial and trigram indexes for the items, events and itembookings '
+        'tables from an observed workload (a recording from "benchmark --record-queries" or '
+        'pg_stat_statements), ranked by the time spent in the queries each index would serve.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-file', action='append', default=[], dest='files', help='Recorded query JSON file (repeatable).')
+        parser.add_argument('--pg-stat-statements', action='store_true', help='Read the workload from pg_stat_statements.')
+        parser.add_argument('--limit', type=int, default=200, help='Statements to read from pg_stat_statements.')
+        parser.add_argument('--what-if', action='store_true', help='Postgres only: build each index in a rolled-back transaction and compare plan costs.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--json', dest='json_path', help='Also write the proposals to this JSON file.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        queries = []
+        for path in options['files']:
+            queries += load_recording(path)
+        if options['pg_stat_statements']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('pg_stat_statements is only available on Postgres.')
+            try:
+                queries += load_pg_stat_statements(connection, options['limit'])
+            except DatabaseError as error:
+                raise CommandError(f'Could not read pg_stat_statements (is the extension installed?): {error}')
+        if not queries:
+            raise CommandError('No workload given, use --from-file and/or --pg-stat-statements.')
+
+        with connection.cursor() as cursor:
+            tables = [table for table in connection.introspection.table_names(cursor) if table.startswith(APP_TABLES)]
+        proposals = propose(queries, connection, tables=tables)
+        if options['what_if']:
+            proposals = what_if(proposals, connection)
+
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS(f'{len(queries)} statements analysed, existing indexes cover them all.'))
+        for rank, proposal in enumerate(proposals, 1):
+            benefit = f"{proposal['served_ms']:.1f} ms served ({proposal['workload_share']:.1%} of workload), {proposal['calls']} calls"
+            if 'est_saving_ms' in proposal:
+                benefit += f", est. saving {proposal['est_saving_ms']:.1f} ms (cost {proposal['cost_before']} -> {proposal['cost_after']})"
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{rank}. {proposal['kind']} index on {proposal['model']}({', '.join(proposal['fields'])})"
+                + (f" WHERE {proposal['where']}" if proposal['where'] else '')
+            ))
+            self.stdout.write(f'   {benefit}')
+            self.stdout.write(f"   SQL:    {proposal['sql']}")
+            self.stdout.write(f"   Django: {proposal['django']}")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as report:
+                json.dump(
+                    [{key: value for key, value in proposal.items() if key != 'queries'} for proposal in proposals],
+                    report, indent=2,
+                )
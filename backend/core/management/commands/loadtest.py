@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import DEFAULT_MIX, LoadGenerator, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Fires a weighted mix of authenticated API requests at a running server from '
+        'concurrent asyncio virtual users and reports throughput, p50/p95/p99 latency, '
+        'error and overbooking-rejection rates per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        default_mix = ','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items())
+        parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the running server.')
+        parser.add_argument('--username', required=True, help='Staff (or any read-capable) user to log in as.')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--manager-username', help='Manager used for create_booking (defaults to --username).')
+        parser.add_argument('--manager-password')
+        parser.add_argument('--concurrency', type=int, default=10, help='Number of concurrent virtual users.')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to generate load for.')
+        parser.add_argument('--mix', default=default_mix, help=f'Weighted actions (default: {default_mix}).')
+        parser.add_argument('--api-prefix', default='/api/', help='Prefix for read endpoints, e.g. /api/async/.')
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible request sequence.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete bookings created during the run.')
+        parser.add_argument('--json', dest='json_path', help='Also write the report to this JSON file.')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        generator = LoadGenerator(
+            options['url'],
+            options['username'],
+            options['password'],
+            manager_username=options['manager_username'],
+            manager_password=options['manager_password'],
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            mix=mix,
+            seed=options['seed'],
+            api_prefix=options['api_prefix'],
+        )
+        try:
+            report = asyncio.run(generator.run(cleanup=options['cleanup']))
+        except (RuntimeError, OSError) as error:
+            raise CommandError(str(error))
+
+        self.print_report(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['requests']} requests in {report['duration_s']}s with {report['concurrency']} users: "
+            f"{report['throughput_rps']} req/s, error rate {report['error_rate']:.2%}"
+        )
+        header = f"{'endpoint':<18}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for action, stats in report['endpoints'].items():
+            self.stdout.write(
+                f"{action:<18}{stats['requests']:>10}{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.1f}"
+                f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['error_rate']:>9.2%}"
+            )
+        booking = report['endpoints'].get('create_booking')
+        if booking:
+            self.stdout.write(
+                f"create_booking rejections: {booking['overbooking_rejection_rate']:.2%} overbooked, "
+                f"{booking['duplicate_rejection_rate']:.2%} duplicate"
+            )
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes sync tombstones older than SYNC_TOMBSTONE_DAYS. Clients whose sync token is older '
+        'than that receive a full sync instead, so nothing they need is lost.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Keep this many days instead of SYNC_TOMBSTONE_DAYS.')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.SYNC_TOMBSTONE_DAYS
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+        self.stdout.write(f'Deleted {deleted} tombstone(s) older than {days} day(s).')
@@ -0,0 +1,195 @@
+import logging
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import MissingFileError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .querybudget import count_queries, get_query_budget, resolve_view_action, view_label
+from .replicas import _replica_alias, choose_replica, is_pinned, pin_user_to_primary
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware that runs in either mode, so an ASGI server keeps the
+    whole stack async and async views are not run in a thread per request.
+    Subclasses implement ``handle`` for sync and ``__acall__`` for async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class QueryBudgetMiddleware(AsyncCapableMiddleware):
+    # Logs a warning whenever a request issues more queries than its view's declared budget
+    def handle(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+        self.check_budget(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        # Connections are thread-local and the async ORM queries in the request's sync worker thread
+        # (one per request under ASGI), so the counter is installed on that thread's connections
+        counting = count_queries()
+        counter = await sync_to_async(counting.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counting.__exit__)(None, None, None)
+        self.check_budget(request, counter)
+        return response
+
+    def check_budget(self, request, counter):
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and counter.count > budget:
+            logger.warning(
+                'Query budget exceeded: %s issued %d queries (budget %d) for %s %s',
+                request._query_budget_label, counter.count, budget, request.method, request.path,
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class, action = resolve_view_action(view_func, request.method)
+        budget = get_query_budget(view_class, action)
+        if budget is not None:
+            request._query_budget = budget
+            request._query_budget_label = view_label(view_class, action)
+
+
+def token_user_id(request):
+    # User id from the JWT without touching the database (DRF authenticates again later)
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not header.startswith('Bearer '):
+        return None
+    try:
+        token = AccessToken(header.split(' ', 1)[1])
+    except TokenError:
+        return None
+    return token.get(jwt_settings.USER_ID_CLAIM)
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    # Routes reads of opted-in views (replica_reads = True) to a replica for safe-method requests
+    def handle(self, request):
+        response = self.get_response(request)
+        token = getattr(request, '_replica_token', None)
+        if token is not None:
+            _replica_alias.reset(token)
+        user_id = self.writer_id(request)
+        if user_id is not None:
+            pin_user_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        # process_view runs in a thread here and its context changes are copied back, so there
+        # is no token for this context to reset; the previous alias is restored by value
+        previous = _replica_alias.get()
+        response = await self.get_response(request)
+        _replica_alias.set(previous)
+        user_id = self.writer_id(request)
+        if user_id is not None:
+            await sync_to_async(pin_user_to_primary)(user_id)
+        return response
+
+    def writer_id(self, request):
+        # The user to pin to the primary after a write, when there are replicas
+        if getattr(request, '_read_only', request.method in SAFE_METHODS) or not settings.DATABASE_REPLICAS:
+            return None
+        return token_user_id(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        # read_only views (e.g. the batch endpoint) only read despite their method
+        request._read_only = request.method in SAFE_METHODS or getattr(view_class, 'read_only', False)
+        if not request._read_only or not getattr(view_class, 'replica_reads', False):
+            return None
+        alias = choose_replica()
+        if alias is None or is_pinned(token_user_id(request)):
+            return None
+        request._replica_token = _replica_alias.set(alias)
+        return None
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    # Compresses only bodies of at least GZIP_MIN_BYTES; smaller ones aren't worth the CPU
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response  # compressing would buffer the live stream
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_BYTES:
+            return response
+        return super().process_response(request, response)
+
+
+class SnapshotWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also serves catalog snapshots (``core.snapshot``). They are
+    written after startup, so they are looked up per request rather than
+    indexed once; their names carry a content hash, so they are cached forever.
+    """
+    sync_capable = True
+    async_capable = True
+    snapshot_name = re.compile(r'^catalog\.[0-9a-f]{32}\.json$')
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        static_file = self.find_static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Only requests that may touch the disk leave the event loop: indexed files are a dict lookup
+        if self.autorefresh or request.path_info.startswith(settings.CATALOG_SNAPSHOT_URL):
+            static_file = await sync_to_async(self.find_static_file)(request)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+    def find_static_file(self, request):
+        prefix = settings.CATALOG_SNAPSHOT_URL
+        if request.path_info.startswith(prefix):
+            static_file = self.find_snapshot(request.path_info[len(prefix):], request.path_info)
+            if static_file is not None:
+                return static_file
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    def find_snapshot(self, name, url):
+        if not self.snapshot_name.match(name):
+            return None
+        try:
+            return self.get_static_file(os.path.join(settings.CATALOG_SNAPSHOT_ROOT, name), url)
+        except MissingFileError:
+            return None
+
+    def immutable_file_test(self, path, url):
+        return url.startswith(settings.CATALOG_SNAPSHOT_URL) or super().immutable_file_test(path, url)
@@ -0,0 +1,14 @@
+from django.db import models
+
+
+class Tombstone(models.Model):
+    # A deleted item, event or booking, kept for SYNC_TOMBSTONE_DAYS so /api/sync/ can report it
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['deleted_at'])]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} deleted at {self.deleted_at}'
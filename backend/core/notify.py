@@ -0,0 +1,107 @@
+"""
+Cache invalidation bus over Postgres ``LISTEN/NOTIFY``.
+
+``publish`` sends the bumped cache groups once the change is committed. When
+``CACHE_INVALIDATION_LISTEN`` is on, each worker process starts one daemon
+thread with a dedicated connection that listens on the channel and drops the
+matching in-process cache versions (see ``core.cache``). The same thread
+relays live change notifications (``CHANGES_CHANNEL``) to the worker's
+change-stream clients when ``CHANGE_STREAM_LISTEN`` is on (see ``core.changes``).
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'cache_invalidation'
+CHANGES_CHANNEL = 'live_changes'
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def send(channel, payload):
+    """Sends ``payload`` on ``channel``; returns False when the database can't (not Postgres)."""
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [channel, payload])
+    return True
+
+
+def publish(groups):
+    send(CHANNEL, ','.join(groups))
+
+
+def handle_notification(payload):
+    from .cache import forget_local_versions
+    forget_local_versions([group for group in payload.split(',') if group])
+
+
+def dispatch(channel, payload):
+    if channel == CHANGES_CHANNEL:
+        from .changes import broadcaster
+        broadcaster.deliver(payload)
+    else:
+        handle_notification(payload)
+
+
+class InvalidationListener(threading.Thread):
+    retry_seconds = 1
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        super().__init__(name='cache-invalidation-listener', daemon=True)
+        self.alias = alias
+        self.connected = threading.Event()
+
+    def run(self):
+        import psycopg
+
+        while True:
+            try:
+                params = connections[self.alias].get_connection_params()
+                with psycopg.connect(**params, autocommit=True) as conn:
+                    conn.execute(f'LISTEN {CHANNEL}')
+                    conn.execute(f'LISTEN {CHANGES_CHANNEL}')
+                    self.connected.set()
+                    for notification in conn.notifies():
+                        dispatch(notification.channel, notification.payload)
+            except Exception:
+                logger.exception('Cache invalidation listener lost its connection; retrying')
+            # Notifications may have been missed while disconnected
+            self.connected.clear()
+            handle_notification(','.join(_all_groups()))
+            from .changes import broadcaster
+            broadcaster.resync()
+            time.sleep(self.retry_seconds)
+
+
+def _all_groups():
+    from .cache import _local_versions
+    return list(_local_versions)
+
+
+def listening(setting='CACHE_INVALIDATION_LISTEN'):
+    """
+    Starts the listener on first use in each worker process, if ``setting`` is
+    on, and reports whether it is connected.
+    """
+    global _listener
+    if not getattr(settings, setting, False):
+        return False
+    if connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+        return False
+    with _listener_lock:
+        # A forked worker does not inherit the parent's thread
+        if _listener is None or _listener.pid != os.getpid():
+            _listener = InvalidationListener()
+            _listener.pid = os.getpid()
+            _listener.start()
+    return _listener.connected.is_set()
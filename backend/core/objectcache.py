@@ -0,0 +1,132 @@
+"""
+Per-object read-through cache of serialized representations.
+
+``CachedObjectMixin`` serves ``retrieve`` from the cached representation of
+the object and assembles ``list`` pages from cached rows, querying and
+serializing only the rows that are missing. Rows are stored as JSON bytes and
+returned as ``PreEncoded`` values, which the renderer emits without
+re-encoding them. Entries are deleted by the
+``post_save``/``post_delete`` signals registered in ``CoreConfig`` (and for
+items, when their category is renamed or deleted); bulk ``QuerySet.update()``
+calls bypass signals and must call ``invalidate`` themselves.
+
+A cached representation is only returned once the object would also be found
+directly: a primary-key ``exists()`` check on ``filter_queryset()``, or the
+full ``get_object()`` (with ``check_object_permissions``) for views whose
+permission classes implement ``has_object_permission``.
+"""
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404
+from rest_framework import status
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+
+from .renderers import PreEncoded, PreEncodedJSONRenderer
+
+# Timeout of cached rows; invalidation is signal-driven, this only bounds memory use
+OBJECT_CACHE_TIMEOUT = 60 * 60
+
+_renderer = PreEncodedJSONRenderer()
+
+
+def object_key(model, pk):
+    return f'object:{model._meta.label_lower}:{pk}'
+
+
+def encode_rows(objects, serialize):
+    # {pk: JSON bytes} for freshly loaded objects
+    objects = list(objects)
+    return {obj.pk: _renderer.encode(data) for obj, data in zip(objects, serialize(objects))}
+
+
+def get_many(model, pks, fetch, serialize):
+    """
+    Returns the representations of ``pks`` in the same order, reading the
+    cache first; ``fetch(missing_pks)`` loads the rest and ``serialize(objects)``
+    turns them into representations that are cached for the next caller.
+    """
+    return get_many_encoded(model, pks, lambda missing: encode_rows(fetch(missing), serialize))
+
+
+def get_many_encoded(model, pks, load):
+    # get_many() for a ``load(missing_pks)`` that returns {pk: JSON bytes} itself
+    keys = {pk: object_key(model, pk) for pk in pks}
+    cached = cache.get_many(keys.values())
+    found = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in pks if pk not in found]
+    if missing:
+        fresh = load(missing)
+        cache.set_many({keys[pk]: encoded for pk, encoded in fresh.items()}, OBJECT_CACHE_TIMEOUT)
+        found.update(fresh)
+    return [PreEncoded(found[pk]) for pk in pks if pk in found]
+
+
+def invalidate(model, pks):
+    # Delete now and again after commit, so a reader caching pre-commit rows in between is corrected
+    keys = [object_key(model, pk) for pk in pks]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_object(sender, instance, **kwargs):
+    invalidate(sender, [instance.pk])
+
+
+def invalidate_category_items(sender, instance, created=False, **kwargs):
+    if created:
+        return  # no item references a new category yet
+    from items.models import Item
+    invalidate(Item, list(Item.objects.filter(category=instance).values_list('pk', flat=True)))
+
+
+class CachedObjectMixin:
+    def retrieve(self, request, *args, **kwargs):
+        model = self.queryset.model
+        try:
+            # Keyed on the pk value, as the invalidation signals are: /01/ and /1/ are the same object
+            pk = model._meta.pk.to_python(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValidationError:
+            return super().retrieve(request, *args, **kwargs)
+        key = object_key(model, pk)
+        encoded = cache.get(key)
+        if encoded is not None:
+            self.check_visible(pk)
+            return Response(PreEncoded(encoded))
+
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, _renderer.encode(response.data), OBJECT_CACHE_TIMEOUT)
+        return response
+
+    def check_visible(self, pk):
+        # A cache hit still 404s or is denied wherever a direct lookup would be
+        if any(
+            type(permission).has_object_permission is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        ):
+            self.get_object()
+        elif not self.filter_queryset(self.get_queryset()).filter(pk=pk).exists():
+            raise Http404
+
+    def list(self, request, *args, **kwargs):
+        # Filter, order and paginate primary keys only, then fill the page from the cache
+        queryset = self.filter_queryset(self.get_queryset())
+        pks = queryset.values_list('pk', flat=True)
+        page = self.paginate_queryset(pks)
+        rows = get_many_encoded(queryset.model, list(page if page is not None else pks), self.load_rows)
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
+
+    def load_rows(self, pks):
+        # {pk: JSON bytes} of the rows missing from the cache
+        return encode_rows(
+            self.get_queryset().filter(pk__in=pks), lambda objects: self.get_serializer(objects, many=True).data
+        )
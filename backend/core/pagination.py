@@ -0,0 +1,58 @@
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from .counts import cached_count, estimated_count
+
+
+class CountingPaginator(Paginator):
+    # Takes its count from count_rows(object_list) instead of a COUNT(*) per page
+    def __init__(self, object_list, per_page, count_rows, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_rows = count_rows
+
+    @cached_property
+    def count(self):
+        return self.count_rows(self.object_list)
+
+
+class StandardPagination(PageNumberPagination):
+    # PAGE_SIZE rows by default; clients may ask for up to max_page_size with ?page_size=
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountingPaginator(object_list, per_page, self.count_rows)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        self.count_exact = True
+        return super().paginate_queryset(queryset, request, view)
+
+    def count_rows(self, queryset):
+        # Estimated for large unfiltered tables, otherwise exact and cached (core.counts)
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+        estimate = estimated_count(queryset)
+        if estimate is not None:
+            self.count_exact = False
+            return estimate
+        groups = getattr(self.view, 'count_cache_groups', None) or getattr(self.view, 'list_cache_groups', ())
+        if not groups:
+            return queryset.count()
+        return cached_count(type(self.view).__name__, groups, queryset)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_exact': self.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count_exact'] = {'type': 'boolean', 'example': True}
+        return schema
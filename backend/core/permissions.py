@@ -1,17 +1,28 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
+from .cache import ROLES, get_or_compute
+
+def user_group_names(user):
+    # Group names come from the shared cache (invalidated on membership changes) and are kept for the request
+    if not hasattr(user, '_group_names'):
+        user._group_names = get_or_compute(
+            'roles', (ROLES,), lambda: set(user.groups.values_list('name', flat=True)), user.pk
+        )
+    return user._group_names
 
 class IsManagerOrStaffReadOnly(BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False # Unauthenticated users can't do anything
-        
+
         if request.user and request.user.is_superuser:
             return True # Superusers can do anything
-        
-        if request.user.groups.filter(name='Manager').exists():
+
+        groups = user_group_names(request.user)
+
+        if 'Manager' in groups:
             return True  # Managers can do anything
 
-        if request.method in SAFE_METHODS and request.user.groups.filter(name='Staff').exists():
+        if request.method in SAFE_METHODS and 'Staff' in groups:
             return True  # Staff can only view (GET, HEAD, OPTIONS)
 
         return False
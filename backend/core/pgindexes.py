@@ -0,0 +1,49 @@
+"""
+Postgres-only indexes that Django's ``Meta.indexes`` can't express portably.
+
+Migrations create them through ``create_postgres_indexes`` and do nothing on
+other databases. Tests run with ``--nomigrations``, so tests that depend on them
+(the query plan tests) call the same function against the test database.
+"""
+
+# name -> (CREATE statement, required extension or None)
+POSTGRES_INDEXES = {
+    # ItemFilter/SearchFilter icontains lookups compile to UPPER(col::text) LIKE UPPER('%term%')
+    'items_item_name_trgm': (
+        'CREATE INDEX IF NOT EXISTS items_item_name_trgm ON items_item USING gin (UPPER(name::text) gin_trgm_ops)',
+        'pg_trgm',
+    ),
+    'items_item_color_trgm': (
+        'CREATE INDEX IF NOT EXISTS items_item_color_trgm ON items_item USING gin (UPPER(color::text) gin_trgm_ops)',
+        'pg_trgm',
+    ),
+    'items_item_location_trgm': (
+        'CREATE INDEX IF NOT EXISTS items_item_location_trgm ON items_item USING gin (UPPER(location::text) gin_trgm_ops)',
+        'pg_trgm',
+    ),
+    # EventFilter ?overlaps= and the calendar compare tstzrange(start_datetime, end_datetime) spans (core.windows)
+    'events_event_window_gist': (
+        'CREATE INDEX IF NOT EXISTS events_event_window_gist ON events_event '
+        'USING gist (tstzrange(start_datetime, end_datetime))',
+        None,
+    ),
+}
+
+
+def create_postgres_indexes(connection, names):
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for name in names:
+            sql, extension = POSTGRES_INDEXES[name]
+            if extension:
+                cursor.execute(f'CREATE EXTENSION IF NOT EXISTS {extension}')
+            cursor.execute(sql)
+
+
+def drop_postgres_indexes(connection, names):
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
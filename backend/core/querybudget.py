@@ -0,0 +1,105 @@
+"""
+Per-view query budgets.
+
+Views declare the maximum number of SQL queries a request may issue per action,
+e.g. ``query_budgets = {'list': 4, 'retrieve': 3}`` on a viewset or
+``{'get': 3}`` on an APIView. Budgets count every query in the request,
+including JWT user lookup and the permission check, and must not depend on
+page size, so an N+1 shows up as soon as a list has more rows than the budget.
+They are enforced by ``assert_query_budget`` in tests and logged by
+``core.middleware.QueryBudgetMiddleware`` in production.
+"""
+
+from contextlib import contextmanager, ExitStack
+
+from django.db import connections
+from django.urls import get_resolver
+
+
+class QueryCounter:
+    # execute_wrapper hook that counts queries without needing DEBUG=True
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def resolve_view_action(view_func, method):
+    """
+    Returns ``(view_class, action)`` for a resolved view function, where action
+    is the viewset action (``list``, ``retrieve``...) or the lowercased HTTP
+    method for plain APIViews and Django class-based views. Returns
+    ``(None, None)`` for function views.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return None, None
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return view_class, actions.get(method.lower())
+    return view_class, method.lower()
+
+
+def get_query_budget(view_class, action):
+    if view_class is None or action is None:
+        return None
+    return getattr(view_class, 'query_budgets', {}).get(action)
+
+
+def view_label(view_class, action):
+    return f'{view_class.__name__}.{action}'
+
+
+def router_viewsets():
+    """
+    Yields ``(url_name, view_class, actions)`` for every router-registered
+    viewset route in the URLconf (format-suffix duplicates are skipped).
+    """
+    seen = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if hasattr(pattern, 'url_patterns'):
+                yield from walk(pattern.url_patterns)
+                continue
+            actions = getattr(pattern.callback, 'actions', None)
+            if not actions or pattern.name in seen:
+                continue
+            seen.add(pattern.name)
+            yield pattern.name, pattern.callback.cls, dict(actions)
+
+    yield from walk(get_resolver().url_patterns)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def assert_query_budget(client, method, url, view_class, action, **kwargs):
+    """
+    Performs a request with ``client`` and fails if it issues more queries than
+    ``view_class`` declares for ``action`` (or declares no budget at all).
+    Returns the response so callers can make further assertions.
+    """
+    budget = get_query_budget(view_class, action)
+    if budget is None:
+        raise QueryBudgetExceeded(f'{view_label(view_class, action)} declares no query budget.')
+    with count_queries() as counter:
+        response = getattr(client, method.lower())(url, **kwargs)
+    if counter.count > budget:
+        raise QueryBudgetExceeded(
+            f'{view_label(view_class, action)} issued {counter.count} queries for {method.upper()} {url}, '
+            f'budget is {budget}.'
+        )
+    return response
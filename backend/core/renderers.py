@@ -0,0 +1,80 @@
+"""
+JSON rendering that reuses already-encoded payloads.
+
+``PreEncoded`` wraps JSON bytes (e.g. a cached item row) and behaves as a
+read-only mapping that is only decoded if something reads it.
+``PreEncodedJSONRenderer`` splices those bytes into the output as they are, so
+a list page assembled from cached rows is never re-encoded; everything else is
+rendered exactly like DRF's ``JSONRenderer``.
+"""
+
+import json
+from collections.abc import Mapping
+
+from rest_framework.renderers import JSONRenderer
+
+
+class PreEncoded(Mapping):
+    __slots__ = ('encoded', '_decoded')
+
+    def __init__(self, encoded):
+        self.encoded = encoded
+        self._decoded = None
+
+    @property
+    def decoded(self):
+        if self._decoded is None:
+            self._decoded = json.loads(self.encoded)
+        return self._decoded
+
+    def __getitem__(self, key):
+        return self.decoded[key]
+
+    def __iter__(self):
+        return iter(self.decoded)
+
+    def __len__(self):
+        return len(self.decoded)
+
+    def __repr__(self):
+        return f'PreEncoded({self.encoded!r})'
+
+    # The bytes are all that needs storing; the decoded copy is rebuilt on demand
+    def __getstate__(self):
+        return self.encoded
+
+    def __setstate__(self, state):
+        self.encoded = state
+        self._decoded = None
+
+
+def contains_pre_encoded(data):
+    if isinstance(data, PreEncoded):
+        return True
+    if isinstance(data, dict):
+        return any(contains_pre_encoded(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(contains_pre_encoded(value) for value in data)
+    return False
+
+
+class PreEncodedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Indented output is for humans; it is rendered normally (PreEncoded decodes as a mapping)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is None and contains_pre_encoded(data):
+            return self.splice(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def encode(self, data):
+        # JSONRenderer renders a None body as b''; inside a document it is null
+        return b'null' if data is None else super().render(data)
+
+    def splice(self, data):
+        if isinstance(data, PreEncoded):
+            return data.encoded
+        if isinstance(data, dict):
+            members = [self.encode(str(key)) + b':' + self.splice(value) for key, value in data.items()]
+            return b'{' + b','.join(members) + b'}'
+        if isinstance(data, (list, tuple)):
+            return b'[' + b','.join(self.splice(value) for value in data) + b']'
+        return self.encode(data)
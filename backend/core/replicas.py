@@ -0,0 +1,71 @@
+"""
+Read-replica routing.
+
+``ReplicaRoutingMiddleware`` marks safe-method requests to views that opt in
+with ``replica_reads = True`` and picks one replica alias for the whole request;
+``PrimaryReplicaRouter`` then sends that request's reads to it. Everything else
+goes to the primary: writes, reads inside a transaction (e.g. the overbooking
+check during a booking save), requests from a user who wrote within the last
+``REPLICA_PIN_SECONDS``, and all requests when ``DATABASE_REPLICAS`` is empty.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica_alias = ContextVar('replica_alias', default=None)
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_user_to_primary(user_id):
+    # Read-your-writes: the user's next reads skip the (possibly lagging) replicas
+    cache.set(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(pin_key(user_id), False)
+
+
+def choose_replica():
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def use_replica(alias):
+    token = _replica_alias.set(alias)
+    try:
+        yield
+    finally:
+        _replica_alias.reset(token)
+
+
+@contextmanager
+def use_primary():
+    with use_replica(None):
+        yield
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in getattr(settings, 'DATABASE_REPLICAS', [])
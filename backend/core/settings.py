@@ -64,7 +64,10 @@ CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=[
 ])
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,7 +75,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.SnapshotWhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -100,28 +103,55 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 import os
-import dj_database_url
+from .database import database_settings
 
 DEBUG = os.getenv("DEBUG", "True").lower() == "true"
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-if DEBUG:
-    # Docker development
-    DATABASES = {
-        "default": dj_database_url.config(
-            default=DATABASE_URL
-        )
-    }
-else:
-    # Production
-    DATABASES = {
-        "default": dj_database_url.config(
-            default=DATABASE_URL,
-            conn_max_age=600,
-            ssl_require=True   # required for Supabase
-        )
-    }
+# DB_POOL=True switches to Django's psycopg connection pool (one pool per gunicorn worker,
+# DB_POOL_MAX_SIZE should match --threads); DB_PGBOUNCER=True when connecting through
+# PgBouncer in transaction mode
+DATABASE_CONNECTION_OPTIONS = dict(
+    debug=DEBUG,
+    conn_max_age=env.int('DB_CONN_MAX_AGE', default=None),
+    pool=env.bool('DB_POOL', default=False),
+    pool_min_size=env.int('DB_POOL_MIN_SIZE', default=2),
+    pool_max_size=env.int('DB_POOL_MAX_SIZE', default=4),
+    pool_timeout=env.int('DB_POOL_TIMEOUT', default=10),
+    pgbouncer=env.bool('DB_PGBOUNCER', default=False),
+)
+
+DATABASES = {
+    "default": database_settings(DATABASE_URL, **DATABASE_CONNECTION_OPTIONS)
+}
+
+# Read replicas (comma-separated URLs) become replica_1, replica_2...; safe-method requests to
+# views with replica_reads = True read from one of them, see core/replicas.py. A user's reads
+# stay on the primary for REPLICA_PIN_SECONDS after they write.
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = database_settings(replica_url, **DATABASE_CONNECTION_OPTIONS)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.replicas.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
+# Shared cache for all gunicorn workers. Use dbcache://django_cache in production: on Postgres,
+# migrate creates it as an unlogged table (a post_migrate receiver in core/cache.py). Cached data is invalidated through versioned
+# groups (core/cache.py); CACHE_INVALIDATION_LISTEN also keeps the versions in each worker's memory,
+# refreshed over Postgres LISTEN/NOTIFY (core/notify.py).
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+CACHE_INVALIDATION_LISTEN = env.bool('CACHE_INVALIDATION_LISTEN', default=False)
+# Seconds a rendered item/event list page stays cached (writes invalidate it immediately)
+LIST_CACHE_TIMEOUT = env.int('LIST_CACHE_TIMEOUT', default=300)
+# Unfiltered lists of tables Postgres estimates at this many rows or more report the estimate as their
+# count ("count_exact": false) instead of counting; 0 always counts (core/counts.py)
+PAGINATION_ESTIMATE_THRESHOLD = env.int('PAGINATION_ESTIMATE_THRESHOLD', default=100000)
 
 
 
@@ -172,18 +202,56 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.StandardPagination',
     'PAGE_SIZE': 10,
+    # Cached rows are emitted without re-encoding; the browsable API is only offered in development
+    'DEFAULT_RENDERER_CLASSES': ['core.renderers.PreEncodedJSONRenderer'] + (
+        ['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []
+    ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        # Only set on /api/batch/ sub-requests, which reuse the batch request's user
+        'core.batch.BatchAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     )
 }
 
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = env.int('GZIP_MIN_BYTES', default=1024)
+
+# Rows per page allowed with ?page_size= for ?format=columnar list responses (core/columnar.py)
+COLUMNAR_MAX_PAGE_SIZE = env.int('COLUMNAR_MAX_PAGE_SIZE', default=1000)
+
+# Build item and booking list rows as JSON in the query on Postgres (core/dbjson.py); ignored elsewhere
+DATABASE_JSON_LISTS = env.bool('DATABASE_JSON_LISTS', default=False)
+
+# Longest window (days) /api/events/calendar/ answers
+CALENDAR_MAX_DAYS = env.int('CALENDAR_MAX_DAYS', default=366)
+
+# /api/batch/: sub-requests per batch, and threads running them concurrently under ASGI (1 = in order)
+BATCH_MAX_REQUESTS = env.int('BATCH_MAX_REQUESTS', default=20)
+BATCH_MAX_WORKERS = env.int('BATCH_MAX_WORKERS', default=4)
+
+# Live change stream (/api/async/changes/, core/changes.py): relay changes between workers over
+# Postgres LISTEN/NOTIFY, and how often an idle stream sends a keep-alive comment
+CHANGE_STREAM_LISTEN = env.bool('CHANGE_STREAM_LISTEN', default=False)
+CHANGE_STREAM_HEARTBEAT_SECONDS = env.int('CHANGE_STREAM_HEARTBEAT_SECONDS', default=15)
+
+# /api/sync/ (core/sync.py): days deletions are remembered (older tokens get a full sync), and how far
+# each sync looks back before its token to catch rows from transactions that committed late
+SYNC_TOMBSTONE_DAYS = env.int('SYNC_TOMBSTONE_DAYS', default=30)
+SYNC_OVERLAP_SECONDS = env.int('SYNC_OVERLAP_SECONDS', default=5)
+
+# Catalog snapshot files (core/snapshot.py), served by WhiteNoise; rebuilt this many seconds after a
+# change (0 = only when the manifest endpoint finds it out of date)
+CATALOG_SNAPSHOT_ROOT = env('CATALOG_SNAPSHOT_ROOT', default=os.path.join(BASE_DIR, 'snapshots'))
+CATALOG_SNAPSHOT_URL = '/snapshots/'
+CATALOG_SNAPSHOT_REBUILD_DELAY = env.int('CATALOG_SNAPSHOT_REBUILD_DELAY', default=5)
+
 # Security Headers
 # Prevent MIME type sniffing
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -0,0 +1,100 @@
+"""
+Single-flight computation of expensive reads.
+
+``single_flight`` returns the cached result of ``compute`` for a versioned key
+(see ``core.cache``). On a miss, only one caller does the work: threads of the
+same worker wait on the in-flight computation, and other workers wait for its
+result to land in the shared cache (a short-lived lock key in the shared cache
+elects the worker that computes). With ``stale_seconds``, callers that would
+otherwise wait are served the previous result instead while it is refreshed.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+
+from .cache import versioned_key
+
+MISSING = object()
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def single_flight(name, groups, compute, *parts, timeout=300, stale_seconds=None, lock_timeout=10,
+                  poll_interval=0.05):
+    """
+    Returns ``compute()`` for ``name``/``parts``, cached for ``timeout`` seconds
+    and invalidated when any of ``groups`` changes. Concurrent identical calls
+    share one computation; if it takes longer than ``lock_timeout`` seconds the
+    waiters compute for themselves.
+    """
+    key = versioned_key(name, groups, *parts)
+    value = cache.get(key, MISSING)
+    if value is not MISSING:
+        return value
+
+    stale_key = ':'.join([name, 'stale', *(str(part) for part in parts)])
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        if stale_seconds is not None:
+            stale = cache.get(stale_key, MISSING)
+            if stale is not MISSING:
+                return stale
+        if call.done.wait(lock_timeout):
+            if call.error is not None:
+                raise call.error
+            return call.value
+        return compute()
+
+    try:
+        call.value = _compute_once(key, stale_key, compute, timeout, stale_seconds, lock_timeout, poll_interval)
+    except Exception as exc:
+        call.error = exc
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
+    return call.value
+
+
+def _compute_once(key, stale_key, compute, timeout, stale_seconds, lock_timeout, poll_interval):
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, True, lock_timeout):
+        # Another worker is computing: serve the stale result or wait for the fresh one
+        if stale_seconds is not None:
+            stale = cache.get(stale_key, MISSING)
+            if stale is not MISSING:
+                return stale
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            value = cache.get(key, MISSING)
+            if value is not MISSING:
+                return value
+            if not cache.get(lock_key, False):
+                break  # the other worker gave up without storing a result
+        return compute()
+
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+        if stale_seconds is not None:
+            cache.set(stale_key, value, timeout + stale_seconds)
+        return value
+    finally:
+        cache.delete(lock_key)
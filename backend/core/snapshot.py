@@ -0,0 +1,161 @@
+"""
+Catalog snapshot: all categories, items and current and future events in one
+static JSON file.
+
+The file is named by a hash of its content (``catalog.<hash>.json``, with a
+gzip copy next to it) and served from ``CATALOG_SNAPSHOT_ROOT`` by WhiteNoise
+with far-future caching (``core.middleware.SnapshotWhiteNoiseMiddleware``),
+so a client cold-loads the catalog with one download and only downloads it
+again when the hash in ``/api/catalog/manifest/`` changes. The file name is
+only handed out by the authenticated manifest endpoint.
+
+Each section is cached under its cache groups (``core.cache``) and item and
+event rows come from the per-object cache, so a rebuild after a change only
+re-serializes what changed. Saving or deleting a category, item or event
+schedules a rebuild ``CATALOG_SNAPSHOT_REBUILD_DELAY`` seconds after commit,
+in a background thread (coalescing bursts of edits); the manifest endpoint
+builds the snapshot itself if it is out of date or missing on this machine.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .cache import get_or_compute
+from .objectcache import get_many
+from .renderers import PreEncodedJSONRenderer
+from .singleflight import single_flight
+
+SNAPSHOT_GROUPS = ('categories', 'items', 'events')
+# Events end without any write, so sections and the manifest are also refreshed this often (seconds)
+SNAPSHOT_TIMEOUT = 10 * 60
+# Older files are kept for clients still downloading them
+SNAPSHOTS_KEPT = 3
+
+_renderer = PreEncodedJSONRenderer()
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def categories_section():
+    from items.api.serializers import CategorySerializer
+    from items.models import Category
+    return _renderer.encode(CategorySerializer(Category.objects.all(), many=True).data)
+
+
+def items_section():
+    from items.api.views import ItemViewSet
+    queryset = ItemViewSet.queryset
+    rows = get_many(
+        queryset.model, list(queryset.values_list('pk', flat=True)),
+        lambda missing: queryset.filter(pk__in=missing),
+        lambda objects: ItemViewSet.serializer_class(objects, many=True).data,
+    )
+    return _renderer.splice(rows)
+
+
+def events_section():
+    from events.api.serializers import EventSerializer
+    from events.api.views import current_future_events
+    from events.models import Event
+    events = {event.pk: event for event in current_future_events()}
+    rows = get_many(
+        Event, list(events),
+        lambda missing: [events[pk] for pk in missing],
+        lambda objects: EventSerializer(objects, many=True).data,
+    )
+    return _renderer.splice(rows)
+
+
+def snapshot_content():
+    sections = {
+        'categories': get_or_compute('catalog-categories', ('categories',), categories_section),
+        'items': get_or_compute('catalog-items', ('items',), items_section),
+        'events': get_or_compute('catalog-events', ('events',), events_section, timeout=SNAPSHOT_TIMEOUT),
+    }
+    return b'{' + b','.join(b'"%s":%s' % (name.encode(), body) for name, body in sections.items()) + b'}'
+
+
+def snapshot_path(name):
+    return os.path.join(settings.CATALOG_SNAPSHOT_ROOT, name)
+
+
+def write_file(path, content):
+    # Written under a temporary name and renamed, so a request never sees a partial file
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def prune(keep):
+    names = [
+        name for name in os.listdir(settings.CATALOG_SNAPSHOT_ROOT)
+        if name.startswith('catalog.') and name.endswith('.json') and name != keep
+    ]
+    names.sort(key=lambda name: os.path.getmtime(snapshot_path(name)), reverse=True)
+    for name in names[SNAPSHOTS_KEPT - 1:]:
+        for path in (snapshot_path(name), snapshot_path(name) + '.gz'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def build():
+    """Writes the current snapshot (if not already on disk) and returns its manifest."""
+    content = snapshot_content()
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    name = f'catalog.{digest}.json'
+    path = snapshot_path(name)
+    if not os.path.exists(path):
+        os.makedirs(settings.CATALOG_SNAPSHOT_ROOT, exist_ok=True)
+        write_file(path + '.gz', gzip.compress(content, mtime=0))
+        write_file(path, content)
+        prune(keep=name)
+    return {
+        'hash': digest,
+        'url': settings.CATALOG_SNAPSHOT_URL + name,
+        'size': len(content),
+        'built_at': timezone.now().isoformat(),
+    }
+
+
+def manifest():
+    current = single_flight('catalog-manifest', SNAPSHOT_GROUPS, build, timeout=SNAPSHOT_TIMEOUT)
+    if not os.path.exists(snapshot_path(current['url'].rsplit('/', 1)[-1])):
+        # Built by another machine, or pruned: the same content is written here
+        current = build()
+    return current
+
+
+def _rebuild_in_background():
+    global _timer
+    with _timer_lock:
+        _timer = None
+    try:
+        manifest()
+    finally:
+        connections.close_all()
+
+
+def schedule_rebuild(sender=None, **kwargs):
+    # Signal receiver: one rebuild per burst of changes, after they are committed
+    if settings.CATALOG_SNAPSHOT_REBUILD_DELAY <= 0:
+        return
+    transaction.on_commit(_start_timer, robust=True)
+
+
+def _start_timer():
+    global _timer
+    with _timer_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(settings.CATALOG_SNAPSHOT_REBUILD_DELAY, _rebuild_in_background)
+        _timer.daemon = True
+        _timer.start()
@@ -0,0 +1,119 @@
+"""
+Delta sync (``/api/sync/?since=<token>``).
+
+Items, events and bookings carry an indexed ``updated_at``, and deletes leave
+a ``Tombstone``. A sync returns the rows changed and the ids deleted since the
+client's token, plus a new token to send next time; without a token, or with
+one older than the tombstones are kept (``SYNC_TOMBSTONE_DAYS``), it returns
+every row and ``"full": true`` so the client replaces what it holds.
+
+A token is the time the previous sync started. Reads look back an extra
+``SYNC_OVERLAP_SECONDS`` so rows from transactions that committed after that
+sync started (or were stamped by a server with a slightly slow clock) are not
+missed; clients apply changes by id, so repeated rows are harmless.
+
+Representations embed related names (items their category, bookings their
+item and event), so saving a category, item or event also touches the rows
+that embed it (``touch_dependents``).
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Tombstone
+from .objectcache import get_many
+
+# Response key -> model label
+SYNC_MODELS = {'items': 'items.Item', 'events': 'events.Event', 'bookings': 'itembookings.ItemBooking'}
+
+
+def encode_token(moment):
+    # Microseconds since the epoch; opaque to clients
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def parse_token(token):
+    try:
+        microseconds = int(token)
+        return datetime.fromtimestamp(microseconds / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValidationError({'since': ['Invalid sync token.']})
+
+
+def sync_window(token, now):
+    """Returns the time to read changes from, or None for a full sync."""
+    if not token:
+        return None
+    since = parse_token(token)
+    if since < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        return None  # deletions before the oldest tombstone can't be reported
+    return since - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+
+def deleted_since(since):
+    """Returns ``{response key: [ids]}`` of the rows deleted since ``since`` (none for a full sync)."""
+    keys = {label.lower(): key for key, label in SYNC_MODELS.items()}
+    deleted = {key: [] for key in SYNC_MODELS}
+    if since is None:
+        return deleted
+    for model, object_id in Tombstone.objects.filter(deleted_at__gte=since).values_list('model', 'object_id'):
+        if model in keys:
+            deleted[keys[model]].append(object_id)
+    return deleted
+
+
+def changed_since(since):
+    """
+    Returns ``{response key: [rows]}`` of the rows changed since ``since``
+    (every row when None), in the same representation as the list endpoints.
+    """
+    from events.api.views import EventViewSet
+    from itembookings.api.views import ItemBookingViewSet
+    from items.api.views import ItemViewSet
+
+    changed = {}
+    for key, viewset in (('items', ItemViewSet), ('events', EventViewSet), ('bookings', ItemBookingViewSet)):
+        queryset = viewset.queryset.order_by('pk')
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        serializer_class = viewset.serializer_class
+        if key == 'bookings':
+            changed[key] = serializer_class(queryset, many=True).data
+            continue
+        # Item and event rows come from the per-object cache where possible
+        changed[key] = get_many(
+            queryset.model, list(queryset.values_list('pk', flat=True)),
+            lambda missing, viewset=viewset: viewset.queryset.filter(pk__in=missing),
+            lambda objects, serializer_class=serializer_class: serializer_class(objects, many=True).data,
+        )
+    return changed
+
+
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    tombstone = Tombstone(model=sender._meta.label_lower, object_id=instance.pk)
+    if origin is not instance and isinstance(origin, tuple(apps.get_model(label) for label in SYNC_MODELS.values())):
+        # Cascaded from an item or event, which is deleted (and signalled) last: saved in one insert with it
+        origin.__dict__.setdefault('_pending_tombstones', []).append(tombstone)
+        return
+    Tombstone.objects.bulk_create([*instance.__dict__.pop('_pending_tombstones', []), tombstone])
+
+
+def touch_dependents(sender, instance, created=False, **kwargs):
+    # QuerySet.update() skips auto_now, so the embedding rows are stamped explicitly
+    if created:
+        return  # nothing embeds a new row yet
+    from itembookings.models import ItemBooking
+    from items.models import Item
+
+    now = timezone.now()
+    label = sender._meta.label
+    if label == 'items.Category':
+        Item.objects.filter(category=instance).update(updated_at=now)
+    elif label == 'items.Item':
+        ItemBooking.objects.filter(item=instance).update(updated_at=now)
+    elif label == 'events.Event':
+        ItemBooking.objects.filter(event=instance).update(updated_at=now)
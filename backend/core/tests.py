@@ -1,46 +1,64 @@
+import asyncio
+import gzip
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+
 import pytest
-from django.urls import reverse
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test import AsyncClient, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APIClient
-from rest_framework_simplejwt.tokens import RefreshToken
-from .api.serializers import UserSerializer, UserRegistrationSerializer
-from .permissions import IsManagerOrStaffReadOnly
+from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from events.api.async_views import AsyncEventView, AsyncCurrentFutureEventsView
+from events.api.views import EventViewSet, CurrentFutureEventsView
+from events.models import Event
+from itembookings.api.views import ItemBookingViewSet
+from itembookings.models import ItemBooking
+from items.api.async_views import AsyncItemView, AsyncItemAvailabilityView, AsyncCategoryChoicesView
+from items.api.serializers import ItemSerializer
+from items.api.views import ItemViewSet, CategoryChoicesView
+from items.models import Item, Category
+from . import batch, changes, counts, dbjson, notify, snapshot
+from .api.serializers import UserSerializer, UserRegistrationSerializer
+from .api.views import CatalogManifestView, SyncView
+from .benchmark import percentile, compare_to_baseline, run_benchmarks
+from .cache import bump, create_unlogged_cache_tables, get_or_compute, group_versions, versioned_key, _local_versions
+from .database import database_settings
+from .fieldsets import selected_fields
+from .indexadvisor import QueryRecorder, parse_query, propose
+from .listcache import CachedJSONResponse, canonical_query
+from .loadtest import LoadGenerator, parse_mix, classify, summarize
+from .middleware import ReplicaRoutingMiddleware
+from .models import Tombstone
+from .objectcache import get_many, object_key
+from .permissions import IsManagerOrStaffReadOnly, user_group_names
+from .pgindexes import POSTGRES_INDEXES, create_postgres_indexes
+from .querybudget import assert_query_budget, get_query_budget, router_viewsets, view_label, QueryBudgetExceeded
+from .renderers import PreEncoded, PreEncodedJSONRenderer
+from .replicas import PrimaryReplicaRouter, _replica_alias, is_pinned, pin_user_to_primary, use_replica
+from .singleflight import single_flight
+from .sync import encode_token
 
 User = get_user_model()
 
-@pytest.fixture
-def api_client():
-    return APIClient()
-
-@pytest.fixture
-def manager_group():
-    group, _ = Group.objects.get_or_create(name='Manager')
-    return group
-
-@pytest.fixture
-def staff_group():
-    group, _ = Group.objects.get_or_create(name='Staff')
-    return group
-
-@pytest.fixture
-def manager_user(manager_group):
-    user = User.objects.create_user(username='manager', password='testpass123')
-    user.groups.add(manager_group)
-    return user
-
-@pytest.fixture
-def staff_user(staff_group):
-    user = User.objects.create_user(username='staff', password='testpass123')
-    user.groups.add(staff_group)
-    return user
-
-@pytest.fixture
-def regular_user():
-    return User.objects.create_user(username='regular', password='testpass123')
-
 @pytest.mark.django_db
 class TestUserSerializer:
     def test_serialize_user_with_groups(self, manager_user):
@@ -459,3 +477,1712 @@ class TestPermissions:
 
         assert permission.has_permission(request, None) is False
 
+
+class TestBenchmarkHelpers:
+    def test_percentile_interpolates_between_ranks(self):
+        values = [10, 20, 30, 40]
+        assert percentile(values, 0) == 10
+        assert percentile(values, 50) == 25
+        assert percentile(values, 100) == 40
+        assert percentile([], 95) == 0.0
+
+    def test_compare_to_baseline_reports_latency_and_query_regressions(self):
+        baseline = {
+            'items_list': {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 3},
+            'events_list': {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 3},
+        }
+        results = {
+            'items_list': {'p50_ms': 14.0, 'p95_ms': 21.0, 'queries': 3},
+            'events_list': {'p50_ms': 10.5, 'p95_ms': 20.5, 'queries': 4},
+            'login': {'p50_ms': 300.0, 'p95_ms': 400.0, 'queries': 5},
+        }
+        regressions = compare_to_baseline(results, baseline, threshold=0.25)
+
+        assert len(regressions) == 2
+        assert regressions[0].startswith('items_list: p50_ms')
+        assert regressions[1] == 'events_list: queries 4 vs baseline 3'
+
+    def test_compare_to_baseline_within_threshold(self):
+        baseline = {'items_list': {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 3}}
+        results = {'items_list': {'p50_ms': 12.0, 'p95_ms': 24.0, 'queries': 3}}
+        assert compare_to_baseline(results, baseline, threshold=0.25) == []
+
+@pytest.mark.django_db
+class TestBenchmarkRun:
+    def test_run_benchmarks_measures_every_scenario(self):
+        results = run_benchmarks(size=20, iterations=2)
+
+        assert set(results) == {
+            'items_list', 'items_list_large', 'items_list_large_gzip', 'items_detail', 'items_search', 'items_filter',
+            'items_list_cached', 'items_detail_cached', 'events_list', 'events_detail', 'events_current_future', 'events_current_future_gzip',
+            'itembookings_list', 'itembookings_create', 'login',
+        }
+        for stats in results.values():
+            assert stats['queries'] > 0
+            assert stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms']
+
+    def test_cached_scenarios_alone_measure_cache_hits(self):
+        names = ['items_list', 'items_list_cached', 'items_detail', 'items_detail_cached']
+        results = run_benchmarks(size=20, iterations=3, only=names)
+        assert results['items_list']['queries'] > results['items_list_cached']['queries']
+        assert results['items_detail']['queries'] > results['items_detail_cached']['queries']
+
+    def test_run_benchmarks_only_selected_scenarios(self):
+        results = run_benchmarks(size=10, iterations=2, only=['items_list'])
+        assert list(results) == ['items_list']
+
+    def test_command_records_queries_only_when_asked(self, monkeypatch, settings, tmp_path):
+        # The recorder times every query, so plain runs must not pay for it
+        from .management.commands import benchmark as command
+        recorders = []
+        monkeypatch.setattr(command, 'QueryRecorder', lambda: recorders.append(QueryRecorder()) or recorders[-1])
+        for name in ('setup_databases', 'teardown_databases', 'setup_test_environment', 'teardown_test_environment'):
+            monkeypatch.setattr(command, name, lambda *args, **kwargs: None)
+        monkeypatch.setattr(command, 'run_benchmarks', lambda **kwargs: {})
+        baseline, recording = str(tmp_path / 'baseline.json'), tmp_path / 'queries.json'
+
+        call_command('benchmark', '--baseline', baseline, stdout=StringIO())
+        assert recorders == []
+        call_command('benchmark', '--baseline', baseline, '--record-queries', str(recording), stdout=StringIO())
+        assert len(recorders) == 1 and recording.exists()
+
+class TestLoadTestHelpers:
+    def test_parse_mix(self):
+        assert parse_mix('browse=5, search=2,login') == {'browse': 5, 'search': 2, 'login': 1}
+
+    def test_parse_mix_rejects_unknown_action(self):
+        with pytest.raises(ValueError, match="Unknown action 'checkout'"):
+            parse_mix('browse=1,checkout=2')
+
+    def test_parse_mix_rejects_all_zero_weights(self):
+        with pytest.raises(ValueError):
+            parse_mix('browse=0')
+
+    def test_classify_booking_rejections(self):
+        assert classify('create_booking', 201, b'{}') == 'ok'
+        assert classify('create_booking', 400, b'{"quantity": ["Cannot book 2 items."]}') == 'overbooked'
+        assert classify('create_booking', 400, b'{"event": ["This item is already booked for this event."]}') == 'duplicate'
+        assert classify('browse', 500, b'') == 'error'
+        assert classify('browse', 0, b'') == 'error'
+        assert classify('view_event', 404, b'{}') == 'error'
+
+    def test_summarize(self):
+        samples = {
+            'browse': [(0.010, 200, 'ok'), (0.020, 200, 'ok'), (0.030, 500, 'error'), (0.040, 200, 'ok')],
+            'create_booking': [(0.050, 201, 'ok'), (0.060, 400, 'overbooked')],
+        }
+        report = summarize(samples, elapsed=2.0)
+
+        assert report['requests'] == 6
+        assert report['throughput_rps'] == 3.0
+        assert report['error_rate'] == round(1 / 6, 4)
+        assert report['endpoints']['browse']['p50_ms'] == 25.0
+        assert report['endpoints']['browse']['error_rate'] == 0.25
+        assert report['endpoints']['create_booking']['overbooking_rejection_rate'] == 0.5
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadGenerator:
+    def test_run_against_live_server(self, live_server, manager_user, staff_user):
+        now = timezone.now()
+        Item.objects.create(name='Velvet Cape', quantity=1)
+        Event.objects.create(name='Gala', start_datetime=now + timedelta(days=1), end_datetime=now + timedelta(days=2))
+
+        generator = LoadGenerator(
+            live_server.url, 'staff', 'testpass123',
+            manager_username='manager', manager_password='testpass123',
+            concurrency=2, duration=0.5, mix={'browse': 3, 'view_event': 1, 'create_booking': 1}, seed=1,
+        )
+        report = asyncio.run(generator.run(cleanup=True))
+
+        assert report['requests'] > 0
+        assert report['error_rate'] == 0
+        assert set(report['endpoints']) <= {'browse', 'view_event', 'create_booking'}
+        assert ItemBooking.objects.count() == 0
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    def test_every_router_viewset_declares_budgets(self):
+        viewsets = list(router_viewsets())
+        assert {view_class for _, view_class, _ in viewsets} >= {ItemViewSet, EventViewSet, ItemBookingViewSet}
+        for _, view_class, actions in viewsets:
+            for action in actions.values():
+                assert get_query_budget(view_class, action) is not None, view_label(view_class, action)
+
+    def test_router_viewsets_read_within_budget(self, staff_client, many_rows):
+        for name, view_class, actions in router_viewsets():
+            if name.endswith('-list'):
+                response = assert_query_budget(staff_client, 'get', reverse(name), view_class, 'list')
+                assert response.status_code == status.HTTP_200_OK
+                assert response.data['count'] >= 25
+            elif name.endswith('-detail'):
+                pk = view_class.queryset.model.objects.order_by('pk').values_list('pk', flat=True).first()
+                response = assert_query_budget(staff_client, 'get', reverse(name, args=[pk]), view_class, 'retrieve')
+                assert response.status_code == status.HTTP_200_OK
+
+    def test_api_views_within_budget(self, staff_client, manager_client, many_rows):
+        assert_query_budget(staff_client, 'get', reverse('category-choices'), CategoryChoicesView, 'get')
+        cache.clear()  # cold: groups, the event list and every row are loaded
+        assert_query_budget(staff_client, 'get', reverse('current-future-events'), CurrentFutureEventsView, 'get')
+        response = assert_query_budget(
+            manager_client, 'post', reverse('category-choices'), CategoryChoicesView, 'post',
+            data={'name': 'Wands'}, format='json',
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_writes_within_budget(self, manager_client, many_rows):
+        item, event, booking = many_rows['items'][0], many_rows['events'][1], many_rows['bookings'][0]
+
+        response = assert_query_budget(
+            manager_client, 'post', reverse('itembooking-list'), ItemBookingViewSet, 'create',
+            data={'item': item.pk, 'event': event.pk, 'quantity': 1}, format='json',
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert_query_budget(
+            manager_client, 'patch', reverse('itembooking-detail', args=[booking.pk]), ItemBookingViewSet,
+            'partial_update', data={'quantity': 2}, format='json',
+        )
+        assert_query_budget(
+            manager_client, 'put', reverse('item-detail', args=[item.pk]), ItemViewSet, 'update',
+            data={'name': 'Renamed', 'quantity': 5, 'category': many_rows['categories'][1].pk}, format='json',
+        )
+        assert_query_budget(
+            manager_client, 'post', reverse('event-list'), EventViewSet, 'create',
+            data={'name': 'Gala', 'start_datetime': event.start_datetime.isoformat(), 'end_datetime': event.end_datetime.isoformat()},
+            format='json',
+        )
+        assert_query_budget(
+            manager_client, 'delete', reverse('event-detail', args=[many_rows['events'][5].pk]), EventViewSet, 'destroy',
+        )
+
+    def test_n_plus_one_exceeds_budget(self, staff_client, many_rows, monkeypatch):
+        # Without select_related every row looks up its item and event separately
+        monkeypatch.setattr(ItemBookingViewSet, 'queryset', ItemBooking.objects.all())
+        with pytest.raises(QueryBudgetExceeded, match='ItemBookingViewSet.list issued'):
+            assert_query_budget(staff_client, 'get', reverse('itembooking-list'), ItemBookingViewSet, 'list')
+
+    def test_middleware_logs_exceeded_budget(self, staff_client, many_rows, monkeypatch, caplog):
+        monkeypatch.setattr(ItemViewSet, 'query_budgets', {**ItemViewSet.query_budgets, 'list': 1})
+        with caplog.at_level('WARNING', logger='core.middleware'):
+            staff_client.get(reverse('item-list'))
+        assert 'Query budget exceeded: ItemViewSet.list' in caplog.text
+
+    def test_middleware_silent_within_budget(self, staff_client, many_rows, caplog):
+        with caplog.at_level('WARNING', logger='core.middleware'):
+            staff_client.get(reverse('item-list'))
+        assert 'Query budget exceeded' not in caplog.text
+
+def explain_captured(run, table, predicate=None):
+    """
+    Runs ``run`` and returns ``[(sql, plan)]`` with the EXPLAIN ANALYZE plan of
+    every SELECT it issued against ``table`` (optionally filtered by ``predicate``).
+    """
+    captured = []
+
+    def capture(execute, sql, params, many, context):
+        captured.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        run()
+
+    plans = []
+    with connection.cursor() as cursor:
+        for sql, params in captured:
+            if not sql.lstrip().upper().startswith('SELECT') or f'"{table}"' not in sql:
+                continue
+            if predicate and not predicate(sql):
+                continue
+            cursor.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            plans.append((sql, plan[0]['Plan']))
+    assert plans, f'No query against {table} was captured'
+    return plans
+
+def plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+def assert_healthy_plans(plans, table):
+    # A hot path must reach its table through an index and never sort on disk
+    for sql, plan in plans:
+        problems = []
+        for node in plan_nodes(plan):
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table:
+                problems.append(f'sequential scan on {table}')
+            if node.get('Sort Space Type') == 'Disk':
+                problems.append(f"sort spilled to disk ({node.get('Sort Space Used')} kB)")
+        assert not problems, f"{'; '.join(problems)}\n{sql}\n{json.dumps(plan, indent=2)}"
+
+@pytest.fixture(scope='class')
+def plan_dataset(django_db_setup, django_db_blocker):
+    # Committed (not per-test) data so the planner sees realistic statistics after ANALYZE:
+    # years of past events with a short future horizon, selective item names and locations
+    with django_db_blocker.unblock():
+        try:
+            now = timezone.now()
+            create_postgres_indexes(connection, list(POSTGRES_INDEXES))
+            categories = Category.objects.bulk_create([Category(name=f'Plan Category {i}') for i in range(40)])
+            items = Item.objects.bulk_create([
+                Item(
+                    name=f'w{i % 200:03d}x prop {i}',
+                    description='Seeded for query plan tests',
+                    quantity=10,
+                    category=categories[i % 40],
+                    color=['Red', 'Blue', 'Gold', 'Black', 'White'][i % 5],
+                    location=f'Shelf {i % 200:03d}q',
+                )
+                for i in range(20000)
+            ])
+            events = Event.objects.bulk_create([
+                Event(
+                    name=f'Plan Event {i}',
+                    start_datetime=now - timedelta(days=1490) + timedelta(hours=i * 1.8),
+                    end_datetime=now - timedelta(days=1490) + timedelta(hours=i * 1.8 + 4),
+                )
+                for i in range(20000)
+            ])
+            ItemBooking.objects.bulk_create([
+                ItemBooking(item=items[i % 20000], event=events[(i * 7 + i // 20000) % 20000], quantity=1)
+                for i in range(40000)
+            ])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            yield {'item': items[123], 'event': events[-1], 'category': categories[7]}
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'TRUNCATE itembookings_itembooking, events_event, items_item, items_category RESTART IDENTITY CASCADE'
+                )
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='Query plan tests need Postgres')
+@pytest.mark.django_db
+class TestQueryPlans:
+    def test_overbooking_overlap_aggregate_uses_index(self, plan_dataset):
+        item, event = plan_dataset['item'], plan_dataset['event']
+        plans = explain_captured(lambda: ItemBooking.validate_overbooking(item, event, 1), 'itembookings_itembooking')
+        assert_healthy_plans(plans, 'itembookings_itembooking')
+
+    def test_sync_uses_updated_at_indexes(self, plan_dataset, staff_client, settings):
+        settings.SYNC_OVERLAP_SECONDS = 0
+        since = encode_token(timezone.now())
+        for table in ('items_item', 'events_event', 'itembookings_itembooking'):
+            plans = explain_captured(
+                lambda: staff_client.get(reverse('sync'), {'since': since}), table,
+                predicate=lambda sql: 'updated_at' in sql,
+            )
+            assert_healthy_plans(plans, table)
+
+    def test_current_future_events_uses_end_datetime_index(self, plan_dataset, staff_client):
+        plans = explain_captured(lambda: staff_client.get(reverse('current-future-events')), 'events_event')
+        assert_healthy_plans(plans, 'events_event')
+
+    def test_item_filter_name_uses_trigram_index(self, plan_dataset, staff_client):
+        plans = explain_captured(lambda: staff_client.get(reverse('item-list'), {'name': 'w017x'}), 'items_item')
+        assert_healthy_plans(plans, 'items_item')
+
+    def test_item_filter_location_uses_trigram_index(self, plan_dataset, staff_client):
+        plans = explain_captured(lambda: staff_client.get(reverse('item-list'), {'location': 'shelf 042q'}), 'items_item')
+        assert_healthy_plans(plans, 'items_item')
+
+    def test_event_overlaps_uses_window_index(self, plan_dataset, staff_client):
+        start = timezone.now() - timedelta(days=400)
+        window = f'{start.isoformat()},{(start + timedelta(days=31)).isoformat()}'
+        plans = explain_captured(
+            lambda: staff_client.get(reverse('event-list'), {'overlaps': window}), 'events_event',
+            predicate=lambda sql: 'TSTZRANGE' in sql,
+        )
+        assert_healthy_plans(plans, 'events_event')
+
+    def test_booking_pull_list_uses_indexes(self, plan_dataset, staff_client):
+        start = timezone.now() - timedelta(days=400)
+        params = {
+            'window': f'{start.isoformat()},{(start + timedelta(days=14)).isoformat()}',
+            'category': plan_dataset['category'].pk, 'ordering': 'event__start_datetime',
+        }
+        for table in ('events_event', 'itembookings_itembooking'):
+            plans = explain_captured(lambda: staff_client.get(reverse('itembooking-list'), params), table)
+            assert_healthy_plans(plans, table)
+
+    def test_item_filter_category_uses_index(self, plan_dataset, staff_client):
+        category = plan_dataset['category']
+        plans = explain_captured(lambda: staff_client.get(reverse('item-list'), {'category': category.pk}), 'items_item')
+        assert_healthy_plans(plans, 'items_item')
+
+    def test_itembooking_created_at_ordering_uses_index(self, plan_dataset, staff_client):
+        # The unfiltered COUNT(*) legitimately scans the table, only the ordered page is a hot path
+        plans = explain_captured(
+            lambda: staff_client.get(reverse('itembooking-list')),
+            'itembookings_itembooking',
+            predicate=lambda sql: 'ORDER BY' in sql,
+        )
+        assert_healthy_plans(plans, 'itembookings_itembooking')
+        for _, plan in plans:
+            assert not any(node['Node Type'] == 'Sort' for node in plan_nodes(plan)), json.dumps(plan, indent=2)
+
+@pytest.mark.django_db
+class TestIndexAdvisor:
+    def record_workload(self, many_rows):
+        item, event = many_rows['items'][0], many_rows['events'][0]
+        with QueryRecorder() as recorder:
+            list(Item.objects.filter(category=many_rows['categories'][0], location__icontains='storage').order_by('name')[:10])
+            list(ItemBooking.objects.order_by('-created_at')[:10])
+            ItemBooking.objects.filter(item=item, event=event).exists()
+            ItemBooking.validate_overbooking(item, event, 1)
+        return recorder
+
+    def test_parse_query(self):
+        sql, _ = Item.objects.filter(category=1, location__icontains='storage').order_by('-name')[:10].query.sql_with_params()
+        parsed = parse_query(sql)
+
+        assert ('items_item', 'category_id', 'eq') in parsed['predicates']
+        assert ('items_item', 'location', 'like') in parsed['predicates']
+        assert parsed['order_by'] == [('items_item', 'name', True)]
+        assert parsed['limit'] is True
+        assert parse_query('UPDATE "items_item" SET "name" = %s') is None
+
+    def test_recorder_aggregates_identical_shapes(self, many_rows):
+        with QueryRecorder() as recorder:
+            list(Item.objects.filter(pk__in=[1, 2]))
+            list(Item.objects.filter(pk__in=[3, 4, 5]))
+        entries = [entry for entry in recorder.entries() if '"items_item"' in entry['sql']]
+        assert len(entries) == 1
+        assert entries[0]['calls'] == 2
+
+    def test_proposals_skip_covered_columns(self, many_rows):
+        proposals = propose(self.record_workload(many_rows).entries(), connection)
+        described = {(proposal['model'], proposal['kind'], tuple(proposal['fields'])) for proposal in proposals}
+
+        assert ('items.Item', 'btree', ('category', 'name')) in described
+        assert ('items.Item', 'trigram', ('location',)) in described
+        # created_at is indexed and (item, event) is covered by the unique constraint in either order
+        assert not any(proposal['table'] == 'itembookings_itembooking' for proposal in proposals)
+        for proposal in proposals:
+            assert proposal['calls'] >= 1
+            assert 0 < proposal['workload_share'] <= 1
+
+    def test_command_reads_recording(self, many_rows, tmp_path):
+        recording = tmp_path / 'workload.json'
+        report = tmp_path / 'proposals.json'
+        self.record_workload(many_rows).save(recording)
+
+        out = StringIO()
+        call_command('index_advisor', '--from-file', str(recording), '--json', str(report), stdout=out)
+
+        assert 'btree index on items.Item(category, name)' in out.getvalue()
+        assert json.loads(report.read_text())[0]['model'] == 'items.Item'
+
+    def test_command_requires_workload(self):
+        with pytest.raises(CommandError):
+            call_command('index_advisor')
+
+class TestDatabaseSettings:
+    def test_development_keeps_connections_with_health_checks(self):
+        config = database_settings('postgres://user:pass@db:5432/app', debug=True)
+        assert config['CONN_MAX_AGE'] == 60
+        assert config['CONN_HEALTH_CHECKS'] is True
+        assert 'pool' not in config['OPTIONS']
+        assert 'sslmode' not in config['OPTIONS']
+
+    def test_production_requires_ssl(self):
+        config = database_settings('postgres://user:pass@db:5432/app', debug=False)
+        assert config['CONN_MAX_AGE'] == 600
+        assert config['OPTIONS']['sslmode'] == 'require'
+
+    def test_pool_disables_persistent_connections(self):
+        config = database_settings('postgres://user:pass@db:5432/app', debug=False, pool=True, pool_max_size=8)
+        assert config['CONN_MAX_AGE'] == 0
+        assert config['CONN_HEALTH_CHECKS'] is True
+        assert config['OPTIONS']['pool'] == {'min_size': 2, 'max_size': 8, 'timeout': 10}
+
+    def test_pgbouncer_transaction_mode(self):
+        config = database_settings('postgres://user:pass@db:5432/app', debug=False, pgbouncer=True)
+        assert config['DISABLE_SERVER_SIDE_CURSORS'] is True
+        assert 'prepare_threshold' not in config['OPTIONS']
+
+    def test_pool_ignored_for_sqlite(self):
+        config = database_settings('sqlite:////tmp/app.db', debug=True, pool=True, conn_max_age=0)
+        assert config['ENGINE'] == 'django.db.backends.sqlite3'
+        assert config['CONN_MAX_AGE'] == 0
+        assert 'pool' not in config.get('OPTIONS', {})
+
+    def test_connection_benchmark_needs_postgres(self):
+        if connection.vendor == 'postgresql':
+            pytest.skip('Only meaningful on non-Postgres test databases')
+        with pytest.raises(CommandError, match='Postgres'):
+            call_command('benchmark_connections', '--iterations', '1')
+
+
+def replica_view(replica_reads=True):
+    # Stand-in for an as_view() function that records where its reads would go
+    def view(request):
+        view.routed_to = PrimaryReplicaRouter().db_for_read(Item)
+        return 'response'
+    view.cls = type('ReplicaView', (), {'replica_reads': replica_reads})
+    return view
+
+
+def run_middleware(request, view):
+    def get_response(request):
+        middleware.process_view(request, view, (), {})
+        return view(request)
+    middleware = ReplicaRoutingMiddleware(get_response)
+    return middleware(request)
+
+
+def bearer(user_id):
+    token = AccessToken()
+    token['user_id'] = user_id
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+class TestReplicaRouting:
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        settings.DATABASE_REPLICAS = ['replica_1']
+        settings.REPLICA_PIN_SECONDS = 5
+        cache.clear()
+
+    def test_router_defaults_to_primary(self):
+        router = PrimaryReplicaRouter()
+        assert router.db_for_read(Item) == 'default'
+        assert router.db_for_write(Item) == 'default'
+
+    def test_router_reads_from_selected_replica(self):
+        router = PrimaryReplicaRouter()
+        with use_replica('replica_1'):
+            assert router.db_for_read(Item) == 'replica_1'
+            assert router.db_for_write(Item) == 'default'
+        assert router.db_for_read(Item) == 'default'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_router_keeps_transactions_on_primary(self):
+        router = PrimaryReplicaRouter()
+        with use_replica('replica_1'):
+            with transaction.atomic():
+                assert router.db_for_read(Item) == 'default'
+
+    def test_replicas_are_not_migrated(self):
+        router = PrimaryReplicaRouter()
+        assert router.allow_migrate('default', 'items') is True
+        assert router.allow_migrate('replica_1', 'items') is False
+
+    def test_safe_request_to_opted_in_view_uses_replica(self):
+        view = replica_view()
+        assert run_middleware(RequestFactory().get('/api/items/', **bearer(7)), view) == 'response'
+        assert view.routed_to == 'replica_1'
+        assert _replica_alias.get() is None
+
+    def test_views_without_opt_in_stay_on_primary(self):
+        view = replica_view(replica_reads=False)
+        run_middleware(RequestFactory().get('/api/items/'), view)
+        assert view.routed_to == 'default'
+
+    def test_write_pins_user_to_primary(self):
+        view = replica_view()
+        run_middleware(RequestFactory().post('/api/items/', **bearer(7)), view)
+        assert view.routed_to == 'default'
+        assert is_pinned(7)
+
+        run_middleware(RequestFactory().get('/api/items/', **bearer(7)), view)
+        assert view.routed_to == 'default'
+        run_middleware(RequestFactory().get('/api/items/', **bearer(8)), view)
+        assert view.routed_to == 'replica_1'
+
+    def test_pin_expires(self, settings):
+        settings.REPLICA_PIN_SECONDS = 0.01
+        pin_user_to_primary(7)
+        time.sleep(0.05)
+        assert not is_pinned(7)
+
+    def test_no_replicas_configured(self, settings):
+        settings.DATABASE_REPLICAS = []
+        view = replica_view()
+        run_middleware(RequestFactory().get('/api/items/'), view)
+        assert view.routed_to == 'default'
+
+    def test_api_views_opt_in(self):
+        for view_class in (ItemViewSet, EventViewSet, ItemBookingViewSet, CategoryChoicesView):
+            assert view_class.replica_reads is True
+
+
+@pytest.mark.django_db
+class TestSharedCache:
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='Unlogged tables need Postgres')
+    def test_cache_table_is_created_unlogged(self, settings):
+        settings.CACHES = {**settings.CACHES, 'shared': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'test_unlogged_cache',
+        }}
+        create_unlogged_cache_tables()
+        create_unlogged_cache_tables()  # runs after every migrate
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relpersistence FROM pg_class WHERE relname = 'test_unlogged_cache'")
+            assert cursor.fetchone() == ('u',)
+
+    def test_cache_tables_are_left_alone_off_postgres(self, settings):
+        settings.CACHES = {**settings.CACHES, 'shared': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'test_unlogged_cache',
+        }}
+        create_unlogged_cache_tables()
+        if connection.vendor != 'postgresql':
+            assert 'test_unlogged_cache' not in connection.introspection.table_names()
+
+    def test_model_changes_bump_dependent_groups(self):
+        before = dict(zip(['items', 'bookings', 'availability', 'events'], group_versions('items', 'bookings', 'availability', 'events')))
+        item = Item.objects.create(name='Cable', quantity=3)
+        after = dict(zip(before, group_versions(*before)))
+        assert after['items'] > before['items']
+        assert after['bookings'] > before['bookings']
+        assert after['availability'] > before['availability']
+        assert after['events'] == before['events']
+
+        items_version = group_versions('items')
+        item.delete()
+        assert group_versions('items') > items_version
+
+    def test_category_changes_invalidate_items(self):
+        items_version = group_versions('items')
+        Category.objects.create(name='Audio')
+        assert group_versions('items') > items_version
+
+    def test_get_or_compute_reuses_value_until_bump(self):
+        calls = []
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        assert get_or_compute('demo', ('events',), compute) == 1
+        assert get_or_compute('demo', ('events',), compute) == 1
+        bump('events')
+        assert get_or_compute('demo', ('events',), compute) == 2
+
+    def test_bump_repeats_after_commit(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            (version,) = group_versions('events')
+            bump('events')
+            assert group_versions('events') == (version + 1,)
+        assert group_versions('events') == (version + 2,)
+
+    def test_roles_are_shared_and_invalidated_on_membership_change(self, staff_user, manager_group):
+        assert user_group_names(staff_user) == {'Staff'}
+
+        fresh = User.objects.get(pk=staff_user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            assert user_group_names(fresh) == {'Staff'}
+        assert not [query for query in queries if 'auth_user_groups' in query['sql']]
+
+        staff_user.groups.add(manager_group)
+        fresh = User.objects.get(pk=staff_user.pk)
+        assert user_group_names(fresh) == {'Staff', 'Manager'}
+
+    def test_notification_drops_local_versions(self):
+        _local_versions.update({'items': 3, 'events': 4})
+        notify.handle_notification('items,bookings')
+        assert _local_versions == {'events': 4}
+        _local_versions.clear()
+
+    def test_bus_is_inactive_off_postgres(self, settings):
+        settings.CACHE_INVALIDATION_LISTEN = True
+        if connection.vendor == 'postgresql':
+            pytest.skip('Only meaningful on non-Postgres test databases')
+        assert notify.listening() is False
+        notify.publish(['items'])
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_computation(self):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'report'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight('report', ('events',), compute)))
+                   for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert results == ['report'] * 5
+        assert len(calls) == 1
+        assert single_flight('report', ('events',), compute) == 'report'
+        assert len(calls) == 1
+
+    def test_invalidated_by_group_bump(self):
+        assert single_flight('report', ('events',), lambda: 1) == 1
+        bump('events')
+        assert single_flight('report', ('events',), lambda: 2) == 2
+
+    def test_waits_for_another_worker(self):
+        # Another worker holds the lock and stores its result while this one polls
+        key = versioned_key('report', ('events',))
+        cache.add(f'{key}:lock', True, 10)
+        threading.Timer(0.1, lambda: cache.set(key, 'theirs')).start()
+        assert single_flight('report', ('events',), lambda: 'ours', poll_interval=0.02) == 'theirs'
+
+    def test_serves_stale_while_another_worker_refreshes(self):
+        assert single_flight('report', ('events',), lambda: 'old', stale_seconds=30) == 'old'
+        bump('events')
+        key = versioned_key('report', ('events',))
+        cache.add(f'{key}:lock', True, 10)
+        assert single_flight('report', ('events',), lambda: 'new', stale_seconds=30) == 'old'
+        cache.delete(f'{key}:lock')
+        assert single_flight('report', ('events',), lambda: 'new', stale_seconds=30) == 'new'
+
+    def test_failure_releases_the_lock(self):
+        def fail():
+            raise RuntimeError('database unavailable')
+
+        with pytest.raises(RuntimeError):
+            single_flight('report', ('events',), fail)
+        assert cache.get(f"{versioned_key('report', ('events',))}:lock") is None
+        assert single_flight('report', ('events',), lambda: 'ok') == 'ok'
+
+
+class TestCanonicalQuery:
+    def test_sorts_and_drops_empty_values(self):
+        query = QueryDict('page=2&name=&ordering=-name&color=red&color=blue')
+        assert canonical_query(query) == 'color=blue&color=red&ordering=-name&page=2'
+
+    def test_normalizes_case_insensitive_params(self):
+        query = QueryDict('search=%20Top%20%20HAT&ordering=Name')
+        assert canonical_query(query, {'search'}) == 'ordering=Name&search=top hat'
+
+
+@pytest.mark.django_db
+class TestListCache:
+    def list_queries(self, client, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+        tables = ('items_item', 'events_event')
+        return response, [query for query in queries if any(table in query['sql'] for table in tables)]
+
+    def test_hit_skips_the_orm(self, staff_client, many_rows):
+        url = reverse('item-list')
+        first, queries = self.list_queries(staff_client, url, {'name': 'item', 'ordering': 'name'})
+        assert queries
+        second, queries = self.list_queries(staff_client, url, {'ordering': 'name', 'name': ' ITEM '})
+        assert queries == []
+        assert isinstance(second, CachedJSONResponse)
+        assert second['Content-Type'] == 'application/json'
+        assert second.content == first.content
+
+    def test_different_filters_are_cached_separately(self, staff_client, many_rows):
+        url = reverse('item-list')
+        assert staff_client.get(url, {'page': 1}).data['results'][0] != staff_client.get(url, {'page': 2}).data['results'][0]
+        assert staff_client.get(url, {'name': 'Item 1'}).data['count'] == 11
+        assert staff_client.get(url, {'name': 'Item 2'}).data['count'] == 6
+
+    def test_writes_invalidate(self, staff_client, many_rows):
+        url = reverse('item-list')
+        assert staff_client.get(url).data['count'] == 25
+        Item.objects.create(name='Item 25', quantity=1)
+        assert staff_client.get(url).data['count'] == 26
+
+        many_rows['categories'][0].delete()
+        response, queries = self.list_queries(staff_client, url)
+        assert queries
+
+        url = reverse('event-list')
+        assert staff_client.get(url).data['count'] == 25
+        many_rows['events'][0].delete()
+        assert staff_client.get(url).data['count'] == 24
+
+    def test_browsable_api_is_not_cached(self, staff_client, many_rows):
+        url = reverse('item-list')
+        staff_client.get(url, {'format': 'api'})
+        response, queries = self.list_queries(staff_client, url, {'format': 'api'})
+        assert queries
+
+
+@pytest.mark.django_db
+class TestObjectCache:
+    def item_queries(self, client, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+        return response, [query['sql'] for query in queries if 'items_item' in query['sql']]
+
+    def test_retrieve_reads_through(self, staff_client, many_rows):
+        item = many_rows['items'][0]
+        url = reverse('item-detail', args=[item.pk])
+        first, queries = self.item_queries(staff_client, url)
+        assert queries
+        second, queries = self.item_queries(staff_client, url)
+        # Only the existence check: no joins, related rows or serialization
+        assert len(queries) == 1 and queries[0].startswith('SELECT 1 AS')
+        assert second.data == first.data
+
+    def test_hits_respect_filters_and_object_permissions(self, staff_client, many_rows, monkeypatch):
+        item = many_rows['items'][0]
+        url = reverse('item-detail', args=[item.pk])
+        assert staff_client.get(url).status_code == status.HTTP_200_OK
+        other = many_rows['categories'][1].pk
+        assert staff_client.get(url, {'category': other}).status_code == status.HTTP_404_NOT_FOUND
+
+        checked = []
+
+        def has_object_permission(permission, request, view, obj):
+            checked.append(obj)
+            return False
+
+        monkeypatch.setattr(IsManagerOrStaffReadOnly, 'has_object_permission', has_object_permission, raising=False)
+        assert staff_client.get(url).status_code == status.HTTP_403_FORBIDDEN
+        assert checked == [item]
+
+    def test_save_and_delete_invalidate(self, staff_client, many_rows):
+        event = many_rows['events'][0]
+        url = reverse('event-detail', args=[event.pk])
+        staff_client.get(url)
+        event.name = 'Renamed'
+        event.save()
+        assert staff_client.get(url).data['name'] == 'Renamed'
+        event.delete()
+        assert staff_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_equivalent_detail_urls_share_an_entry(self, staff_client, manager_client, many_rows):
+        item = many_rows['items'][0]
+        padded = f'/api/items/0{item.pk}/'
+        staff_client.get(padded)
+        assert manager_client.patch(padded, {'name': 'Renamed'}, format='json').status_code == status.HTTP_200_OK
+        assert staff_client.get(padded).data['name'] == 'Renamed'
+        assert staff_client.get('/api/items/abc/').status_code == status.HTTP_404_NOT_FOUND
+
+    def test_category_rename_invalidates_items(self, staff_client, many_rows):
+        item, category = many_rows['items'][0], many_rows['items'][0].category
+        url = reverse('item-detail', args=[item.pk])
+        staff_client.get(url)
+        category.name = 'Cloaks'
+        category.save()
+        assert staff_client.get(url).data['category']['name'] == 'Cloaks'
+
+        category.delete()
+        assert staff_client.get(url).data['category'] is None
+
+    def test_list_queries_only_missing_rows(self, staff_client, many_rows):
+        first_page = many_rows['items'][:10]
+        staff_client.get(reverse('item-detail', args=[first_page[0].pk]))
+        cache.delete(object_key(Item, first_page[1].pk))
+        for item in first_page[2:]:
+            staff_client.get(reverse('item-detail', args=[item.pk]))
+
+        response, queries = self.item_queries(staff_client, reverse('item-list'))
+        assert [row['id'] for row in response.data['results']] == [item.pk for item in first_page]
+        # Only the evicted row is loaded from the database
+        assert f'IN ({first_page[1].pk})' in queries[-1]
+
+    def test_get_many_keeps_order_and_skips_unknown(self, many_rows):
+        pks = [many_rows['items'][2].pk, many_rows['items'][0].pk, 0]
+        fetched = []
+
+        def fetch(missing):
+            fetched.append(list(missing))
+            return Item.objects.filter(pk__in=missing)
+
+        serialize = lambda objects: [{'id': obj.pk} for obj in objects]
+        assert get_many(Item, pks, fetch, serialize) == [{'id': pks[0]}, {'id': pks[1]}]
+        assert get_many(Item, pks, fetch, serialize) == [{'id': pks[0]}, {'id': pks[1]}]
+        assert fetched == [pks, [0]]
+
+
+class TestPreEncodedRenderer:
+    def test_splices_pre_encoded_rows(self):
+        renderer = PreEncodedJSONRenderer()
+        rows = [{'id': 1, 'name': 'Café'}, {'id': 2, 'name': None}]
+        page = {'count': 2, 'next': None, 'results': [PreEncoded(renderer.render(row)) for row in rows]}
+        assert renderer.render(page) == renderer.render({'count': 2, 'next': None, 'results': rows})
+
+    def test_indented_output_decodes(self):
+        renderer = PreEncodedJSONRenderer()
+        data = [PreEncoded(b'{"id":1}')]
+        assert json.loads(renderer.render(data, 'application/json; indent=2')) == [{'id': 1}]
+
+    def test_pre_encoded_is_a_lazy_mapping(self):
+        row = PreEncoded(b'{"id":1,"name":"Cape"}')
+        assert row == {'id': 1, 'name': 'Cape'}
+        assert row['name'] == 'Cape'
+        restored = pickle.loads(pickle.dumps(row))
+        assert restored.encoded == row.encoded and restored._decoded is None
+
+
+@pytest.mark.django_db
+class TestResponsePipeline:
+    def test_page_size_is_capped(self, staff_client, many_rows):
+        url = reverse('item-list')
+        assert len(staff_client.get(url, {'page_size': 20}).data['results']) == 20
+        Item.objects.bulk_create([Item(name=f'Bulk {i}', quantity=1) for i in range(100)])
+        bump('items')  # bulk_create sends no signals; the cached count would stay at 25
+        assert len(staff_client.get(url, {'page_size': 500}).data['results']) == 100
+
+    def test_large_responses_are_gzipped(self, staff_client, many_rows):
+        url = reverse('item-list')
+        response = staff_client.get(url, {'page_size': 25}, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.content))['count'] == 25
+
+    def test_small_responses_are_not_gzipped(self, staff_client, settings):
+        settings.GZIP_MIN_BYTES = 1024
+        response = staff_client.get(reverse('item-list'), HTTP_ACCEPT_ENCODING='gzip')
+        assert len(response.content) < 1024
+        assert not response.has_header('Content-Encoding')
+
+    def test_current_future_events_served_from_cached_rows(self, staff_client, many_rows):
+        url = reverse('current-future-events')
+        first = staff_client.get(url)
+        second = staff_client.get(url)
+        assert second.content == first.content
+        assert all(isinstance(row, PreEncoded) for row in second.data)
+        assert [row['name'] for row in second.data][:2] == ['Event 0', 'Event 1']
+
+    def test_current_future_events_cache_fresh_rows(self, staff_client, many_rows, monkeypatch):
+        # The single-flight list may be served stale after a write; its rows must not refill the object cache
+        stale = list(Event.objects.filter(end_datetime__gte=timezone.now()).order_by('start_datetime'))
+        renamed, deleted = many_rows['events'][1], many_rows['events'][2]
+        renamed.name = 'Renamed'
+        renamed.save()
+        deleted.delete()
+        monkeypatch.setattr('events.api.views.single_flight', lambda *args, **kwargs: stale)
+
+        names = [row['name'] for row in staff_client.get(reverse('current-future-events')).data]
+        assert 'Renamed' in names and 'Event 1' not in names and 'Event 2' not in names
+        assert staff_client.get(reverse('event-detail', args=[renamed.pk])).data['name'] == 'Renamed'
+
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+    def select_sql(self, client, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'COUNT' not in query['sql']]
+        return response, selects[-1]
+
+    def test_selected_fields_validation(self):
+        available = ['id', 'name', 'notes']
+        assert selected_fields(QueryDict(''), available) is None
+        assert selected_fields(QueryDict('fields=id,name'), available) == {'id', 'name'}
+        assert selected_fields(QueryDict('omit=notes'), available) == {'id', 'name'}
+        assert selected_fields(QueryDict('fields=id,name&omit=name'), available) == {'id'}
+        with pytest.raises(DRFValidationError):
+            selected_fields(QueryDict('fields=id,secret'), available)
+
+    def test_item_list_trims_output_and_sql(self, staff_client, many_rows):
+        response, sql = self.select_sql(staff_client, reverse('item-list'), {'fields': 'id,name'})
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data['results'][0]) == {'id', 'name'}
+        assert 'description' not in sql and 'items_category' not in sql
+
+    def test_category_keeps_its_join(self, staff_client, many_rows):
+        response, sql = self.select_sql(staff_client, reverse('item-list'), {'fields': 'name,category'})
+        assert response.data['results'][0]['category']['name'] == many_rows['items'][0].category.name
+        assert 'items_category' in sql and 'description' not in sql
+
+    def test_omit_on_event_detail(self, staff_client, many_rows):
+        event = many_rows['events'][0]
+        staff_client.get(reverse('event-detail', args=[event.pk]))  # full representation is cached
+        response, sql = self.select_sql(staff_client, reverse('event-detail', args=[event.pk]), {'omit': 'notes'})
+        assert 'notes' not in response.data and response.data['name'] == event.name
+        assert '"notes"' not in sql
+
+    def test_bookings_select_related_fields(self, staff_client, many_rows):
+        response, sql = self.select_sql(staff_client, reverse('itembooking-list'), {'fields': 'id,item_name,quantity'})
+        assert set(response.data['results'][0]) == {'id', 'item_name', 'quantity'}
+        assert 'events_event' not in sql and '"description"' not in sql
+
+    def test_current_future_events_for_dropdown(self, staff_client, many_rows):
+        url = reverse('current-future-events')
+        params = {'fields': 'id,name,start_datetime'}
+        response, sql = self.select_sql(staff_client, url, params)
+        assert set(response.data[0]) == {'id', 'name', 'start_datetime'}
+        assert '"notes"' not in sql
+        assert staff_client.get(url, params).data == response.data
+        assert 'notes' in staff_client.get(url).data[0]
+
+    def test_unknown_field_is_rejected(self, staff_client, many_rows):
+        response = staff_client.get(reverse('event-list'), {'fields': 'name,password'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'password' in response.data['fields'][0]
+
+
+@pytest.mark.django_db
+class TestExpand:
+    def counted(self, client, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK, response.content
+        return response, len(queries)
+
+    def test_event_detail_with_bookings_and_items(self, staff_client, many_rows):
+        event = many_rows['events'][0]
+        for item in many_rows['items'][1:4]:
+            ItemBooking.objects.create(item=item, event=event, quantity=1)
+        url = reverse('event-detail', args=[event.pk])
+
+        response, queries = self.counted(staff_client, url, {'expand': 'bookings.item'})
+        bookings = response.data['bookings']
+        assert len(bookings) == 4
+        assert {booking['item_name'] for booking in bookings} == {item.name for item in many_rows['items'][:4]}
+        assert bookings[0]['item']['category']['name']
+        assert queries <= EventViewSet.query_budgets['retrieve']
+
+        plain = staff_client.get(url, {'expand': 'bookings'}).data['bookings'][0]
+        assert isinstance(plain['item'], int)
+        assert 'bookings' not in staff_client.get(url).data
+
+    def test_expanded_list_is_constant_in_queries(self, staff_client, many_rows):
+        url = reverse('item-list')
+        response, queries = self.counted(staff_client, url, {'expand': 'bookings.event', 'page_size': 25})
+        assert all(len(row['bookings']) == 1 for row in response.data['results'])
+        assert response.data['results'][0]['bookings'][0]['event']['name'] == 'Event 0'
+        assert queries <= ItemViewSet.query_budgets['list']
+
+    def test_item_category_expansion(self, staff_client, many_rows):
+        item = many_rows['items'][0]
+        response, _ = self.counted(staff_client, reverse('item-detail', args=[item.pk]), {'expand': 'category'})
+        assert response.data['category'] == {'id': item.category.pk, 'name': item.category.name}
+
+    def test_expanded_pages_follow_booking_changes(self, staff_client, many_rows):
+        url = reverse('event-list')
+        params = {'expand': 'bookings', 'page_size': 1}
+        assert len(staff_client.get(url, params).data['results'][0]['bookings']) == 1
+        many_rows['bookings'][0].delete()
+        assert staff_client.get(url, params).data['results'][0]['bookings'] == []
+
+    def test_unknown_expansion_is_rejected(self, staff_client, many_rows):
+        response = staff_client.get(reverse('event-list'), {'expand': 'bookings.owner'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'bookings.owner' in response.data['expand'][0]
+
+
+@pytest.mark.django_db
+class TestBatch:
+    def test_runs_sub_requests_together(self, staff_client, many_rows):
+        event = many_rows['events'][0]
+        response = staff_client.post(reverse('batch'), {'requests': [
+            {'id': 'categories', 'path': '/api/items/categories/'},
+            {'id': 'items', 'path': '/api/items/?page=2&fields=id,name'},
+            {'path': f'/api/events/{event.pk}/?expand=bookings'},
+            {'path': '/api/events/current-future/'},
+        ]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        results = json.loads(response.content)['responses']
+        assert [result['id'] for result in results] == ['categories', 'items', 2, 3]
+        assert all(result['status'] == 200 for result in results)
+        assert [category['label'] for category in results[0]['body']] == ['Capes', 'Hats', 'Masks']
+        assert set(results[1]['body']['results'][0]) == {'id', 'name'}
+        assert results[2]['body']['bookings'][0]['event'] == event.pk
+
+    def test_authenticates_and_loads_groups_once(self, staff_client, many_rows):
+        paths = ['/api/items/', '/api/events/', '/api/itembookings/', '/api/items/categories/']
+        with CaptureQueriesContext(connection) as queries:
+            staff_client.post(reverse('batch'), {'requests': [{'path': path} for path in paths]}, format='json')
+        sql = [query['sql'] for query in queries]
+        assert len([query for query in sql if 'FROM "auth_user"' in query]) == 1
+        assert len([query for query in sql if 'auth_user_groups' in query]) == 1
+
+    def test_sub_request_errors_are_reported_individually(self, staff_client, many_rows):
+        response = staff_client.post(reverse('batch'), {'requests': [
+            {'path': '/api/items/999999/'},
+            {'path': '/api/nowhere/'},
+            {'path': 'https://example.com/api/items/'},
+            {'path': '/api/batch/'},
+            {'path': '/api/events/?fields=password'},
+            {'path': '/api/items/'},
+        ]}, format='json')
+        statuses = [result['status'] for result in json.loads(response.content)['responses']]
+        assert statuses == [404, 404, 400, 400, 400, 200]
+
+    def test_async_endpoints_are_rejected(self, staff_client, many_rows):
+        response = staff_client.post(reverse('batch'), {'requests': [
+            {'path': '/api/async/items/'},
+            {'path': '/api/async/changes/'},
+            {'path': '/api/items/'},
+        ]}, format='json')
+        results = json.loads(response.content)['responses']
+        assert [result['status'] for result in results] == [400, 400, 200]
+        assert results[0]['body'] == {'detail': 'Async endpoints cannot be batched.'}
+
+    def test_sub_requests_reuse_the_batch_user(self, staff_user):
+        request = RequestFactory().get('/api/batch/')
+        request.user, request.auth = staff_user, 'token'
+        sub = batch.sub_request(request, '/api/items/', 'page=2')
+        assert batch.BatchAuthentication().authenticate(Request(sub)) == (staff_user, 'token')
+        assert batch.BatchAuthentication().authenticate(Request(RequestFactory().get('/api/items/'))) is None
+
+    def test_sub_requests_route_like_direct_calls(self, staff_client, many_rows, settings, monkeypatch):
+        # Sync reads the primary on purpose, even when the batch request itself is on a replica
+        settings.DATABASE_REPLICAS = ['replica_1']
+        monkeypatch.setattr('core.middleware.choose_replica', lambda: 'replica_1')
+        routed = []
+
+        def recording(router, model, **hints):
+            # The test's transaction keeps every read on the primary, so record the alias picked for the request
+            routed.append((model._meta.label, _replica_alias.get() or 'default'))
+            return 'default'
+
+        monkeypatch.setattr(PrimaryReplicaRouter, 'db_for_read', recording)
+        staff_client.get(reverse('sync'))
+        direct = set(routed)
+        routed.clear()
+        response = staff_client.post(reverse('batch'), {'requests': [
+            {'path': '/api/sync/'}, {'path': '/api/items/categories/'},
+        ]}, format='json')
+        assert [result['status'] for result in json.loads(response.content)['responses']] == [200, 200]
+        assert ('items.Item', 'default') in direct
+        assert {alias for label, alias in routed if label in ('items.Item', 'events.Event')} == {'default'}
+        assert ('items.Category', 'replica_1') in routed
+
+    def test_unauthenticated_requests_still_get_a_bearer_challenge(self, api_client):
+        response = api_client.get(reverse('item-list'))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response['WWW-Authenticate'].startswith('Bearer')
+
+    def test_permissions_apply_per_sub_request(self, api_client, regular_user):
+        api_client.force_authenticate(regular_user)
+        response = api_client.post(reverse('batch'), {'requests': [{'path': '/api/items/'}]}, format='json')
+        assert json.loads(response.content)['responses'][0]['status'] == status.HTTP_403_FORBIDDEN
+
+    def test_rejects_invalid_batches(self, staff_client, api_client, settings):
+        url = reverse('batch')
+        assert api_client.post(url, {'requests': [{'path': '/api/items/'}]}, format='json').status_code == 401
+        assert staff_client.post(url, {'requests': []}, format='json').status_code == 400
+        bad_method = {'requests': [{'method': 'DELETE', 'path': '/api/items/1/'}]}
+        assert staff_client.post(url, bad_method, format='json').status_code == 400
+        too_many = {'requests': [{'path': '/api/items/'}] * 21}
+        assert staff_client.post(url, too_many, format='json').status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_batch_runs_concurrently_under_asgi(staff_client, many_rows, monkeypatch):
+    threads = set()
+    perform = batch.perform
+
+    def recording_perform(request, url):
+        threads.add(threading.get_ident())
+        return perform(request, url)
+
+    # Treat the test client's WSGI request as if it came in over ASGI
+    monkeypatch.setattr(batch, 'ASGIRequest', object)
+    monkeypatch.setattr(batch, 'perform', recording_perform)
+    response = staff_client.post(reverse('batch'), {'requests': [
+        {'path': '/api/items/'}, {'path': '/api/events/'}, {'path': '/api/itembookings/'},
+    ]}, format='json')
+    results = json.loads(response.content)['responses']
+    assert [result['status'] for result in results] == [200, 200, 200]
+    assert results[0]['body']['count'] == 25
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    def body(self, response):
+        return json.loads(response.content)
+
+    @pytest.mark.parametrize('query', ['', '?page=2', '?search=Item 1&ordering=-name', '?category=0&page_size=5'])
+    def test_item_list_matches_sync(self, staff_client, many_rows, query):
+        if 'category=0' in query:
+            query = query.replace('0', str(many_rows['categories'][1].pk), 1)
+        sync = self.body(staff_client.get('/api/items/' + query))
+        response = staff_client.get('/api/async/items/' + query)
+        assert response.status_code == status.HTTP_200_OK
+        body = self.body(response)
+        assert (body['count'], body['results']) == (sync['count'], sync['results'])
+        assert (body['next'] is None) == (sync['next'] is None)
+        assert (body['previous'] is None) == (sync['previous'] is None)
+
+    def test_event_list_and_details_match_sync(self, staff_client, many_rows):
+        item, event = many_rows['items'][0], many_rows['events'][0]
+        assert self.body(staff_client.get('/api/async/events/?page=3'))['results'] == \
+            self.body(staff_client.get('/api/events/?page=3'))['results']
+        assert self.body(staff_client.get(f'/api/async/items/{item.pk}/')) == \
+            self.body(staff_client.get(f'/api/items/{item.pk}/'))
+        assert self.body(staff_client.get(f'/api/async/events/{event.pk}/')) == \
+            self.body(staff_client.get(f'/api/events/{event.pk}/'))
+
+    def test_other_reads_match_sync(self, staff_client, many_rows):
+        item, event = many_rows['items'][0], many_rows['events'][0]
+        for path in [
+            'items/categories/', 'events/current-future/', f'items/{item.pk}/availability/?event={event.pk}',
+            f'items/{item.pk}/availability/?start={event.start_datetime.isoformat().replace("+", "%2B")}'
+            f'&end={event.end_datetime.isoformat().replace("+", "%2B")}',
+        ]:
+            response = staff_client.get('/api/async/' + path)
+            assert response.status_code == status.HTTP_200_OK, path
+            assert self.body(response) == self.body(staff_client.get('/api/' + path)), path
+
+    def test_errors(self, staff_client, manager_client, many_rows):
+        item = many_rows['items'][0]
+        assert staff_client.get('/api/async/items/999999/').status_code == status.HTTP_404_NOT_FOUND
+        assert staff_client.get('/api/async/items/?page=9').status_code == status.HTTP_404_NOT_FOUND
+        response = staff_client.get(f'/api/async/items/{item.pk}/availability/?event=abc')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert self.body(response) == {'event': 'Event not found.'}
+        assert staff_client.get(f'/api/async/items/{item.pk}/availability/').status_code == 400
+        naive_start = f'/api/async/items/{item.pk}/availability/?start=2026-01-01T00:00:00&end=2026-01-02T00:00:00Z'
+        assert staff_client.get(naive_start).status_code == status.HTTP_200_OK
+        # Read-only: permissions are checked first, as in DRF
+        assert staff_client.post('/api/async/items/', {}).status_code == status.HTTP_403_FORBIDDEN
+        assert manager_client.post('/api/async/items/', {}).status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    def test_authentication_and_permissions(self, api_client, regular_user, many_rows):
+        response = api_client.get('/api/async/items/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response['WWW-Authenticate'] == 'Bearer realm="api"'
+        api_client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        assert api_client.get('/api/async/items/').status_code == status.HTTP_401_UNAUTHORIZED
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(regular_user).access_token}')
+        assert api_client.get('/api/async/events/').status_code == status.HTTP_403_FORBIDDEN
+
+    def test_reads_share_the_object_cache(self, staff_client, many_rows):
+        item = many_rows['items'][0]
+        staff_client.get(f'/api/items/{item.pk}/')
+        assert cache.get(object_key(Item, item.pk)) is not None
+        Item.objects.filter(pk=item.pk).update(name='Changed behind the cache')
+        assert self.body(staff_client.get(f'/api/async/items/{item.pk}/'))['name'] == item.name
+
+    def test_within_budget(self, staff_client, many_rows):
+        item, event = many_rows['items'][0], many_rows['events'][0]
+        assert_query_budget(staff_client, 'get', '/api/async/items/', AsyncItemView, 'get')
+        assert_query_budget(staff_client, 'get', f'/api/async/items/{item.pk}/', AsyncItemView, 'get')
+        assert_query_budget(staff_client, 'get', '/api/async/events/', AsyncEventView, 'get')
+        assert_query_budget(staff_client, 'get', '/api/async/items/categories/', AsyncCategoryChoicesView, 'get')
+        assert_query_budget(
+            staff_client, 'get', '/api/async/events/current-future/', AsyncCurrentFutureEventsView, 'get'
+        )
+        assert_query_budget(
+            staff_client, 'get', f'/api/async/items/{item.pk}/availability/?event={event.pk}',
+            AsyncItemAvailabilityView, 'get',
+        )
+
+    def test_replica_routing_applies(self, staff_client, many_rows, settings, monkeypatch):
+        settings.DATABASE_REPLICAS = ['replica_test']
+        seen = []
+        monkeypatch.setattr('core.middleware.choose_replica', lambda: seen.append(True) or None)
+        staff_client.get('/api/async/items/')
+        assert seen == [True]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_served_over_asgi(staff_user):
+    # AsyncClient goes through Django's ASGI handler, so the views run on the event loop
+    item = Item.objects.create(name='Velvet Cape', quantity=2)
+    client = AsyncClient()
+    headers = {'Authorization': f'Bearer {RefreshToken.for_user(staff_user).access_token}'}
+
+    async def fetch():
+        return await asyncio.gather(*[
+            client.get(path, headers=headers)
+            for path in ['/api/async/items/', f'/api/async/items/{item.pk}/', '/api/async/events/current-future/']
+        ])
+
+    listing, detail, events = asyncio.run(fetch())
+    assert json.loads(listing.content)['results'][0]['name'] == 'Velvet Cape'
+    assert json.loads(detail.content)['quantity'] == 2
+    assert json.loads(events.content) == []
+
+
+def test_asgi_middleware_stack_stays_async(settings, caplog):
+    # One sync-only middleware would adapt the stack below it, running every async view in a thread
+    settings.DEBUG = True  # Django only logs adaptations in debug mode
+    with caplog.at_level('DEBUG', logger='django.request'):
+        ASGIHandler()
+    assert 'adapted' not in caplog.text
+
+
+@pytest.mark.django_db(transaction=True)
+def test_middleware_applies_over_asgi(staff_user, settings, monkeypatch, caplog):
+    settings.DATABASE_REPLICAS = ['replica_test']
+    seen = []
+    monkeypatch.setattr('core.middleware.choose_replica', lambda: seen.append(True) or None)
+    monkeypatch.setattr(AsyncItemView, 'query_budgets', {'get': 1})
+    headers = {'Authorization': f'Bearer {RefreshToken.for_user(staff_user).access_token}'}
+    with caplog.at_level('WARNING', logger='core.middleware'):
+        response = asyncio.run(AsyncClient().get('/api/async/items/', headers=headers))
+    assert response.status_code == status.HTTP_200_OK
+    assert seen == [True]
+    assert 'Query budget exceeded: AsyncItemView.get' in caplog.text
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_generator_against_async_endpoints(live_server, manager_user, staff_user):
+    now = timezone.now()
+    Item.objects.create(name='Velvet Cape', quantity=1)
+    Event.objects.create(name='Gala', start_datetime=now + timedelta(days=1), end_datetime=now + timedelta(days=2))
+
+    generator = LoadGenerator(
+        live_server.url, 'staff', 'testpass123', concurrency=2, duration=0.5,
+        mix={'browse': 2, 'search': 1, 'view_event': 1}, seed=1, api_prefix='/api/async/',
+    )
+    report = asyncio.run(generator.run(cleanup=True))
+    assert report['requests'] > 0
+    assert report['error_rate'] == 0
+
+
+@pytest.mark.django_db
+class TestChangeMessages:
+    @pytest.fixture
+    def delivered(self, monkeypatch):
+        payloads = []
+        monkeypatch.setattr(changes.broadcaster, 'has_subscribers', lambda: True)
+        monkeypatch.setattr(changes.broadcaster, 'deliver', payloads.append)
+        return payloads
+
+    def messages(self, payloads):
+        return [json.loads(payload) for payload in payloads]
+
+    def test_booking_changes_carry_availability(self, delivered, django_capture_on_commit_callbacks):
+        now = timezone.now()
+        item = Item.objects.create(name='Velvet Cape', quantity=5)
+        event = Event.objects.create(name='Gala', start_datetime=now, end_datetime=now + timedelta(hours=4))
+        delivered.clear()
+        with django_capture_on_commit_callbacks(execute=True):
+            booking = ItemBooking.objects.create(item=item, event=event, quantity=2)
+        booking_pk = booking.pk
+        with django_capture_on_commit_callbacks(execute=True):
+            booking.delete()
+        assert self.messages(delivered) == [
+            {'type': 'booking', 'action': 'created', 'id': booking_pk, 'item': item.pk, 'event': event.pk, 'available': 3},
+            {'type': 'booking', 'action': 'deleted', 'id': booking_pk, 'item': item.pk, 'event': event.pk, 'available': 5},
+        ]
+
+    def test_item_and_event_changes(self, delivered, django_capture_on_commit_callbacks):
+        now = timezone.now()
+        with django_capture_on_commit_callbacks(execute=True):
+            item = Item.objects.create(name='Velvet Cape', quantity=5)
+            item.quantity = 4
+            item.save()
+            event = Event.objects.create(name='Gala', start_datetime=now, end_datetime=now + timedelta(hours=4))
+            event_pk = event.pk
+            event.delete()
+        assert self.messages(delivered) == [
+            {'type': 'item', 'action': 'created', 'id': item.pk, 'quantity': 4},
+            {'type': 'item', 'action': 'updated', 'id': item.pk, 'quantity': 4},
+            {'type': 'event', 'action': 'created', 'id': event_pk, 'start': now.isoformat(),
+             'end': (now + timedelta(hours=4)).isoformat()},
+            {'type': 'event', 'action': 'deleted', 'id': event_pk},
+        ]
+
+    def test_published_only_after_commit(self, delivered, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            Item.objects.create(name='Velvet Cape', quantity=5)
+            assert delivered == []
+        assert len([callback for callback in callbacks if 'record_change' in callback.__qualname__]) == 1
+
+    def test_skipped_without_subscribers(self, django_capture_on_commit_callbacks, settings):
+        settings.CHANGE_STREAM_LISTEN = False
+        with django_capture_on_commit_callbacks() as callbacks:
+            Item.objects.create(name='Velvet Cape', quantity=5)
+        assert not [callback for callback in callbacks if 'record_change' in callback.__qualname__]
+
+    def test_relay_falls_back_to_local_delivery_without_postgres(self, delivered, settings):
+        settings.CHANGE_STREAM_LISTEN = True
+        changes.publish({'type': 'item', 'action': 'deleted', 'id': 1})
+        assert delivered == ['{"type":"item","action":"deleted","id":1}']
+
+
+class TestBroadcaster:
+    def test_delivers_frames_to_each_subscriber(self):
+        async def run():
+            broadcaster = changes.Broadcaster()
+            first, second = broadcaster.subscribe(), broadcaster.subscribe()
+            broadcaster.deliver('{"id":1}')
+            frames = [await asyncio.wait_for(sub.queue.get(), 1) for sub in (first, second)]
+            broadcaster.unsubscribe(first)
+            broadcaster.unsubscribe(second)
+            return frames, broadcaster.has_subscribers()
+
+        frames, subscribed = asyncio.run(run())
+        assert frames == ['event: change\ndata: {"id":1}\n\n'] * 2
+        assert subscribed is False
+
+    def test_slow_subscriber_gets_resync(self, monkeypatch):
+        monkeypatch.setattr(changes.Subscription, 'max_pending', 2)
+
+        async def run():
+            broadcaster = changes.Broadcaster()
+            subscription = broadcaster.subscribe()
+            for pk in range(3):
+                broadcaster.deliver(f'{{"id":{pk}}}')
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+        assert asyncio.run(run()) == [changes.RESYNC_FRAME]
+
+    def test_heartbeat_when_idle(self):
+        async def run():
+            frames = changes.stream(0.01)
+            result = [await frames.__anext__(), await frames.__anext__()]
+            await frames.aclose()
+            return result
+
+        assert asyncio.run(run()) == ['retry: 5000\n\n', ': ping\n\n']
+        assert changes.broadcaster.has_subscribers() is False
+
+
+@pytest.mark.django_db
+class TestChangeStreamView:
+    def test_needs_asgi(self, staff_client):
+        response = staff_client.get(reverse('change-stream'))
+        assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+    def test_needs_authentication(self, api_client):
+        assert api_client.get(reverse('change-stream')).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_event_stream_is_not_compressed(self, rf, settings):
+        from django.http import StreamingHttpResponse
+        from .middleware import ThresholdGZipMiddleware
+        response = StreamingHttpResponse(iter(['data: {}\n\n']), content_type='text/event-stream')
+        request = rf.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        assert ThresholdGZipMiddleware(lambda request: response)(request).get('Content-Encoding') is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_change_stream_over_asgi(staff_user):
+    now = timezone.now()
+    item = Item.objects.create(name='Velvet Cape', quantity=3)
+    event = Event.objects.create(name='Gala', start_datetime=now, end_datetime=now + timedelta(hours=4))
+    headers = {'Authorization': f'Bearer {RefreshToken.for_user(staff_user).access_token}'}
+
+    async def run():
+        response = await AsyncClient().get(reverse('change-stream'), headers=headers)
+        frames = aiter(response.streaming_content)
+        first = await anext(frames)
+        await sync_to_async(ItemBooking.objects.create)(item=item, event=event, quantity=1)
+        change = await asyncio.wait_for(anext(frames), 5)
+        await frames.aclose()
+        return response, first, change
+
+    response, first, change = asyncio.run(run())
+    assert response['Content-Type'] == 'text/event-stream'
+    assert first == b'retry: 5000\n\n'
+    event_name, data = change.decode().strip().split('\n')
+    assert event_name == 'event: change'
+    assert json.loads(data.removeprefix('data: ')) == {
+        'type': 'booking', 'action': 'created', 'id': ItemBooking.objects.get().pk,
+        'item': item.pk, 'event': event.pk, 'available': 2,
+    }
+
+
+@pytest.mark.django_db
+class TestSync:
+    @pytest.fixture(autouse=True)
+    def no_overlap(self, settings):
+        settings.SYNC_OVERLAP_SECONDS = 0
+
+    def sync(self, client, token=None):
+        response = client.get(reverse('sync'), {'since': token} if token else {})
+        assert response.status_code == status.HTTP_200_OK
+        return json.loads(response.content)
+
+    def ids(self, body, key):
+        return sorted(row['id'] for row in body['changed'][key])
+
+    def test_full_sync_without_token(self, staff_client, many_rows):
+        body = self.sync(staff_client)
+        assert body['full'] is True
+        assert len(body['changed']['items']) == len(body['changed']['events']) == len(body['changed']['bookings']) == 25
+        assert body['deleted'] == {'items': [], 'events': [], 'bookings': []}
+        assert body['changed']['items'][0] == json.loads(staff_client.get(reverse('item-detail', args=[many_rows['items'][0].pk])).content)
+
+    def test_returns_only_changes_since_token(self, staff_client, many_rows):
+        token = self.sync(staff_client)['token']
+        item, booking = many_rows['items'][3], many_rows['bookings'][7]
+        item.quantity = 9
+        item.save()
+        booking_pk = booking.pk
+        booking.delete()
+        event = Event.objects.create(
+            name='Late Addition', start_datetime=timezone.now(), end_datetime=timezone.now() + timedelta(hours=1)
+        )
+
+        body = self.sync(staff_client, token)
+        assert body['full'] is False
+        assert self.ids(body, 'items') == [item.pk]
+        assert body['changed']['items'][0]['quantity'] == 9
+        assert self.ids(body, 'events') == [event.pk]
+        # The item's own booking is stamped too: it embeds the item's name
+        assert self.ids(body, 'bookings') == [many_rows['bookings'][3].pk]
+        assert body['deleted'] == {'items': [], 'events': [], 'bookings': [booking_pk]}
+        assert self.sync(staff_client, body['token'])['changed'] == {'items': [], 'events': [], 'bookings': []}
+
+    def test_renamed_category_marks_its_items_changed(self, staff_client, many_rows):
+        token = self.sync(staff_client)['token']
+        category = many_rows['categories'][0]
+        category.name = 'Cloaks'
+        category.save()
+        body = self.sync(staff_client, token)
+        assert self.ids(body, 'items') == sorted(item.pk for item in many_rows['items'] if item.category_id == category.pk)
+        assert {row['category']['name'] for row in body['changed']['items']} == {'Cloaks'}
+
+    def test_cascaded_deletes_leave_tombstones_in_one_insert(self, staff_client, many_rows):
+        token = self.sync(staff_client)['token']
+        event, booking = many_rows['events'][2], many_rows['bookings'][2]
+        event_pk, booking_pk = event.pk, booking.pk
+        with CaptureQueriesContext(connection) as queries:
+            event.delete()
+        assert len([query for query in queries if 'INSERT INTO "core_tombstone"' in query['sql']]) == 1
+        body = self.sync(staff_client, token)
+        assert body['deleted'] == {'items': [], 'events': [event_pk], 'bookings': [booking_pk]}
+
+    def test_expired_token_gets_full_sync(self, staff_client, many_rows, settings):
+        old = encode_token(timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS + 1))
+        assert self.sync(staff_client, old)['full'] is True
+
+    def test_invalid_token(self, staff_client):
+        response = staff_client.get(reverse('sync'), {'since': 'yesterday'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert json.loads(response.content) == {'since': ['Invalid sync token.']}
+
+    def test_permissions_and_budget(self, api_client, regular_user, staff_client, many_rows):
+        assert api_client.get(reverse('sync')).status_code == status.HTTP_401_UNAUTHORIZED
+        api_client.force_authenticate(regular_user)
+        assert api_client.get(reverse('sync')).status_code == status.HTTP_403_FORBIDDEN
+        token = self.sync(staff_client)['token']
+        assert_query_budget(staff_client, 'get', reverse('sync') + f'?since={token}', SyncView, 'get')
+        cache.clear()
+        assert_query_budget(staff_client, 'get', reverse('sync'), SyncView, 'get')
+
+    def test_prune_tombstones(self, settings):
+        Tombstone.objects.create(model='items.item', object_id=1)
+        Tombstone.objects.create(model='items.item', object_id=2)
+        Tombstone.objects.filter(object_id=1).update(deleted_at=timezone.now() - timedelta(days=31))
+        out = StringIO()
+        call_command('prune_tombstones', stdout=out)
+        assert list(Tombstone.objects.values_list('object_id', flat=True)) == [2]
+        assert 'Deleted 1 tombstone(s)' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestCatalogSnapshot:
+    def manifest(self, client):
+        response = client.get(reverse('catalog-manifest'))
+        assert response.status_code == status.HTTP_200_OK
+        return json.loads(response.content)
+
+    def download(self, client, manifest, **headers):
+        return client.get(manifest['url'].removeprefix('http://testserver'), **headers)
+
+    def test_snapshot_holds_the_catalog(self, staff_client, many_rows):
+        manifest = self.manifest(staff_client)
+        assert manifest['url'] == f"http://testserver/snapshots/catalog.{manifest['hash']}.json"
+        response = self.download(staff_client, manifest)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'immutable' in response['Cache-Control'] and 'max-age=315360000' in response['Cache-Control']
+        body = json.loads(b''.join(response.streaming_content))
+        assert [category['name'] for category in body['categories']] == ['Capes', 'Hats', 'Masks']
+        assert len(body['items']) == 25 and len(body['events']) == 25
+        item = many_rows['items'][0]
+        assert body['items'][0] == json.loads(staff_client.get(reverse('item-detail', args=[item.pk])).content)
+        assert manifest['size'] == len(json.dumps(body, separators=(',', ':')).encode())
+
+    def test_gzip_copy_served_to_clients_that_accept_it(self, staff_client, many_rows):
+        manifest = self.manifest(staff_client)
+        response = self.download(staff_client, manifest, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert len(json.loads(gzip.decompress(b''.join(response.streaming_content)))['items']) == 25
+
+    def test_hash_follows_content(self, staff_client, many_rows):
+        first = self.manifest(staff_client)
+        cache.clear()
+        assert self.manifest(staff_client)['hash'] == first['hash']
+        item = many_rows['items'][0]
+        item.name = 'Renamed Cape'
+        item.save()
+        second = self.manifest(staff_client)
+        assert second['hash'] != first['hash']
+        # The previous file stays available to clients that are still downloading it
+        assert self.download(staff_client, first).status_code == status.HTTP_200_OK
+
+    def test_rebuild_only_serializes_changed_rows(self, staff_client, many_rows, monkeypatch):
+        self.manifest(staff_client)
+        item = many_rows['items'][4]
+        item.quantity = 1
+        item.save()
+        serialized = []
+        to_representation = ItemSerializer.to_representation
+        monkeypatch.setattr(ItemSerializer, 'to_representation', lambda self, instance: serialized.append(instance.pk) or to_representation(self, instance))
+        self.manifest(staff_client)
+        assert serialized == [item.pk]
+
+    def test_rebuilt_when_file_missing(self, staff_client, many_rows, settings):
+        manifest = self.manifest(staff_client)
+        os.remove(os.path.join(settings.CATALOG_SNAPSHOT_ROOT, f"catalog.{manifest['hash']}.json"))
+        assert self.manifest(staff_client)['hash'] == manifest['hash']
+        assert self.download(staff_client, manifest).status_code == status.HTTP_200_OK
+
+    def test_old_snapshots_are_pruned(self, many_rows, settings):
+        item = many_rows['items'][0]
+        hashes = []
+        for quantity in range(1, 6):
+            item.quantity = quantity
+            item.save()
+            hashes.append(snapshot.build()['hash'])
+        names = sorted(os.listdir(settings.CATALOG_SNAPSHOT_ROOT))
+        assert len(names) == 2 * snapshot.SNAPSHOTS_KEPT
+        assert f'catalog.{hashes[-1]}.json' in names and f'catalog.{hashes[-1]}.json.gz' in names
+
+    def test_only_snapshot_names_are_served(self, staff_client, many_rows, settings):
+        self.manifest(staff_client)
+        with open(os.path.join(settings.CATALOG_SNAPSHOT_ROOT, 'secret.txt'), 'w') as file:
+            file.write('secret')
+        assert staff_client.get('/snapshots/secret.txt').status_code == status.HTTP_404_NOT_FOUND
+        assert staff_client.get('/snapshots/catalog.abc.json').status_code == status.HTTP_404_NOT_FOUND
+
+    def test_manifest_permissions_and_budget(self, api_client, staff_client, many_rows):
+        assert api_client.get(reverse('catalog-manifest')).status_code == status.HTTP_401_UNAUTHORIZED
+        assert_query_budget(staff_client, 'get', reverse('catalog-manifest'), CatalogManifestView, 'get')
+
+    def test_changes_schedule_one_background_rebuild(self, settings, monkeypatch, django_capture_on_commit_callbacks):
+        settings.CATALOG_SNAPSHOT_REBUILD_DELAY = 5
+        started = []
+
+        class FakeTimer:
+            def __init__(self, delay, function):
+                started.append(delay)
+                self.function = function
+
+            def start(self):
+                pass
+
+        monkeypatch.setattr(snapshot, '_timer', None)
+        monkeypatch.setattr(snapshot.threading, 'Timer', FakeTimer)
+        with django_capture_on_commit_callbacks(execute=True):
+            Category.objects.create(name='Wands')
+            Item.objects.create(name='Velvet Cape', quantity=1)
+        assert started == [5]
+        monkeypatch.setattr(snapshot, 'manifest', lambda: started.append('built'))
+        snapshot._timer.function()
+        assert started == [5, 'built'] and snapshot._timer is None
+
+
+@pytest.mark.django_db
+class TestColumnarFormat:
+    def as_rows(self, body):
+        return [dict(zip(body['columns'], values)) for values in zip(*body['data'].values())]
+
+    def test_bookings_match_the_row_format(self, staff_client, many_rows):
+        url = reverse('itembooking-list')
+        rows = staff_client.get(url, {'page_size': 25}).json()
+        response = staff_client.get(url, {'page_size': 25, 'format': 'columnar'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/vnd.columnar+json'
+        body = response.json()
+        assert body['count'] == rows['count'] == 25
+        assert body['columns'] == list(rows['results'][0])
+        assert self.as_rows(body) == rows['results']
+
+    def test_item_category_is_flattened(self, staff_client, many_rows):
+        body = staff_client.get(reverse('item-list'), {'format': 'columnar', 'fields': 'id,category'}).json()
+        assert body['columns'] == ['id', 'category', 'category_name']
+        category = many_rows['items'][0].category
+        assert body['data']['category'][0] == category.pk
+        assert body['data']['category_name'][0] == category.name
+        body = staff_client.get(reverse('item-list'), {'format': 'columnar', 'fields': 'id,name'}).json()
+        assert body['columns'] == ['id', 'name']
+
+    def test_accept_header_and_list_cache(self, staff_client, many_rows):
+        url = reverse('event-list')
+        rows = staff_client.get(url).json()
+        columnar = staff_client.get(url, HTTP_ACCEPT='application/vnd.columnar+json')
+        assert columnar['Content-Type'] == 'application/vnd.columnar+json'
+        assert self.as_rows(columnar.json()) == rows['results']
+        # Same query string, different format: cached separately
+        assert 'results' in staff_client.get(url).json()
+        assert staff_client.get(url, HTTP_ACCEPT='application/vnd.columnar+json').content == columnar.content
+
+    def test_large_pages_skip_serializers(self, staff_client, many_rows, monkeypatch):
+        monkeypatch.setattr(ItemBookingViewSet.serializer_class, 'to_representation', None)
+        with CaptureQueriesContext(connection) as queries:
+            body = staff_client.get(reverse('itembooking-list'), {'format': 'columnar', 'page_size': 500}).json()
+        assert len(body['data']['id']) == 25 and body['next'] is None
+        assert len(queries) <= ItemBookingViewSet.query_budgets['list']
+
+    def test_unsupported_requests(self, staff_client, many_rows):
+        response = staff_client.get(reverse('event-list'), {'format': 'columnar', 'expand': 'bookings'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        event = many_rows['events'][0]
+        response = staff_client.get(reverse('event-detail', args=[event.pk]), {'format': 'columnar'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestDatabaseJSON:
+    def test_rows_are_built_from_the_serializer_fields(self):
+        sql = str(dbjson.json_rows(ItemViewSet.queryset, ItemViewSet().row_json()).query)
+        assert sql.count('JSON_BUILD_OBJECT') == 2  # the item and its nested category
+        assert 'LEFT OUTER JOIN "items_category"' in sql
+        sql = str(dbjson.json_rows(ItemBookingViewSet.queryset, ItemBookingViewSet().row_json()).query)
+        assert '"items_item"."name"' in sql and '"events_event"."start_datetime"' in sql
+
+    def test_serializer_fallback_off_postgres(self, staff_client, many_rows, settings):
+        settings.DATABASE_JSON_LISTS = True
+        for url in (reverse('item-list'), reverse('itembooking-list')):
+            response = staff_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()['count'] == 25
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='JSON assembly needs Postgres')
+    def test_postgres_rows_match_the_serializers(self, staff_client, many_rows, settings):
+        Item.objects.create(name='No category', quantity=1)
+        expected = {
+            url: staff_client.get(url, {'page_size': 50}).json()
+            for url in (reverse('item-list'), reverse('itembooking-list'))
+        }
+        settings.DATABASE_JSON_LISTS = True
+        cache.clear()
+        for url, rows in expected.items():
+            assert staff_client.get(url, {'page_size': 50}).json() == rows
+
+
+@pytest.mark.django_db
+class TestPaginationCounts:
+    def count_queries(self, client, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response.json(), [query for query in queries if 'COUNT(' in query['sql']]
+
+    def test_exact_counts_are_cached_per_filter(self, staff_client, many_rows):
+        url = reverse('itembooking-list')
+        event = many_rows['events'][0]
+        body, counts = self.count_queries(staff_client, url, {'page_size': 5})
+        assert (body['count'], body['count_exact'], len(counts)) == (25, True, 1)
+        body, counts = self.count_queries(staff_client, url, {'page_size': 5, 'page': 2})
+        assert (body['count'], counts) == (25, [])
+        body, counts = self.count_queries(staff_client, url, {'event': event.pk})
+        assert (body['count'], len(counts)) == (1, 1)
+
+        ItemBooking.objects.create(item=many_rows['items'][1], event=event, quantity=1)
+        body, counts = self.count_queries(staff_client, url, {'event': event.pk, 'page': 1})
+        assert (body['count'], len(counts)) == (2, 1)
+
+    def test_filter_signature(self):
+        items = Item.objects.all()
+        assert counts.filter_signature(items.order_by('name')) == counts.filter_signature(items)
+        assert counts.filter_signature(items.filter(name='a')) != counts.filter_signature(items.filter(name='b'))
+
+    def test_estimates_only_for_large_unfiltered_tables(self, many_rows, settings):
+        settings.PAGINATION_ESTIMATE_THRESHOLD = 10
+        assert counts.estimated_count(Item.objects.filter(quantity=5)) is None
+        if connection.vendor != 'postgresql':
+            assert counts.estimated_count(Item.objects.all()) is None
+        settings.PAGINATION_ESTIMATE_THRESHOLD = 0
+        assert counts.estimated_count(Item.objects.all()) is None
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='Planner estimates need Postgres')
+    def test_postgres_estimate_is_flagged(self, staff_client, many_rows, settings):
+        settings.PAGINATION_ESTIMATE_THRESHOLD = 10
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE items_item')
+        body = staff_client.get(reverse('item-list')).json()
+        assert body['count_exact'] is False and body['count'] > 0
+        assert staff_client.get(reverse('item-list'), {'name': 'Item 1'}).json()['count_exact'] is True
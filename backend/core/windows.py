@@ -0,0 +1,86 @@
+"""
+Half-open time windows: rows whose ``[start_datetime, end_datetime)`` span
+overlaps ``[start, end)``.
+
+On Postgres the spans are compared as ``tstzrange`` values, which the GiST
+index on events (``core.pgindexes``) answers directly; elsewhere the query is
+``start_datetime < end AND end_datetime > start`` over the composite
+``(start_datetime, end_datetime)`` index. ``WindowFilter`` exposes it to
+filtersets as ``?<name>=<start>,<end>``.
+"""
+
+from django import forms
+from django.db import connections
+from django.db.models import BooleanField, DateTimeField, F, Func, Value
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+
+
+class RangeOverlap(Func):
+    # tstzrange(start, end) && tstzrange(lower, upper); the expression the GiST index is built on
+    output_field = BooleanField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        return 'TSTZRANGE(%s, %s) && TSTZRANGE(%s, %s)' % tuple(sqls), params
+
+
+def overlapping(queryset, start, end, prefix=''):
+    """Filters ``queryset`` to the rows whose span (read through ``prefix``) overlaps [start, end)."""
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.filter(RangeOverlap(
+            F(f'{prefix}start_datetime'), F(f'{prefix}end_datetime'),
+            Value(start, output_field=DateTimeField()), Value(end, output_field=DateTimeField()),
+        ))
+    return queryset.filter(**{f'{prefix}start_datetime__lt': end, f'{prefix}end_datetime__gt': start})
+
+
+def parse_window(start, end, max_days=None):
+    """Returns aware ``(start, end)`` datetimes; raises ``forms.ValidationError`` for a bad window."""
+    field = forms.DateTimeField()
+    start, end = field.clean(start), field.clean(end)
+    if start >= end:
+        raise forms.ValidationError('The window must start before it ends.')
+    if max_days is not None and (end - start).days > max_days:
+        raise forms.ValidationError(f'The window may span at most {max_days} days.')
+    return start, end
+
+
+def request_window(query_params, max_days=None):
+    # parse_window() for ?start=&end=, with errors as a 400 response
+    start, end = query_params.get('start'), query_params.get('end')
+    if not start or not end:
+        raise ValidationError({'detail': 'Provide start and end datetimes.'})
+    try:
+        return parse_window(start, end, max_days)
+    except forms.ValidationError as error:
+        raise ValidationError({'detail': ' '.join(error.messages)})
+
+
+class WindowField(forms.CharField):
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        if value.count(',') != 1:
+            raise forms.ValidationError('Give the window as <start>,<end>.')
+        return parse_window(*value.split(','))
+
+
+class WindowFilter(filters.Filter):
+    # ?<name>=<start>,<end>: rows overlapping the window, through the span at field_name ('' or a relation)
+    field_class = WindowField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('field_name', '')
+        super().__init__(*args, **kwargs)
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        prefix = f'{self.field_name}__' if self.field_name else ''
+        return overlapping(queryset, *value, prefix=prefix)
@@ -0,0 +1,25 @@
+from django.utils import timezone
+from ..models import Event
+from .serializers import EventSerializer
+from .views import EventViewSet
+from core.asyncviews import AsyncReadView, AsyncModelReadView, aget_many, json_response
+
+class AsyncEventView(AsyncModelReadView):
+    viewset_class = EventViewSet
+
+class AsyncCurrentFutureEventsView(AsyncReadView):
+    query_budgets = {'get': 3}
+
+    async def get(self, request):
+        events = {
+            event.pk: event
+            async for event in Event.objects.filter(end_datetime__gte=timezone.now()).order_by('start_datetime')
+        }
+
+        async def fetch(missing):
+            return [events[pk] for pk in missing]
+
+        rows = await aget_many(
+            Event, list(events), fetch, lambda objects: EventSerializer(objects, many=True).data
+        )
+        return json_response(rows)
@@ -1,11 +1,16 @@
 from rest_framework.serializers import ModelSerializer, ValidationError
 import bleach
 from ..models import Event
+from core.fieldsets import SparseFieldsetSerializerMixin
+from core.expand import ExpandableSerializerMixin
+from itembookings.api.serializers import ItemBookingSerializer
+
+class EventSerializer(ExpandableSerializerMixin, SparseFieldsetSerializerMixin, ModelSerializer):
+  expansions = {'bookings': ('itembooking_set', lambda: ItemBookingSerializer)}
 
-class EventSerializer(ModelSerializer):
   class Meta:
     model = Event
-    fields = '__all__'
+    exclude = ['location_key']
 
   def to_internal_value(self, data):
     data = data.copy()  # Make a mutable copy to avoid mutating original input
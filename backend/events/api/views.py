@@ -2,11 +2,25 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.decorators import action
 from django_filters import rest_framework as filters
 from django.utils import timezone
+from django.conf import settings
+from heapq import heappop, heappush
+from itertools import groupby
 from ..models import Event
 from .serializers import EventSerializer
 from core.permissions import IsManagerOrStaffReadOnly
+from core.singleflight import single_flight
+from core.listcache import CachedListMixin
+from core.objectcache import CachedObjectMixin, get_many
+from core.fieldsets import SparseFieldsetMixin, restrict_queryset, selected_fields
+from core.expand import ExpandableMixin
+from core.cache import get_or_compute
+from core.windows import WindowFilter, overlapping, request_window
+from core.columnar import ColumnarListMixin
+from django.db.models import Prefetch
+from itembookings.models import ItemBooking
 
 class EventFilter(filters.FilterSet):
     name = filters.CharFilter(lookup_expr='icontains')
@@ -14,25 +28,154 @@ class EventFilter(filters.FilterSet):
     notes = filters.CharFilter(lookup_expr='icontains')
     start_datetime = filters.DateTimeFromToRangeFilter()
     end_datetime = filters.DateTimeFromToRangeFilter()
+    # ?overlaps=<start>,<end>: events running at any time in the window
+    overlaps = WindowFilter()
 
     class Meta:
         model = Event
-        fields = ['name', 'location', 'notes', 'start_datetime', 'end_datetime']
+        fields = ['name', 'location', 'notes', 'start_datetime', 'end_datetime', 'overlaps']
 
-class EventViewSet(ModelViewSet):
+class EventViewSet(CachedListMixin, ColumnarListMixin, ExpandableMixin, SparseFieldsetMixin, CachedObjectMixin, ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     filterset_class = EventFilter
     search_fields = ['name', 'notes', 'location']
     ordering_fields = ['name', 'start_datetime', 'end_datetime', 'location']
     permission_classes = [IsManagerOrStaffReadOnly]
+    replica_reads = True
+    list_cache_groups = ('events',)
+    expansion_cache_groups = ('bookings', 'items')  # bookings.item nests items and their categories
+    expandable = ('bookings', 'bookings.item')
+    # list and retrieve include one prefetch query for ?expand=bookings; writes check for venue
+    # conflicts, updates stamp the event's bookings and deletes record tombstones for /api/sync/
+    query_budgets = {
+        'list': 6, 'retrieve': 4, 'create': 4, 'update': 6, 'partial_update': 6, 'destroy': 6,
+        'calendar': 3, 'location_conflicts': 3,
+    }
+
+    def expand_queryset(self, queryset, expand):
+        # All bookings in one query, with their items (and categories for bookings.item) joined in
+        related = 'item__category' if 'bookings.item' in expand else 'item'
+        return queryset.prefetch_related(
+            Prefetch('itembooking_set', queryset=ItemBooking.objects.select_related(related))
+        )
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        # Compact spans of the events overlapping ?start=&end= (e.g. a month view), cached until an event changes
+        start, end = request_window(request.query_params, settings.CALENDAR_MAX_DAYS)
+        spans = get_or_compute(
+            'event-calendar', ('events',), lambda: calendar_spans(start, end), start.isoformat(), end.isoformat()
+        )
+        return Response(spans, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='location-conflicts')
+    def location_conflicts(self, request):
+        # Overlapping events at the same venue, within ?start=&end= or among current and future events
+        events = Event.objects.exclude(location_key='')
+        if 'start' in request.query_params or 'end' in request.query_params:
+            start, end = request_window(request.query_params, settings.CALENDAR_MAX_DAYS)
+            events = overlapping(events, start, end)
+        else:
+            events = events.filter(end_datetime__gte=timezone.now())
+        rows = events.order_by('location_key', 'start_datetime', 'id').values(
+            'id', 'name', 'location', 'location_key', 'start_datetime', 'end_datetime'
+        )
+        return Response(venue_conflicts(rows), status=status.HTTP_200_OK)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.venue_conflicts = conflicting_events(serializer.instance)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.venue_conflicts = conflicting_events(serializer.instance)
+
+    def create(self, request, *args, **kwargs):
+        return self.with_venue_conflicts(super().create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self.with_venue_conflicts(super().update(request, *args, **kwargs))
+
+    def with_venue_conflicts(self, response):
+        # A warning, not an error: the save went through, the client decides whether to change it
+        if hasattr(self, 'venue_conflicts'):
+            response.data['location_conflicts'] = self.venue_conflicts
+        return response
+
+def conflicting_events(event):
+    return list(
+        event.location_conflicts().order_by('start_datetime').values('id', 'name', 'start_datetime', 'end_datetime')
+    )
+
+def venue_conflicts(rows):
+    """
+    Returns the overlapping pairs among ``rows`` (event dicts ordered by
+    location_key, then start) by sweeping each venue's events in start order.
+    """
+    fields = ('id', 'name', 'start_datetime', 'end_datetime')
+    conflicts = []
+    for _, venue in groupby(rows, key=lambda row: row['location_key']):
+        running = []  # (end, id, event) of the events not yet ended at the current start
+        for event in venue:
+            while running and running[0][0] <= event['start_datetime']:
+                heappop(running)
+            for _, _, other in sorted(running, key=lambda entry: (entry[2]['start_datetime'], entry[1])):
+                conflicts.append({
+                    'location': other['location'],
+                    'events': [{name: row[name] for name in fields} for row in (other, event)],
+                })
+            heappush(running, (event['end_datetime'], event['id'], event))
+    return conflicts
+
+def calendar_spans(start, end):
+    events = overlapping(Event.objects.all(), start, end).order_by('start_datetime', 'id')
+    return [
+        {'id': pk, 'name': name, 'start': event_start, 'end': event_end, 'location': location}
+        for pk, name, event_start, event_end, location in events.values_list(
+            'id', 'name', 'start_datetime', 'end_datetime', 'location'
+        )
+    ]
+
+def current_future_events(fields=None):
+    events = Event.objects.filter(end_datetime__gte=timezone.now()).order_by('start_datetime')
+    if fields is not None:
+        # end_datetime is always loaded, the view filters on it
+        events = restrict_queryset(events, EventSerializer(), fields, extra=['end_datetime'])
+    return list(events)
 
 class CurrentFutureEventsView(APIView):
     permission_classes = [IsManagerOrStaffReadOnly]
+    replica_reads = True
+    # User, groups, the (cached) list and the rows missing from the per-event cache
+    query_budgets = {'get': 4}
     
     def get(self, request, *args, **kwargs):
+        # The cached list may be up to a few minutes old, so drop events that ended since
         now = timezone.now()
-        events = Event.objects.filter(end_datetime__gte=now).order_by('start_datetime')
-        serializer = EventSerializer(events, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        fields = selected_fields(request.query_params, EventSerializer().fields)
+        if fields is not None:
+            # e.g. the booking form's dropdown only needs ?fields=id,name,start_datetime,end_datetime
+            events = single_flight(
+                'current-future-events', ('events',), lambda: current_future_events(fields), *sorted(fields),
+                stale_seconds=30,
+            )
+            serializer = EventSerializer(
+                [event for event in events if event.end_datetime >= now], many=True, context={'fields': fields}
+            )
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        events = {
+            event.pk: event
+            for event in single_flight('current-future-events', ('events',), current_future_events, stale_seconds=30)
+            if event.end_datetime >= now
+        }
+        # Rows come pre-encoded from the per-event cache; only uncached events are loaded and serialized.
+        # They are loaded fresh rather than taken from the list, which may be stale, as they are cached for longer
+        rows = get_many(
+            Event, list(events),
+            lambda missing: Event.objects.filter(pk__in=missing),
+            lambda objects: EventSerializer(objects, many=True).data,
+        )
+        return Response(rows, status=status.HTTP_200_OK)
 
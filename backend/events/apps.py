@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_save
 
 
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        from .models import Event, set_location_key
+
+        pre_save.connect(set_location_key, sender=Event, dispatch_uid='events-location-key')
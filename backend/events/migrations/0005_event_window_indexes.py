@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:30
+
+from django.db import migrations, models
+from core.pgindexes import create_postgres_indexes, drop_postgres_indexes
+
+# GiST index on tstzrange(start_datetime, end_datetime) for overlap queries (Postgres only, no-op elsewhere)
+WINDOW_INDEXES = ['events_event_window_gist']
+
+def create_window_indexes(apps, schema_editor):
+    create_postgres_indexes(schema_editor.connection, WINDOW_INDEXES)
+
+def drop_window_indexes(apps, schema_editor):
+    drop_postgres_indexes(schema_editor.connection, WINDOW_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_event_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='event',
+            name='events_even_start_d_b72861_idx',
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_datetime', 'end_datetime'], name='events_even_start_d_e338a8_idx'),
+        ),
+        migrations.RunPython(create_window_indexes, drop_window_indexes),
+    ]
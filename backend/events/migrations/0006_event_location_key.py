@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:01
+
+import re
+
+from django.db import migrations, models
+
+
+def location_key(location):
+    # events.models.location_key as of this migration, copied so later changes don't alter it
+    return ' '.join(re.sub(r'[^\w\s]', ' ', location.casefold()).split())
+
+def fill_location_keys(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    events = list(Event.objects.exclude(location='').only('pk', 'location'))
+    for event in events:
+        event.location_key = location_key(event.location)
+    Event.objects.bulk_update(events, ['location_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_window_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='location_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_location_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['location_key', 'start_datetime', 'end_datetime'], name='events_even_locatio_7b887c_idx'),
+        ),
+    ]
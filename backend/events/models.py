@@ -1,12 +1,21 @@
+import re
 from django.db import models
 from django.core.exceptions import ValidationError
 
+def location_key(location):
+  # "Main Hall", "main hall." and " MAIN  HALL" are the same venue
+  return ' '.join(re.sub(r'[^\w\s]', ' ', location.casefold()).split())
+
 class Event(models.Model):
   name = models.CharField(max_length=200)
   start_datetime = models.DateTimeField()
   end_datetime = models.DateTimeField()
   location = models.CharField(max_length=200, blank=True, default='')
   notes = models.TextField(blank=True, default='')
+  # Normalized location for venue conflict checks, set by set_location_key() before every save, raw
+  # ones (loaddata) included; QuerySet.update(location=...) bypasses it and must set location_key too
+  location_key = models.CharField(max_length=200, blank=True, default='', editable=False)
+  updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
   def clean(self):
     super().clean()
@@ -16,7 +25,23 @@ class Event(models.Model):
           'end_datetime': 'End datetime must be after start datetime.'
         })
 
+  def location_conflicts(self):
+    """
+    Returns the other events at the same venue that overlap this one (none
+    without a location); one range probe of the (location_key, start, end) index.
+    """
+    if not self.location_key:
+      return Event.objects.none()
+    return Event.objects.filter(
+      location_key=self.location_key,
+      start_datetime__lt=self.end_datetime,
+      end_datetime__gt=self.start_datetime,
+    ).exclude(pk=self.pk)
+
   def save(self, *args, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'location' in update_fields:
+      kwargs['update_fields'] = {*update_fields, 'location_key'}
     self.full_clean()
     super().save(*args, **kwargs)
 
@@ -26,6 +51,12 @@ class Event(models.Model):
   class Meta:
     ordering = ['start_datetime']
     indexes = [
-      models.Index(fields=['start_datetime']),
+      # Also serves overlap queries off Postgres (core.windows), which has a GiST index for them
+      models.Index(fields=['start_datetime', 'end_datetime']),
       models.Index(fields=['end_datetime']),
+      models.Index(fields=['location_key', 'start_datetime', 'end_datetime']),
     ]
+
+def set_location_key(sender, instance, **kwargs):
+  # A pre_save receiver rather than part of save(): raw saves skip save() but still send pre_save
+  instance.location_key = location_key(instance.location)
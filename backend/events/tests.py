@@ -8,9 +8,14 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
 from datetime import timedelta
 from django.core.exceptions import ValidationError
-from .models import Event
+from .models import Event, location_key
+from .api.views import venue_conflicts
 from .api.serializers import EventSerializer
 from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core import windows
 
 User = get_user_model()
 
@@ -65,6 +70,14 @@ def sample_event():
 
 @pytest.mark.django_db
 class TestEventModel:
+    def test_sample_events_fixture_loads(self):
+        # start.sh loads it into a fresh database; loaddata's raw saves skip auto_now
+        call_command('loaddata', settings.BASE_DIR / 'sample_events.json', verbosity=0)
+        assert Event.objects.count() == 20
+        assert not Event.objects.filter(updated_at__isnull=True).exists()
+        # Raw saves still get their location keys, so sample events take part in venue conflict checks
+        assert not Event.objects.exclude(location='').filter(location_key='').exists()
+
     def test_create_event(self):
         now = timezone.now()
         event = Event.objects.create(
@@ -914,4 +927,135 @@ class TestEventAPI:
         response = authenticated_staff_client.get(url)
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) == 0
-        assert response.data == []
\ No newline at end of file
+        assert response.data == []
+
+@pytest.mark.django_db
+class TestEventWindows:
+    @pytest.fixture
+    def month(self):
+        # Events before, across the start of, inside, across the end of and after November
+        base = timezone.make_aware(timezone.datetime(2026, 11, 1))
+        spans = [(-3, -1), (-1, 1), (10, 11), (29, 31), (30, 32)]
+        events = [
+            Event.objects.create(
+                name=f'Show {i}', location='Main Hall',
+                start_datetime=base + timedelta(days=start), end_datetime=base + timedelta(days=end),
+            )
+            for i, (start, end) in enumerate(spans)
+        ]
+        return {'start': base, 'end': base + timedelta(days=30), 'events': events}
+
+    def test_overlaps_filter(self, staff_client, month):
+        window = f"{month['start'].isoformat()},{month['end'].isoformat()}"
+        response = staff_client.get(reverse('event-list'), {'overlaps': window})
+        assert response.status_code == status.HTTP_200_OK
+        assert [event['name'] for event in response.data['results']] == ['Show 1', 'Show 2', 'Show 3']
+
+    def test_bad_window_is_rejected(self, staff_client, month):
+        for window in ('2026-11-01', '2026-12-01,2026-11-01', 'soon,later'):
+            response = staff_client.get(reverse('event-list'), {'overlaps': window})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST, window
+            assert 'overlaps' in response.data
+
+    def test_calendar_spans(self, staff_client, month):
+        url = reverse('event-calendar')
+        params = {'start': month['start'].isoformat(), 'end': month['end'].isoformat()}
+        response = staff_client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        assert [span['name'] for span in response.data] == ['Show 1', 'Show 2', 'Show 3']
+        assert set(response.data[0]) == {'id', 'name', 'start', 'end', 'location'}
+
+        with CaptureQueriesContext(connection) as queries:
+            staff_client.get(url, params)
+        assert not any('events_event' in query['sql'] for query in queries)
+        month['events'][2].delete()
+        assert len(staff_client.get(url, params).data) == 2
+
+    def test_calendar_window_is_bounded(self, staff_client, settings):
+        settings.CALENDAR_MAX_DAYS = 31
+        url = reverse('event-calendar')
+        assert staff_client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+        response = staff_client.get(url, {'start': '2026-01-01T00:00:00Z', 'end': '2026-06-01T00:00:00Z'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert '31 days' in response.data['detail']
+
+    def test_postgres_uses_range_overlap(self, month):
+        queryset = windows.overlapping(Event.objects.all(), month['start'], month['end'])
+        if connection.vendor == 'postgresql':
+            assert 'TSTZRANGE' in str(queryset.query)
+        assert [event.name for event in queryset] == ['Show 1', 'Show 2', 'Show 3']
+
+@pytest.mark.django_db
+class TestVenueConflicts:
+    @pytest.fixture
+    def venues(self):
+        # Shows 0-2 chain through the Main Hall, 3 only touches 2, 4 is elsewhere and 5 has no venue
+        base = timezone.now() + timedelta(days=7)
+        spans = [
+            ('Main Hall', 0, 4), ('main  hall.', 2, 6), ('MAIN HALL', 5, 8),
+            ('Main Hall', 8, 10), ('Garden', 0, 10), ('', 0, 10),
+        ]
+        events = [
+            Event.objects.create(
+                name=f'Show {i}', location=location,
+                start_datetime=base + timedelta(hours=start), end_datetime=base + timedelta(hours=end),
+            )
+            for i, (location, start, end) in enumerate(spans)
+        ]
+        return {'base': base, 'events': events}
+
+    def test_location_key(self):
+        assert location_key('  The Main-Hall, Room 2 ') == 'the main hall room 2'
+        assert location_key('STRASSE') == location_key('straße')
+        assert location_key(' .. ') == ''
+
+    def test_event_conflicts(self, venues):
+        shows = venues['events']
+        assert shows[1].location_key == 'main hall'
+        assert set(shows[1].location_conflicts()) == {shows[0], shows[2]}
+        assert list(shows[3].location_conflicts()) == []
+        assert list(shows[5].location_conflicts()) == []
+        shows[4].location = 'Main Hall'
+        shows[4].save(update_fields=['location'])
+        shows[4].refresh_from_db()
+        assert shows[4].location_key == 'main hall'
+
+    def test_writes_warn_about_conflicts(self, manager_client, venues):
+        base = venues['base']
+        data = {
+            'name': 'Rehearsal', 'location': 'Main hall',
+            'start_datetime': (base + timedelta(hours=9)).isoformat(),
+            'end_datetime': (base + timedelta(hours=11)).isoformat(),
+        }
+        response = manager_client.post(reverse('event-list'), data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [event['name'] for event in response.data['location_conflicts']] == ['Show 3']
+        assert 'location_key' not in response.data
+
+        url = reverse('event-detail', args=[response.data['id']])
+        response = manager_client.patch(url, {'location': 'Car park'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['location_conflicts'] == []
+
+    def test_conflict_report(self, staff_client, venues):
+        response = staff_client.get(reverse('event-location-conflicts'))
+        assert response.status_code == status.HTTP_200_OK
+        pairs = [[event['name'] for event in conflict['events']] for conflict in response.data]
+        assert pairs == [['Show 0', 'Show 1'], ['Show 1', 'Show 2']]
+        assert response.data[0]['location'] == 'Main Hall'
+
+        base = venues['base']
+        params = {'start': (base + timedelta(hours=6)).isoformat(), 'end': (base + timedelta(hours=9)).isoformat()}
+        assert staff_client.get(reverse('event-location-conflicts'), params).data == []
+        params['end'] = '2020-01-01T00:00:00Z'
+        assert staff_client.get(reverse('event-location-conflicts'), params).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_sweep_reports_every_overlapping_pair(self):
+        base = timezone.now()
+        rows = [
+            {'id': i, 'name': f'Show {i}', 'location': 'Hall', 'location_key': 'hall',
+             'start_datetime': base + timedelta(hours=start), 'end_datetime': base + timedelta(hours=end)}
+            for i, (start, end) in enumerate([(0, 10), (1, 3), (2, 4), (3, 5)])
+        ]
+        pairs = [[event['id'] for event in conflict['events']] for conflict in venue_conflicts(rows)]
+        assert pairs == [[0, 1], [0, 2], [1, 2], [0, 3], [2, 3]]
@@ -1,11 +1,24 @@
 from rest_framework.serializers import ModelSerializer, ValidationError, CharField, DateTimeField
 from ..models import ItemBooking
+from core.fieldsets import SparseFieldsetSerializerMixin
+from core.expand import ExpandableSerializerMixin
 
-class ItemBookingSerializer(ModelSerializer):
+# Imported on use: the item and event serializers import this module
+def item_serializer():
+  from items.api.serializers import ItemSerializer
+  return ItemSerializer
+
+def event_serializer():
+  from events.api.serializers import EventSerializer
+  return EventSerializer
+
+class ItemBookingSerializer(ExpandableSerializerMixin, SparseFieldsetSerializerMixin, ModelSerializer):
   item_name = CharField(source='item.name', read_only=True)
   event_name = CharField(source='event.name', read_only=True)
   event_start_datetime = DateTimeField(source='event.start_datetime', read_only=True)
   event_end_datetime = DateTimeField(source='event.end_datetime', read_only=True)
+  # Nested under an event or item with ?expand=bookings.item / bookings.event
+  expansions = {'item': ('item', item_serializer), 'event': ('event', event_serializer)}
 
   class Meta:
     model = ItemBooking
@@ -15,8 +28,9 @@ class ItemBookingSerializer(ModelSerializer):
     super().__init__(*args, **kwargs)
     # Make item and event read-only when updating
     if self.instance is not None:
-      self.fields['item'].read_only = True
-      self.fields['event'].read_only = True
+      for name in ('item', 'event'):
+        if name in self.fields:  # may be dropped by ?fields= / ?omit=
+          self.fields[name].read_only = True
 
   def validate(self, data):
     # Check for overbooking- do validation directly in serializer
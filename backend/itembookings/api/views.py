@@ -6,20 +6,37 @@ from django_filters import rest_framework as filters
 from ..models import ItemBooking
 from .serializers import ItemBookingSerializer
 from core.permissions import IsManagerOrStaffReadOnly
+from core.fieldsets import SparseFieldsetMixin
+from core.columnar import ColumnarListMixin
+from core.dbjson import DatabaseJSONMixin
+from core.windows import WindowFilter
 
 class ItemBookingFilter(filters.FilterSet):
   item = filters.NumberFilter(field_name='item', lookup_expr='exact')
   event = filters.NumberFilter(field_name='event', lookup_expr='exact')
+  # ?window=<start>,<end>: bookings for events running at any time in the window
+  window = WindowFilter(field_name='event')
+  category = filters.NumberFilter(field_name='item__category', lookup_expr='exact')
+  location = filters.CharFilter(field_name='item__location', lookup_expr='icontains')
 
   class Meta:
     model = ItemBooking
-    fields = ['item', 'event']
+    fields = ['item', 'event', 'window', 'category', 'location']
 
-class ItemBookingViewSet(ModelViewSet):
-  queryset = ItemBooking.objects.all()
+class ItemBookingViewSet(ColumnarListMixin, SparseFieldsetMixin, DatabaseJSONMixin, ModelViewSet):
+  queryset = ItemBooking.objects.select_related('item', 'event').all()
   serializer_class = ItemBookingSerializer
   filterset_class = ItemBookingFilter
+  # ?ordering=event__start_datetime lists a pull list in the order the events happen
+  ordering_fields = ['created_at', 'quantity', 'event__start_datetime']
   permission_classes = [IsManagerOrStaffReadOnly]
+  replica_reads = True
+  # Filtered counts are cached until a booking changes (core.pagination); filters also read
+  # items' categories, which a category delete clears without saving the items
+  count_cache_groups = ('bookings', 'items')
+  query_budgets = {
+    'list': 4, 'retrieve': 3, 'create': 11, 'update': 9, 'partial_update': 9, 'destroy': 5,
+  }
 
   def create(self, request, *args, **kwargs):
     try:
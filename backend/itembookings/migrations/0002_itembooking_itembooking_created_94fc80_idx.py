@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_alter_event_location_alter_event_notes_and_more'),
+        ('itembookings', '0001_initial'),
+        ('items', '0011_alter_item_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itembooking',
+            index=models.Index(fields=['created_at'], name='itembooking_created_94fc80_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itembookings', '0002_itembooking_itembooking_created_94fc80_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itembooking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_window_indexes'),
+        ('itembookings', '0003_itembooking_updated_at'),
+        ('items', '0013_item_updated_at'),
+    ]
+
+    operations = [
+        # The composite index is built before the event_id index it replaces is dropped
+        migrations.AddIndex(
+            model_name='itembooking',
+            index=models.Index(fields=['event', 'item'], name='itembooking_event_i_a9ae56_idx'),
+        ),
+        migrations.AlterField(
+            model_name='itembooking',
+            name='event',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='events.event'),
+        ),
+    ]
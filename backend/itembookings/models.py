@@ -5,9 +5,40 @@ from events.models import Event
 
 class ItemBooking(models.Model):
   item = models.ForeignKey(Item, on_delete=models.CASCADE, db_index=True)
-  event = models.ForeignKey(Event, on_delete=models.CASCADE, db_index=True)
+  # Indexed by the (event, item) index below
+  event = models.ForeignKey(Event, on_delete=models.CASCADE, db_index=False)
   quantity = models.PositiveSmallIntegerField(default=1)
   created_at = models.DateTimeField(auto_now_add=True)
+  updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+  @staticmethod
+  def overlapping(item, start, end, exclude_pk=None):
+    # Bookings of the item by events overlapping the window from start to end
+    overlapping_bookings = ItemBooking.objects.filter(
+      item=item,
+      event__start_datetime__lt=end,
+      event__end_datetime__gt=start,
+    )
+
+    # Exclude this instance if updating
+    if exclude_pk:
+      overlapping_bookings = overlapping_bookings.exclude(pk=exclude_pk)
+    return overlapping_bookings
+
+  @staticmethod
+  def booked_quantity(item, start, end, exclude_pk=None):
+    """
+    Returns how many units of the item are booked by events overlapping the
+    window from start to end.
+    """
+    overlapping_bookings = ItemBooking.overlapping(item, start, end, exclude_pk)
+    return overlapping_bookings.aggregate(total=models.Sum('quantity'))['total'] or 0
+
+  @staticmethod
+  async def abooked_quantity(item, start, end, exclude_pk=None):
+    # Async variant of booked_quantity
+    overlapping_bookings = ItemBooking.overlapping(item, start, end, exclude_pk)
+    return (await overlapping_bookings.aaggregate(total=models.Sum('quantity')))['total'] or 0
 
   @staticmethod
   def validate_overbooking(item, event, quantity, exclude_pk=None):
@@ -27,21 +58,8 @@ class ItemBooking(models.Model):
     if not item or not event:
       return
 
-    # Find all bookings for this same item with overlapping events
-    overlapping_bookings = ItemBooking.objects.filter(
-      item=item,
-      event__start_datetime__lt=event.end_datetime,
-      event__end_datetime__gt=event.start_datetime,
-    )
-
-    # Exclude this instance if updating
-    if exclude_pk:
-      overlapping_bookings = overlapping_bookings.exclude(pk=exclude_pk)
-
     # Total quantity already booked in overlapping events
-    total_booked = overlapping_bookings.aggregate(
-      total=models.Sum('quantity')
-    )['total'] or 0
+    total_booked = ItemBooking.booked_quantity(item, event.start_datetime, event.end_datetime, exclude_pk)
 
     # Check available quantity
     available = item.quantity - total_booked
@@ -69,4 +87,9 @@ class ItemBooking(models.Model):
       )
     ]
     ordering = ["-created_at"]
+    indexes = [
+      models.Index(fields=['created_at']),
+      # An event's bookings (e.g. a pull list for events in a window) with their item ids, from the index alone
+      models.Index(fields=['event', 'item']),
+    ]
 
@@ -500,3 +500,41 @@ class TestItemBookingAPI:
         response = api_client.get(url)
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
+@pytest.mark.django_db
+class TestBookingFilters:
+    @pytest.fixture
+    def pull_list(self, many_rows):
+        # many_rows books item i for event i, which starts i days from now
+        now = timezone.now()
+        room_b = many_rows['items'][3]
+        room_b.location = 'Storage Room B'
+        room_b.save()
+        return {'from': now + timedelta(days=2, hours=-1), 'to': now + timedelta(days=6, hours=-1), **many_rows}
+
+    def names(self, client, params):
+        response = client.get(reverse('itembooking-list'), params)
+        assert response.status_code == status.HTTP_200_OK, response.content
+        return [booking['event_name'] for booking in response.data['results']]
+
+    def test_window_and_ordering(self, staff_client, pull_list):
+        window = f"{pull_list['from'].isoformat()},{pull_list['to'].isoformat()}"
+        names = self.names(staff_client, {'window': window, 'ordering': 'event__start_datetime'})
+        assert names == ['Event 2', 'Event 3', 'Event 4', 'Event 5']
+        names = self.names(staff_client, {'window': window, 'ordering': '-event__start_datetime'})
+        assert names == ['Event 5', 'Event 4', 'Event 3', 'Event 2']
+
+    def test_category_and_location(self, staff_client, pull_list):
+        window = f"{pull_list['from'].isoformat()},{pull_list['to'].isoformat()}"
+        capes = pull_list['categories'][0]  # items 0, 3, 6, ...
+        params = {'window': window, 'category': capes.pk, 'ordering': 'event__start_datetime'}
+        assert self.names(staff_client, params) == ['Event 3']
+        params = {'window': window, 'location': 'storage room a', 'ordering': 'event__start_datetime'}
+        assert self.names(staff_client, params) == ['Event 2', 'Event 4', 'Event 5']
+
+    def test_filtered_counts_follow_item_changes(self, staff_client, pull_list):
+        params = {'location': 'room b'}
+        assert staff_client.get(reverse('itembooking-list'), params).data['count'] == 1
+        item = pull_list['items'][4]
+        item.location = 'Storage Room B'
+        item.save()
+        assert staff_client.get(reverse('itembooking-list'), params).data['count'] == 2
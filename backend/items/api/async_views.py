@@ -0,0 +1,53 @@
+from rest_framework import status
+from django.http import Http404
+from django import forms
+from ..models import Item, Category
+from .views import ItemViewSet
+from core.asyncviews import AsyncReadView, AsyncModelReadView, json_response
+from core.windows import parse_window
+from events.models import Event
+from itembookings.models import ItemBooking
+
+class AsyncItemView(AsyncModelReadView):
+    viewset_class = ItemViewSet
+
+class AsyncItemAvailabilityView(AsyncReadView):
+    query_budgets = {'get': 5}
+
+    async def get(self, request, pk):
+        # Same parameters and response as ItemViewSet.availability
+        item = await Item.objects.filter(pk=pk).afirst()
+        if item is None:
+            raise Http404
+        if 'event' in request.GET:
+            try:
+                event = await Event.objects.filter(pk=request.GET['event']).afirst()
+            except ValueError:
+                event = None
+            if event is None:
+                return json_response({'event': 'Event not found.'}, status.HTTP_400_BAD_REQUEST)
+            start, end = event.start_datetime, event.end_datetime
+        else:
+            try:
+                start, end = parse_window(request.GET.get('start'), request.GET.get('end'))
+            except forms.ValidationError:
+                return json_response(
+                    {'detail': 'Provide an event, or start and end datetimes with start before end.'},
+                    status.HTTP_400_BAD_REQUEST
+                )
+
+        booked = await ItemBooking.abooked_quantity(item, start, end)
+        return json_response({
+            'item': item.pk,
+            'start': start,
+            'end': end,
+            'quantity': item.quantity,
+            'booked': booked,
+            'available': item.quantity - booked,
+        })
+
+class AsyncCategoryChoicesView(AsyncReadView):
+    query_budgets = {'get': 3}
+
+    async def get(self, request):
+        return json_response([{"value": cat.id, "label": cat.name} async for cat in Category.objects.all()])
@@ -4,6 +4,9 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 import bleach
 import re
 from ..models import Item, Category
+from core.fieldsets import SparseFieldsetSerializerMixin
+from core.expand import ExpandableSerializerMixin
+from itembookings.api.serializers import ItemBookingSerializer
 
 class CategorySerializer(ModelSerializer):
   class Meta:
@@ -18,7 +21,10 @@ class CategorySerializer(ModelSerializer):
       data['name'] = bleach.clean(data['name'], tags=[], strip=True)
     return super().to_internal_value(data)
 
-class ItemSerializer(ModelSerializer):
+class ItemSerializer(ExpandableSerializerMixin, SparseFieldsetSerializerMixin, ModelSerializer):
+  # The category is always nested, ?expand=category is accepted for symmetry
+  expansions = {'bookings': ('itembooking_set', lambda: ItemBookingSerializer)}
+
   class Meta:
     model = Item
     fields = '__all__'
@@ -26,6 +32,8 @@ class ItemSerializer(ModelSerializer):
   def to_representation(self, instance):
     # Override to return nested category object including name instead of just ID
     representation = super().to_representation(instance)
+    if 'category' not in representation:
+      return representation  # not selected by ?fields= / ?omit=
     if instance.category:
       representation['category'] = CategorySerializer(instance.category).data
     else:
@@ -1,11 +1,24 @@
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.decorators import action
 from rest_framework import status
 from django_filters import rest_framework as filters
+from django import forms
 from ..models import Item, Category
 from .serializers import ItemSerializer, CategorySerializer
 from core.permissions import IsManagerOrStaffReadOnly
+from core.singleflight import single_flight
+from core.listcache import CachedListMixin
+from core.objectcache import CachedObjectMixin
+from core.fieldsets import SparseFieldsetMixin
+from core.expand import ExpandableMixin
+from core.columnar import ColumnarListMixin
+from core.dbjson import DatabaseJSONMixin, related_object
+from core.windows import parse_window
+from django.db.models import Prefetch
+from events.models import Event
+from itembookings.models import ItemBooking
 
 class ItemFilter(filters.FilterSet):
     name = filters.CharFilter(lookup_expr='icontains')
@@ -17,19 +30,88 @@ class ItemFilter(filters.FilterSet):
         model = Item
         fields = ['name', 'category', 'color', 'location']
 
-class ItemViewSet(ModelViewSet):
+class ItemViewSet(
+    CachedListMixin, ColumnarListMixin, ExpandableMixin, SparseFieldsetMixin, DatabaseJSONMixin, CachedObjectMixin,
+    ModelViewSet,
+):
     queryset = Item.objects.select_related('category').all()
     serializer_class = ItemSerializer
     filterset_class = ItemFilter
     search_fields = ['name', 'description', 'color', 'location']
     ordering_fields = ['name', 'category', 'quantity', 'color', 'location']
     permission_classes = [IsManagerOrStaffReadOnly]
+    replica_reads = True
+    list_cache_groups = ('items',)
+    expansion_cache_groups = ('bookings',)
+    expandable = ('category', 'bookings', 'bookings.event')
+    # ?format=columnar: the nested category becomes its id and name
+    columnar_extra_columns = {'category_name': 'category__name'}
+    # DATABASE_JSON_LISTS: the nested category is built in the query too
+    database_json_fields = {'category': lambda: related_object('category', CategorySerializer())}
+    # list and retrieve include one prefetch query for ?expand=bookings; updates stamp the
+    # item's bookings and deletes record tombstones for /api/sync/
+    query_budgets = {
+        'list': 6, 'retrieve': 4, 'create': 4, 'update': 6, 'partial_update': 6, 'destroy': 6,
+        'availability': 5,
+    }
+
+    def expand_queryset(self, queryset, expand):
+        if 'category' in expand:
+            queryset = queryset.select_related('category')
+        if 'bookings' in expand:
+            # All bookings in one query with their events joined in
+            queryset = queryset.prefetch_related(
+                Prefetch('itembooking_set', queryset=ItemBooking.objects.select_related('event'))
+            )
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def availability(self, request, pk=None):
+        # Units free for an event (?event=<id>) or a time window (?start=...&end=...)
+        item = self.get_object()
+        if 'event' in request.query_params:
+            try:
+                event = Event.objects.filter(pk=request.query_params['event']).first()
+            except ValueError:
+                event = None
+            if event is None:
+                return Response({'event': 'Event not found.'}, status=status.HTTP_400_BAD_REQUEST)
+            start, end = event.start_datetime, event.end_datetime
+        else:
+            try:
+                # Aware datetimes; a value without an offset is read in TIME_ZONE
+                start, end = parse_window(request.query_params.get('start'), request.query_params.get('end'))
+            except forms.ValidationError:
+                return Response(
+                    {'detail': 'Provide an event, or start and end datetimes with start before end.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        booked = single_flight(
+            'item-booked', ('availability',),
+            lambda: ItemBooking.booked_quantity(item, start, end),
+            item.pk, start.isoformat(), end.isoformat(),
+        )
+        return Response({
+            'item': item.pk,
+            'start': start,
+            'end': end,
+            'quantity': item.quantity,
+            'booked': booked,
+            'available': item.quantity - booked,
+        }, status=status.HTTP_200_OK)
+
+def category_choices():
+    return [{"value": cat.id, "label": cat.name} for cat in Category.objects.all()]
 
 class CategoryChoicesView(APIView):
     permission_classes = [IsManagerOrStaffReadOnly]
+    replica_reads = True
+    query_budgets = {'get': 3, 'post': 4}
     
     def get(self, request, *args, **kwargs):
-        categories = [{"value": cat.id, "label": cat.name} for cat in Category.objects.all()]
+        # Shared across requests and workers; refreshed by one request after a category changes
+        categories = single_flight('category-choices', ('categories',), category_choices, stale_seconds=30)
         return Response(categories, status=status.HTTP_200_OK)
     
     def post(self, request, *args, **kwargs):
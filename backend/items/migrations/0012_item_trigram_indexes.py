@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 23:56
+
+from django.db import migrations
+from core.pgindexes import create_postgres_indexes, drop_postgres_indexes
+
+# Trigram indexes for the ItemFilter icontains lookups (Postgres only, no-op elsewhere)
+TRIGRAM_INDEXES = ['items_item_name_trgm', 'items_item_color_trgm', 'items_item_location_trgm']
+
+def create_trigram_indexes(apps, schema_editor):
+    create_postgres_indexes(schema_editor.connection, TRIGRAM_INDEXES)
+
+def drop_trigram_indexes(apps, schema_editor):
+    drop_postgres_indexes(schema_editor.connection, TRIGRAM_INDEXES)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0011_alter_item_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
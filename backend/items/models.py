@@ -18,6 +18,7 @@ class Item(models.Model):
   category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, db_index=True)
   color = models.CharField(max_length=50, blank=True)
   location = models.CharField(max_length=200, blank=True)
+  updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
   def __str__(self):
     return f"Name: {self.name}"
@@ -1,4 +1,5 @@
 from django.test import TestCase
+import json
 import pytest
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -9,6 +10,11 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from .models import Item, Category
 from .api.serializers import ItemSerializer
 from django.conf import settings
+from django.core.management import call_command
+from datetime import timedelta
+from django.utils import timezone
+from events.models import Event
+from itembookings.models import ItemBooking
 
 User = get_user_model()
 
@@ -83,6 +89,16 @@ def sample_item(category_acc):
 
 @pytest.mark.django_db
 class TestItemModel:
+    def test_sample_items_fixture_loads(self):
+        # start.sh loads it into a fresh database; loaddata's raw saves skip auto_now
+        fixture = settings.BASE_DIR / 'sample_items.json'
+        # Categories come from a data migration, which --nomigrations skips
+        category_ids = {row['fields']['category'] for row in json.loads(fixture.read_text())}
+        Category.objects.bulk_create([Category(pk=pk, name=f'Category {pk}') for pk in category_ids])
+        call_command('loaddata', fixture, verbosity=0)
+        assert Item.objects.count() == 15
+        assert not Item.objects.filter(updated_at__isnull=True).exists()
+
     def test_create_item(self, category_acc):
         item = Item.objects.create(
             name="Test Item",
@@ -876,3 +892,68 @@ class TestItemAPI:
         response = api_client.get(url)
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
+
+
+@pytest.mark.django_db
+class TestItemAvailabilityAPI:
+    @pytest.fixture
+    def booked_item(self, category_acc):
+        item = Item.objects.create(name='Top Hat', quantity=5, category=category_acc)
+        start = timezone.now() + timedelta(days=1)
+        gala = Event.objects.create(name='Gala', start_datetime=start, end_datetime=start + timedelta(hours=4))
+        matinee = Event.objects.create(
+            name='Matinee', start_datetime=start + timedelta(hours=2), end_datetime=start + timedelta(hours=6)
+        )
+        ItemBooking.objects.create(item=item, event=gala, quantity=2)
+        return item, gala, matinee
+
+    def test_availability_for_event(self, authenticated_staff_client, booked_item):
+        item, gala, matinee = booked_item
+        url = reverse('item-availability', kwargs={'pk': item.pk})
+        response = authenticated_staff_client.get(url, {'event': matinee.pk})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['quantity'] == 5
+        assert response.data['booked'] == 2
+        assert response.data['available'] == 3
+
+    def test_availability_for_window(self, authenticated_staff_client, booked_item):
+        item, gala, matinee = booked_item
+        url = reverse('item-availability', kwargs={'pk': item.pk})
+        after = gala.end_datetime + timedelta(hours=1)
+        response = authenticated_staff_client.get(
+            url, {'start': after.isoformat(), 'end': (after + timedelta(hours=1)).isoformat()}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['available'] == 5
+
+    def test_availability_refreshes_after_booking(self, authenticated_staff_client, booked_item):
+        item, gala, matinee = booked_item
+        url = reverse('item-availability', kwargs={'pk': item.pk})
+        assert authenticated_staff_client.get(url, {'event': matinee.pk}).data['available'] == 3
+        ItemBooking.objects.create(item=item, event=matinee, quantity=1)
+        assert authenticated_staff_client.get(url, {'event': matinee.pk}).data['available'] == 2
+
+    def test_availability_requires_a_window(self, authenticated_staff_client, booked_item):
+        item, gala, matinee = booked_item
+        url = reverse('item-availability', kwargs={'pk': item.pk})
+        assert authenticated_staff_client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+        assert authenticated_staff_client.get(url, {'event': 0}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_availability_rejects_bad_parameters(self, authenticated_staff_client, booked_item):
+        item, gala, matinee = booked_item
+        url = reverse('item-availability', kwargs={'pk': item.pk})
+        response = authenticated_staff_client.get(url, {'event': 'abc'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {'event': 'Event not found.'}
+        for window in [
+            {'start': 'soon', 'end': '2026-01-02T00:00:00Z'},
+            {'start': '2026-01-02T00:00:00Z', 'end': '2026-01-01T00:00:00Z'},
+        ]:
+            assert authenticated_staff_client.get(url, window).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_availability_reads_naive_datetimes_in_time_zone(self, authenticated_staff_client, booked_item):
+        item, gala, matinee = booked_item
+        url = reverse('item-availability', kwargs={'pk': item.pk})
+        response = authenticated_staff_client.get(url, {'start': '2026-01-01T00:00:00', 'end': '2026-01-02T00:00:00Z'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['start'] == timezone.make_aware(timezone.datetime(2026, 1, 1))
@@ -16,6 +16,17 @@ if [ "$RENDER" = "true" ]; then
     # - No superuser creation
     # All of that must be done separately
 
+    if [ "$ASGI" = "true" ]; then
+        # Serves the async endpoints under /api/async/ without tying up a thread per request
+        echo "Starting Uvicorn..."
+        uvicorn core.asgi:application \
+            --host 0.0.0.0 \
+            --port $PORT \
+            --workers 2 \
+            --timeout-keep-alive 120
+        exit 0
+    fi
+
     echo "Starting Gunicorn..."
     gunicorn core.wsgi:application \
         --bind 0.0.0.0:$PORT \
@@ -21,6 +21,8 @@ export const getItems = async (page, filters, pageSize = 10) => {
     const params = new URLSearchParams({
       page,
       ...filters,
+      // Only the columns the items table shows
+      fields: "id,name,category,quantity,color,location",
     });
 
     const response = await axios.get(`items/?${params}`);
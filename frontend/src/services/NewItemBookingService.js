@@ -1,7 +1,10 @@
 import axios from "../utils/axiosConfig";
 
 export const getCurrentFutureEvents = () => {
-  return axios.get(`events/current-future/`);
+  // The event dropdown only needs names and dates, not notes
+  return axios.get(`events/current-future/`, {
+    params: { fields: "id,name,start_datetime,end_datetime" },
+  });
 };
 
 export const createItemBooking = (formData) => {